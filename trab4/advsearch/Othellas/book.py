@@ -0,0 +1,143 @@
+import os
+import mmap
+import struct
+from typing import Tuple, Union
+
+from ..othello.board import ZOBRIST_PLAYER
+from ..othello.bitboard import BitBoard, ZOBRIST_BITS, square_bit, flip_vertical, mirror_horizontal, transpose
+
+# Opening book: a file of (position key, best move) records sorted by key, built offline
+# by build_book.py and memory-mapped when it is opened, so that loading it costs nothing
+# and only the pages touched by the binary search are read.
+#
+# The 8 symmetries of the board (rotations and reflections) lead to equivalent positions,
+# so each position is stored once, in its canonical orientation: the symmetric copy with
+# the smallest key. Its move is stored in that orientation too.
+
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'book.bin')
+MAGIC = b'OBK1'
+RECORD = struct.Struct('<QB')     # canonical position key, move square (y*8 + x) in the canonical orientation
+
+
+def symmetry(bits: int, sym: int) -> int:
+    """
+    Applies one of the 8 symmetries of the board to a bitboard. The bits of 'sym'
+    select the transforms: 4 = transpose, 2 = vertical flip, 1 = horizontal mirror
+    (in this order), so sym 0 is the identity
+    """
+    if sym & 4:
+        bits = transpose(bits)
+    if sym & 2:
+        bits = flip_vertical(bits)
+    if sym & 1:
+        bits = mirror_horizontal(bits)
+    return bits
+
+
+def position_key(black: int, white: int, player: str) -> int:
+    """
+    Returns the zobrist key of the position (the same as GameState.key() for a BitBoard)
+    """
+    key = ZOBRIST_PLAYER[player]
+    for color_keys, bits in ((ZOBRIST_BITS[BitBoard.BLACK], black), (ZOBRIST_BITS[BitBoard.WHITE], white)):
+        while bits:
+            lsb = bits & -bits
+            key ^= color_keys[lsb.bit_length() - 1]
+            bits ^= lsb
+    return key
+
+
+def canonical(black: int, white: int, player: str) -> Tuple[int, int]:
+    """
+    Returns (key, sym): the smallest key among the 8 symmetric copies of the position
+    and the symmetry that produces it
+    """
+    return min((position_key(symmetry(black, sym), symmetry(white, sym), player), sym) for sym in range(8))
+
+
+def canonical_entry(state, move) -> Tuple[int, int]:
+    """
+    Returns the (key, square) record that stores the move of the state in the book
+    """
+    black, white = BitBoard.from_board(state.get_board()).bits(BitBoard.BLACK)
+    key, sym = canonical(black, white, state.player)
+    return key, symmetry(square_bit(*move), sym).bit_length() - 1
+
+
+def write_book(path: str, entries: dict):
+    """
+    Writes the book file
+    :param path: file to write
+    :param entries: dict canonical key -> square, as returned by canonical_entry
+    """
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        for key in sorted(entries):
+            f.write(RECORD.pack(key, entries[key]))
+
+
+class OpeningBook(object):
+    """
+    Read-only access to a book file written by write_book, memory-mapped
+    """
+
+    def __init__(self, path: str = BOOK_FILE):
+        """
+        :param path: book file
+        """
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError('%s is not an opening book file' % path)
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = (len(self.data) - len(MAGIC)) // RECORD.size
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self.size
+
+    def probe(self, key: int) -> Union[int, None]:
+        """
+        Returns the square stored for the canonical key (binary search), or None
+        """
+        low, high = 0, self.size
+        while low < high:
+            mid = (low + high) // 2
+            mid_key, square = RECORD.unpack_from(self.data, len(MAGIC) + mid * RECORD.size)
+            if mid_key == key:
+                return square
+            if mid_key < key:
+                low = mid + 1
+            else:
+                high = mid
+        return None
+
+    def lookup(self, state) -> Union[Tuple[int, int], None]:
+        """
+        Returns the book move of the state, in the orientation of the state, or None if it is not in the book
+        :param state: othello state (with a BitBoard or board.Board)
+        :return: (int, int) tuple with x, y coordinates of the move
+        """
+        black, white = BitBoard.from_board(state.get_board()).bits(BitBoard.BLACK)
+        key, sym = canonical(black, white, state.player)
+        square = self.probe(key)
+        if square is not None:
+            # the legal move whose symmetric copy is the stored move
+            for move in state.legal_moves():
+                if symmetry(square_bit(*move), sym) == 1 << square:
+                    self.hits += 1
+                    return move
+        self.misses += 1
+        return None
+
+    def close(self):
+        self.data.close()
+
+
+def open_book(path: str = BOOK_FILE) -> Union[OpeningBook, None]:
+    """
+    Opens the book file, or returns None if it does not exist
+    """
+    if not os.path.exists(path):
+        return None
+    return OpeningBook(path)
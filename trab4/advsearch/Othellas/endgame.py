@@ -0,0 +1,238 @@
+import time
+from typing import Tuple, Union
+
+from .minimax import SearchTimeout
+from ..othello.bitboard import BitBoard, legal_bits, flip_bits, popcount, SQUARES, FULL
+
+# the four 4x4 quadrants of the board. Playing in a quadrant with an odd number of
+# empty squares tends to give the last move of that region to the player (parity)
+QUADRANTS = (0x0F0F0F0F, 0xF0F0F0F0, 0x0F0F0F0F << 32, 0xF0F0F0F0 << 32)
+
+# below this number of empty squares the search stops computing legal moves and
+# ordering them: it just tries every empty square (most of them do not flip anything)
+SHALLOW_EMPTIES = 5
+
+# above this number of empty squares the moves are sorted by the mobility left to the opponent
+FASTEST_FIRST_EMPTIES = 8
+
+# the deadline is checked every this many nodes (time.time() is expensive compared to a node)
+CHECK_EVERY = 1024
+
+
+def parity_order(moves: int, empty: int) -> list:
+    """
+    Returns the move bits sorted with the moves of the odd quadrants first
+    :param moves: bitmask of the moves
+    :param empty: bitmask of the empty squares
+    """
+    odd = 0
+    for quadrant in QUADRANTS:
+        if popcount(empty & quadrant) & 1:
+            odd |= quadrant
+    ordered = []
+    for group in (moves & odd, moves & ~odd):
+        while group:
+            lsb = group & -group
+            ordered.append(lsb)
+            group ^= lsb
+    return ordered
+
+
+class EndgameSolver(object):
+    """
+    Exact alpha-beta (negamax) solver for othello endgames. It works directly on the
+    (own, opponent) bitboards, without GameState objects, and returns the final disc
+    differential (own pieces - opponent pieces) under perfect play.
+
+    The moves are ordered by quadrant parity and, far from the end, by the mobility
+    left to the opponent (fastest-first). The last empty squares are handled by
+    a special case that only looks for flips in each empty square.
+
+    In WLD (win/loss/draw) mode the search uses a (-1, 1) window: it only finds
+    whether the game is won, drawn or lost, which is much faster than the exact score.
+    """
+
+    def __init__(self, max_empties: int = 12, wld_empties: int = 16):
+        """
+        :param max_empties: the exact score is searched when there are at most this many empty squares
+        :param wld_empties: the win/loss/draw result is searched when there are at most this many
+        """
+        self.max_empties = max_empties
+        self.wld_empties = wld_empties
+        self.deadline = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Resets the counters reported by stats()
+        """
+        self.nodes = 0          # visited positions
+        self.solved = 0         # positions solved (exactly or wld)
+        self.timeouts = 0       # solves interrupted by the deadline
+
+    def applies(self, state) -> bool:
+        """
+        Returns whether the state is close enough to the end to be solved
+        """
+        return state.get_board().piece_count[BitBoard.EMPTY] <= max(self.max_empties, self.wld_empties)
+
+    def solve(self, state, wld: bool = False, deadline: float = None) -> Tuple[int, Union[Tuple[int, int], None]]:
+        """
+        Solves the state for the player to move.
+        :param state: othello state (with a BitBoard or board.Board)
+        :param wld: whether to find only the win/loss/draw result
+        :param deadline: time.time() value after which SearchTimeout is raised
+        :return: (value, move) where value is the disc differential for the player to move
+                 (in WLD mode only its sign is meaningful: 1, 0 or -1) and move is the (x,y)
+                 best move (None if the player must pass)
+        """
+        board = state.get_board()
+        if not isinstance(board, BitBoard):
+            board = BitBoard.from_board(board)
+        own, opp = board.bits(state.player)
+
+        self.deadline = deadline
+        self.solved += 1
+        try:
+            if wld:
+                return self.root(own, opp, -1, 1)
+            return self.root(own, opp, -64, 64)
+        except SearchTimeout:
+            self.timeouts += 1
+            raise
+
+    def root(self, own: int, opp: int, alpha: int, beta: int) -> Tuple[int, Union[Tuple[int, int], None]]:
+        """
+        Searches the root position with the (alpha, beta) window and returns (value, move)
+        """
+        empty = ~(own | opp) & FULL
+        moves = legal_bits(own, opp)
+        if not moves:
+            return -self.search(opp, own, -beta, -alpha, empty, popcount(empty), False), None
+
+        n_empty = popcount(empty)
+        best_value, best_move = -65, None
+        for move in self.order(own, opp, moves, empty, n_empty):
+            flips = flip_bits(own, opp, move)
+            value = -self.search(opp ^ flips, own | move | flips, -beta, -alpha, empty ^ move, n_empty - 1, False)
+            if value > best_value:
+                best_value, best_move = value, SQUARES[move.bit_length() - 1]
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    break
+        return best_value, best_move
+
+    def order(self, own: int, opp: int, moves: int, empty: int, n_empty: int) -> list:
+        """
+        Returns the move bits in the order they should be searched
+        """
+        ordered = parity_order(moves, empty)
+        if n_empty > FASTEST_FIRST_EMPTIES:
+            # fastest-first: the fewer replies the opponent has, the sooner the cutoff
+            # (sorted is stable, so parity breaks the ties)
+            def mobility(move):
+                flips = flip_bits(own, opp, move)
+                return popcount(legal_bits(opp ^ flips, own | move | flips))
+            ordered.sort(key=mobility)
+        return ordered
+
+    def search(self, own: int, opp: int, alpha: int, beta: int, empty: int, n_empty: int, passed: bool) -> int:
+        """
+        Returns the disc differential for the player that owns 'own' (fail-soft alpha-beta)
+        :param own: pieces of the player to move
+        :param opp: pieces of the opponent
+        :param empty: bitmask of the empty squares
+        :param n_empty: number of empty squares
+        :param passed: whether the opponent has just passed
+        """
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % CHECK_EVERY == 0 and time.time() > self.deadline:
+            raise SearchTimeout()
+
+        if n_empty <= SHALLOW_EMPTIES:
+            return self.search_shallow(own, opp, alpha, beta, empty, n_empty, passed)
+
+        moves = legal_bits(own, opp)
+        if not moves:
+            if passed:  # neither player can move: the game is over
+                return popcount(own) - popcount(opp)
+            return -self.search(opp, own, -beta, -alpha, empty, n_empty, True)
+
+        best = -65
+        for move in self.order(own, opp, moves, empty, n_empty):
+            flips = flip_bits(own, opp, move)
+            value = -self.search(opp ^ flips, own | move | flips, -beta, -alpha, empty ^ move, n_empty - 1, False)
+            if value > best:
+                best = value
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+        return best
+
+    def search_shallow(self, own: int, opp: int, alpha: int, beta: int, empty: int, n_empty: int, passed: bool) -> int:
+        """
+        Same as search, for the last few empty squares: each empty square is tried
+        directly (a square that flips nothing is not a legal move)
+        """
+        if n_empty == 1:
+            return self.last_move(own, opp, empty)
+
+        best = -65
+        for move in parity_order(empty, empty):
+            flips = flip_bits(own, opp, move)
+            if not flips:
+                continue
+            self.nodes += 1
+            value = -self.search_shallow(opp ^ flips, own | move | flips, -beta, -alpha, empty ^ move, n_empty - 1, False)
+            if value > best:
+                best = value
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+
+        if best == -65:  # no legal move
+            if passed:
+                return popcount(own) - popcount(opp)
+            return -self.search_shallow(opp, own, -beta, -alpha, empty, n_empty, True)
+        return best
+
+    def last_move(self, own: int, opp: int, move: int) -> int:
+        """
+        Returns the final disc differential when a single empty square is left
+        """
+        diff = popcount(own) - popcount(opp)
+        flips = popcount(flip_bits(own, opp, move))
+        if flips:
+            return diff + 2 * flips + 1
+        flips = popcount(flip_bits(opp, own, move))
+        if flips:
+            return diff - 2 * flips - 1
+        return diff
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the solver
+        """
+        return {
+            'nodes': self.nodes,
+            'solved': self.solved,
+            'timeouts': self.timeouts,
+        }
+
+
+def endgame_move(state, solver: EndgameSolver, deadline: float) -> Union[Tuple[int, int], None]:
+    """
+    Returns the best move of the state according to the solver, trying the exact score
+    when the number of empty squares allows it and the win/loss/draw result otherwise.
+    Raises SearchTimeout if the solver cannot finish before the deadline.
+    :param state: othello state
+    :param solver: the endgame solver
+    :param deadline: time.time() value after which the search is abandoned
+    :return: (int, int) tuple with x, y coordinates of the move
+    """
+    n_empty = state.get_board().piece_count[BitBoard.EMPTY]
+    wld = n_empty > solver.max_empties
+    _, move = solver.solve(state, wld=wld, deadline=deadline)
+    return move
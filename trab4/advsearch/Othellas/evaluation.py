@@ -0,0 +1,98 @@
+from typing import Tuple
+
+from .othello_minimax_mask import EVAL_TEMPLATE
+from ..othello.bitboard import BitBoard, popcount, BORDER
+
+# Evaluation functions computed on the bitboards of the position instead of looping
+# over the 64 tiles. They return exactly the same values as evaluate_mask
+# (othello_minimax_mask) and evaluate_custom (othello_minimax_custom), but each
+# feature is a handful of masks, shifts and table lookups.
+
+# MASK_ROWS[row][byte]: sum of the EVAL_TEMPLATE weights of the row for the pieces set in the byte
+MASK_ROWS = tuple(
+    tuple(sum(EVAL_TEMPLATE[row][x] for x in range(8) if byte >> x & 1) for byte in range(256))
+    for row in range(8)
+)
+
+CORNERS = 0x8100000000000081
+
+# weights of evaluate_custom
+CORNER_WEIGHT = 30
+EDGE_WEIGHT = 10
+STABILITY_WEIGHT = 30
+MOBILITY_WEIGHT = 15
+PARITY_WEIGHT = 15
+
+
+def position_bits(state, player: str) -> Tuple[BitBoard, int, int]:
+    """
+    Returns the bitboard of the state (converted if it is a board.Board)
+    and the (own, opponent) bitmasks from the point of view of the player
+    """
+    board = state.get_board()
+    if not isinstance(board, BitBoard):
+        board = BitBoard.from_board(board)
+    own, opp = board.bits(player)
+    return board, own, opp
+
+
+def mask_value(own: int, opp: int) -> int:
+    """
+    Returns the EVAL_TEMPLATE score of own pieces minus the score of opponent pieces
+    """
+    value = 0
+    for row_weights in MASK_ROWS:
+        value += row_weights[own & 0xFF] - row_weights[opp & 0xFF]
+        own >>= 8
+        opp >>= 8
+    return value
+
+
+def custom_value(board: BitBoard, player: str, own: int, opp: int) -> float:
+    """
+    Returns evaluate_custom of the position: corners, stability (cached on the board), edges, mobility and parity
+    """
+    own_stable, opp_stable = board.stable_bits(player), board.stable_bits(board.opponent(player))
+    n_own, n_opp = popcount(own), popcount(opp)
+    value = CORNER_WEIGHT * (popcount(own & CORNERS) - popcount(opp & CORNERS))
+    value += STABILITY_WEIGHT * (popcount(own_stable) - popcount(opp_stable))
+    value += EDGE_WEIGHT * (popcount(own & BORDER & ~own_stable) - popcount(opp & BORDER & ~opp_stable))
+    value += MOBILITY_WEIGHT * (popcount(board.legal_bits(player)) - popcount(board.legal_bits(board.opponent(player))))
+    return value + PARITY_WEIGHT * (n_own - n_opp) / (n_own + n_opp)
+
+
+def evaluate_mask_bits(state, player: str) -> float:
+    """
+    Same as evaluate_mask, computed on the bitboards
+    :param state: state to evaluate (instance of GameState)
+    :param player: player to evaluate the state for (B or W)
+    """
+    _, own, opp = position_bits(state, player)
+    return mask_value(own, opp)
+
+
+def evaluate_custom_bits(state, player: str) -> float:
+    """
+    Same as evaluate_custom, computed on the bitboards
+    :param state: state to evaluate (instance of GameState)
+    :param player: player to evaluate the state for (B or W)
+    """
+    board, own, opp = position_bits(state, player)
+    return custom_value(board, player, own, opp)
+
+
+
+def evaluate_mask_batch(states: list, player: str) -> list:
+    """
+    Evaluates a batch of leaf positions in one call (e.g. the leaves collected by mcts.ValueMCTS)
+    :return: list with the evaluate_mask_bits value of each state
+    """
+    return [evaluate_mask_bits(state, player) for state in states]
+
+
+def evaluate_custom_batch(states: list, player: str) -> list:
+    """
+    Evaluates a batch of leaf positions in one call (e.g. the leaves collected by mcts.ValueMCTS)
+    :return: list with the evaluate_custom_bits value of each state
+    """
+    return [evaluate_custom_bits(state, player) for state in states]
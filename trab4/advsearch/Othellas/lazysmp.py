@@ -0,0 +1,298 @@
+import os
+import time
+import struct
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Tuple, Union, Callable
+
+from .minimax import SearchContext, SearchTimeout, search
+from .transposition import TranspositionTable
+from .ordering import MoveOrderer, positional_prior
+from .othello_minimax_mask import EVAL_TEMPLATE
+
+# Lazy SMP: every worker process runs its own iterative deepening on the same position,
+# and all of them read and write one transposition table in shared memory. The workers
+# do not coordinate otherwise: each one finds in the table the bounds and best moves
+# of the subtrees already searched by the others, so they spread over different parts
+# of the tree. Half of the workers start one depth deeper (staggered depths), and a
+# worker skips the depths that another one has already completed.
+#
+# The table entries are written without locks. Each entry stores its key XORed with its
+# data, so an entry torn by two simultaneous writes does not match its key and is ignored.
+
+# entry of the shared table: check (key ^ the two data words), value, depth, bound, move, generation
+ENTRY = struct.Struct('<QdfBBBx')
+DATA_WORDS = struct.Struct('<QQ')   # the 16 bytes after the check, as two words
+NO_MOVE = 255
+
+# fields of each worker in the shared results array
+RESULT_FIELDS = 4                   # completed depth, value, move square, visited nodes
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    Transposition table stored in a shared memory buffer, with the interface of
+    TranspositionTable (one always-replace-if-deeper slot per position hash).
+    Only othello moves can be stored (they are encoded as the square y*8+x).
+    """
+
+    def __init__(self, max_entries: int, buffer):
+        """
+        :param max_entries: number of slots (the buffer must have max_entries * ENTRY.size bytes)
+        :param buffer: shared buffer (e.g. SharedMemory.buf), already zeroed or filled by another process
+        """
+        # the buffer is attached after the base initializer, whose call to clear()
+        # must not erase the entries already written by other processes
+        self.buffer = None
+        super().__init__(max_entries)
+        self.n_buckets = self.max_entries = max_entries     # one slot per position hash
+        self.buffer = buffer
+
+    def clear(self):
+        """
+        Removes all entries (of every process) and resets the counters
+        """
+        if self.buffer is not None:
+            self.buffer[:self.max_entries * ENTRY.size] = bytes(self.max_entries * ENTRY.size)
+        self.size = 0
+        self.reset_stats()
+
+    def follow(self, player: str, generation: int):
+        """
+        Joins the search started by new_search in another process
+        """
+        self.player = player
+        self.generation = generation
+
+    def _read(self, idx: int) -> Union[tuple, None]:
+        """
+        Returns the entry of the slot or None if it is empty (or torn)
+        """
+        offset = idx * ENTRY.size
+        check, value, depth, bound, square, generation = ENTRY.unpack_from(self.buffer, offset)
+        if not check:
+            return None
+        low, high = DATA_WORDS.unpack_from(self.buffer, offset + 8)
+        move = None if square == NO_MOVE else (square % 8, square // 8)
+        return check ^ low ^ high, depth, value, bound, move, generation
+
+    def probe(self, key: int) -> Union[tuple, None]:
+        """
+        Returns the entry of the given position or None if it is not stored
+        :param key: position hash
+        """
+        self.probes += 1
+        entry = self._read(key % self.n_buckets)
+        if entry is None or entry[0] != key:
+            return None
+        self.hits += 1
+        return entry
+
+    def store(self, key: int, depth: float, value: float, bound: int, move):
+        """
+        Stores the result of a search (see TranspositionTable.store). The slot is kept
+        for a deeper search of another position of the current generation.
+        """
+        self.stores += 1
+        idx = key % self.n_buckets
+        old = self._read(idx)
+        generation = self.generation & 0xFF
+        if old is not None and old[0] != key and old[1] > depth and old[5] == generation:
+            return
+        if old is None:
+            self.size += 1
+        elif old[0] != key:
+            self.replaced += 1
+
+        offset = idx * ENTRY.size
+        square = NO_MOVE if move is None else move[1] * 8 + move[0]
+        ENTRY.pack_into(self.buffer, offset, 0, value, depth, bound, square, generation)
+        low, high = DATA_WORDS.unpack_from(self.buffer, offset + 8)
+        struct.pack_into('<Q', self.buffer, offset, key ^ low ^ high)
+
+
+class StopContext(SearchContext):
+    """
+    Search context that also aborts the search when the shared stop flag is set
+    """
+
+    def __init__(self, stop, *args, **kwargs):
+        """
+        :param stop: shared value, the search stops when it is not zero
+        """
+        super().__init__(*args, **kwargs)
+        self.stop = stop
+
+    def visit(self):
+        super().visit()
+        if self.stop.value:
+            raise SearchTimeout()
+
+
+# state of each worker process, set by _init_worker when the process starts
+_MEMORY = None
+_TT = None
+_ORDERER = None
+_RESULTS = None
+_STOP = None
+
+
+def _init_worker(memory_name: str, tt_entries: int, results, stop):
+    """
+    Initializer of the worker processes: attaches the shared table
+    :param memory_name: name of the shared memory block of the table
+    :param tt_entries: number of slots of the table
+    :param results: shared array with RESULT_FIELDS values per worker
+    :param stop: shared flag that interrupts the searches
+    """
+    global _MEMORY, _TT, _ORDERER, _RESULTS, _STOP
+    _MEMORY = shared_memory.SharedMemory(name=memory_name)
+    _TT = SharedTranspositionTable(tt_entries, _MEMORY.buf)
+    _ORDERER = MoveOrderer(prior=positional_prior(EVAL_TEMPLATE))
+    _RESULTS = results
+    _STOP = stop
+
+
+def _completed_depth() -> int:
+    """
+    Returns the deepest search completed by any worker
+    """
+    with _RESULTS.get_lock():
+        return int(max(_RESULTS[i] for i in range(0, len(_RESULTS), RESULT_FIELDS)))
+
+
+def _lazy_worker(state, worker: int, generation: int, max_depth: float, eval_func: Callable,
+                 deadline: float, pvs: bool) -> Tuple[int, bool]:
+    """
+    Job of a worker: iterative deepening on the state until the deadline, the stop flag
+    or max_depth, publishing each completed depth in its slot of the results
+    :return: (worker, finished), finished is True if the search reached max_depth or the end of the game
+    """
+    _TT.follow(state.player, generation)
+    _ORDERER.new_search()
+    slot = worker * RESULT_FIELDS
+    nodes = 0
+    depth = 1 + worker % 2
+    try:
+        while depth <= max_depth:
+            ctx = StopContext(_STOP, _TT, deadline, _ORDERER)
+            try:
+                value, move = search(state, float('-inf'), float('inf'), depth, eval_func, ctx, pvs)
+            except SearchTimeout:
+                nodes += ctx.nodes
+                return worker, False
+            nodes += ctx.nodes
+            with _RESULTS.get_lock():
+                square = NO_MOVE if move is None else move[1] * 8 + move[0]
+                _RESULTS[slot:slot + RESULT_FIELDS] = [depth, value, square, nodes]
+            if not ctx.depth_limited:
+                return worker, True
+            # the next depth nobody has completed yet
+            depth = max(depth, _completed_depth()) + 1
+        return worker, True
+    finally:
+        with _RESULTS.get_lock():
+            _RESULTS[slot + 3] = nodes
+
+
+class LazySMPSearch(object):
+    """
+    Lazy SMP search with a pool of worker processes sharing a transposition table.
+    The pool and the table are created at the first search and reused by the next
+    ones (the table keeps its entries between moves); call shutdown() to release them.
+    """
+
+    def __init__(self, workers: int = None, tt_entries: int = 2 ** 18):
+        """
+        :param workers: number of worker processes (default: the number of CPUs)
+        :param tt_entries: number of slots of the shared table
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.tt_entries = tt_entries
+        self.memory = None
+        self.table = None
+        self.pool = None
+        self.results = None
+        self.stop = None
+        self.eval_func = None   # evaluation function of the values in the table
+
+    def start(self):
+        """
+        Creates the shared table and starts the worker processes (if they are not running yet)
+        """
+        if self.pool is not None:
+            return
+        self.memory = shared_memory.SharedMemory(create=True, size=self.tt_entries * ENTRY.size)
+        self.table = SharedTranspositionTable(self.tt_entries, self.memory.buf)
+        self.table.clear()
+        self.results = multiprocessing.Array('d', RESULT_FIELDS * self.workers)
+        self.stop = multiprocessing.RawValue('b', 0)
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                        initargs=(self.memory.name, self.tt_entries, self.results, self.stop))
+
+    def shutdown(self):
+        """
+        Stops the worker processes and releases the shared table
+        """
+        if self.pool is None:
+            return
+        self.stop.value = 1
+        self.pool.shutdown(cancel_futures=True)
+        self.pool = None
+        self.table = None
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None
+
+    def iterative_deepening_move(self, state, time_budget: float, eval_func: Callable, max_depth: int = -1,
+                                 pvs: bool = False, info: dict = None) -> Tuple[int, int]:
+        """
+        Searches the othello state with all the workers and returns the move of the deepest completed
+        search (of the first worker, among the ones that completed it).
+        The evaluation function must be picklable (a function defined at module level).
+        :param state: state to make the move (instance of GameState)
+        :param time_budget: time (in seconds) to search
+        :param eval_func: the function to evaluate a terminal or leaf state
+        :param max_depth: maximum depth of search (-1 = unlimited). The search stops as soon as one worker completes it
+        :param pvs: whether the workers use principal variation search
+        :param info: optional dict, filled with the 'depth' and 'value' of the returned search
+                     and the 'nodes' visited by all the workers
+        :return: (int, int) tuple with x, y coordinates of the move (remember: 0 is the first row/column)
+        """
+        deadline = time.time() + time_budget
+        if max_depth == -1:
+            max_depth = float('inf')
+
+        self.start()
+        if eval_func is not self.eval_func:
+            self.table.clear()
+            self.eval_func = eval_func
+        self.table.new_search(state.player)
+        with self.results.get_lock():
+            self.results[:] = [0] * len(self.results)
+        self.stop.value = 0
+
+        futures = [self.pool.submit(_lazy_worker, state, worker, self.table.generation, max_depth,
+                                    eval_func, deadline, pvs) for worker in range(self.workers)]
+        pending = futures
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.time()), return_when=FIRST_COMPLETED)
+            if not done or any(future.result()[1] for future in done):
+                break   # deadline, or a worker reached max_depth / the end of the game
+        self.stop.value = 1
+        wait(futures)   # the workers stop at their next node
+
+        best_move = min(state.legal_moves(), default=None)
+        best_depth, value, nodes = 0, None, 0
+        with self.results.get_lock():
+            for worker in range(self.workers):
+                depth, worker_value, square, worker_nodes = self.results[worker * RESULT_FIELDS:(worker + 1) * RESULT_FIELDS]
+                nodes += int(worker_nodes)
+                if depth > best_depth:
+                    best_depth, value = int(depth), worker_value
+                    if square != NO_MOVE:
+                        best_move = (int(square) % 8, int(square) // 8)
+        if info is not None:
+            info.update(depth=best_depth, value=value, nodes=nodes)
+        return best_move
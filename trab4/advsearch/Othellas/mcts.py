@@ -1,5 +1,16 @@
+import os
+import math
+import time
 import random
-from typing import Tuple
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Tuple, Union, Callable
+
+from .minimax import TIME_BUDGET, time_budget
+from ..othello.board import Board
+from ..othello.bitboard import BitBoard
+from ..othello.gamestate import GameState
 
 # Voce pode criar funcoes auxiliares neste arquivo
 # e tambem modulos auxiliares neste pacote.
@@ -7,20 +18,773 @@ from typing import Tuple
 # Nao esqueca de renomear 'your_agent' com o nome
 # do seu agente.
 
+# value of a node whose result under perfect play is not known yet (see MCTS.proven)
+UNKNOWN = -1.0
+
+
+def reward(winner: Union[str, None], player: str) -> float:
+    """
+    Returns the result of a finished game for the player: 1 for a win, 0.5 for a draw and 0 for a loss
+    """
+    if winner is None:
+        return 0.5
+    return 1.0 if winner == player else 0.0
+
+
+def state_identity(state):
+    """
+    Returns a value that identifies the state: its hash if it has a key() method,
+    otherwise the text of the board and the player to move
+    """
+    if hasattr(state, 'key'):
+        return state.key()
+    return str(state.get_board()), state.player
+
+
+def random_game(state, rng, moves: list = None) -> Union[str, None]:
+    """
+    Plays random moves from the state until the end of the game and returns the winner.
+    Uses the fast playout of the game (state.rollout) when it has one
+    :param moves: optional list that receives the (player, move) pairs of the random game
+    """
+    if hasattr(state, 'rollout'):
+        return state.rollout(rng) if moves is None else state.rollout(rng, moves)
+    while not state.is_terminal():
+        move = rng.choice(tuple(state.legal_moves()))
+        if moves is not None:
+            moves.append((state.player, move))
+        state = state.next_state(move)
+    return state.winner()
+
+
+class MCTS(object):
+    """
+    UCT (Upper Confidence bounds applied to Trees) search for any game with the
+    GameState interface (legal_moves, next_state, is_terminal and winner).
+
+    The tree is stored in parallel arrays indexed by node number, and the children
+    of a node are contiguous (a node is expanded with all its moves at once).
+    The states are not stored: they are rebuilt from the root while descending the tree.
+
+    The statistics of a node are kept for the player that made the move into it
+    (its 'mover'), so each node chooses among its children the one that is best for the
+    player to move. A node whose subtree has been searched until the end of the game
+    in every line gets its exact result (see proven), and the search stops when the
+    result of the root is known.
+
+    The tree is kept between searches: the next search starts from the node of its
+    state (found after the move played and the reply of the opponent), and the rest
+    of the tree is discarded.
+
+    With RAVE (rapid action value estimation), each node also keeps all-moves-as-first
+    statistics: the results of the playouts below its parent in which its mover made its
+    move at any later point, not only right away. They are many more than the visits of
+    the node, but biased, so they are blended with the mean result with a weight that
+    vanishes as the node gets visits (see rave_weight).
+    """
+
+    def __init__(self, exploration: float = math.sqrt(2), iterations: int = None,
+                 time_budget: float = TIME_BUDGET, seed: int = None, reuse: bool = True,
+                 max_nodes: int = 10 ** 6, rave: float = 0.0, rave_bias: float = None):
+        """
+        :param exploration: constant c of the UCT formula (wins/n + c*sqrt(ln N/n))
+        :param iterations: maximum number of playouts per search (None = no limit)
+        :param time_budget: maximum time (in seconds) of a search (None = no limit)
+        :param seed: seed of the random playouts
+        :param reuse: whether a search starts from the subtree of the previous search
+                      that corresponds to its state (see find_root)
+        :param max_nodes: the nodes are not expanded beyond this size of the tree
+        :param rave: equivalence parameter k of the RAVE schedule (0 = no RAVE): the weight of the
+                     AMAF statistics of a node with n visits is sqrt(k / (3n + k)), half at n = k
+        :param rave_bias: if given, the weight is the one that minimizes the error of the blend
+                          for this bias of the AMAF statistics: n' / (n + n' + 4 bias^2 n n'),
+                          n' being the AMAF visits (rave only needs to be non zero)
+        """
+        self.exploration = exploration
+        self.iterations = iterations
+        self.time_budget = time_budget
+        self.rng = random.Random(seed)
+        self.reuse = reuse
+        self.max_nodes = max_nodes
+        self.rave = rave
+        self.rave_bias = rave_bias
+        self.root_state = None          # state of the root of the tree (node 0)
+        self.stop = None                # shared value, a search stops when it is not zero (see start_pool)
+        self.clear()
+        self.reset_stats()
+
+    def clear(self):
+        """
+        Removes all the nodes
+        """
+        self.parent = array('l')        # parent node (-1 for the root)
+        self.first_child = array('l')   # first of the contiguous children (-1 = not expanded)
+        self.n_children = array('l')
+        self.visits = array('l')
+        self.wins = array('d')          # sum of the playout results for the mover of the node
+        self.proven = array('d')        # exact result for the mover (UNKNOWN if not solved)
+        self.amaf_visits = array('l')   # playouts below the parent in which the mover made the move
+        self.amaf_wins = array('d')     # sum of their results for the mover
+        self.move = []                  # move that leads to the node
+        self.mover = []                 # player that made the move (None for the root)
+
+    def reset_stats(self):
+        """
+        Resets the counters reported by stats()
+        """
+        self.playouts = 0
+        self.elapsed = 0.0
+        self.inherited = 0          # playouts of the previous searches found below the new roots
+        self.last_inherited = 0.0   # fraction of the playouts of the last search's root that were inherited
+
+    def add_node(self, parent: int, move, mover: Union[str, None]) -> int:
+        """
+        Appends a node to the arrays and returns its number
+        """
+        self.parent.append(parent)
+        self.first_child.append(-1)
+        self.n_children.append(0)
+        self.visits.append(0)
+        self.wins.append(0.0)
+        self.proven.append(UNKNOWN)
+        self.amaf_visits.append(0)
+        self.amaf_wins.append(0.0)
+        self.move.append(move)
+        self.mover.append(mover)
+        return len(self.move) - 1
+
+    def __len__(self):
+        return len(self.move)
+
+    def search(self, state) -> Tuple[int, int]:
+        """
+        Runs playouts from the state until the budget is over and returns the best move.
+        With reuse, the search starts from the statistics of the previous search below the state.
+        :param state: state to make the move
+        :return: the move of the root child with most visits
+        """
+        if isinstance(state.get_board(), Board):
+            # othello on the tile board: searched on a bitboard copy (much faster playouts)
+            state = GameState(BitBoard.from_board(state.get_board()), state.player)
+        root = self.find_root(state) if self.reuse else None
+        if root is None:
+            self.clear()
+            self.add_node(-1, None, None)
+        else:
+            self.compact(root)
+        inherited = self.visits[0]
+        self.root_state = state
+
+        self.run(0, state)
+        self.inherited += inherited
+        self.last_inherited = inherited / self.visits[0] if self.visits[0] else 0.0
+        return self.best_move(0, state.player)
+
+    def find_root(self, state) -> Union[int, None]:
+        """
+        Returns the node of the tree that corresponds to the state: the root itself,
+        one of its children or grandchildren (usually the move played from the
+        root followed by the reply of the opponent), or None if it is not in the tree
+        """
+        if self.root_state is None or type(self.root_state) is not type(state):
+            return None
+        target = state_identity(state)
+        frontier = [(0, self.root_state)]
+        for depth in range(3):
+            children = []
+            for node, node_state in frontier:
+                if state_identity(node_state) == target:
+                    return node
+                first = self.first_child[node]
+                if depth < 2 and first != -1:
+                    children.extend((child, node_state.next_state(self.move[child]))
+                                    for child in range(first, first + self.n_children[node]))
+            frontier = children
+        return None
+
+    def compact(self, root: int):
+        """
+        Keeps only the subtree of the given node, which becomes the root (node 0).
+        The nodes are renumbered in breadth-first order (the children stay contiguous)
+        and copied to new arrays, so the memory of the discarded nodes is released at once
+        """
+        order = [root]
+        new_number = {root: 0}
+        for node in order:  # the list grows while it is traversed
+            first = self.first_child[node]
+            for child in range(first, first + self.n_children[node]) if first != -1 else ():
+                new_number[child] = len(order)
+                order.append(child)
+
+        first_child, n_children = self.first_child, self.n_children
+        self.parent = array('l', [-1] + [new_number[self.parent[node]] for node in order[1:]])
+        self.first_child = array('l', [new_number[first_child[node]] if first_child[node] != -1 else -1
+                                       for node in order])
+        self.n_children = array('l', [n_children[node] for node in order])
+        self.visits = array('l', [self.visits[node] for node in order])
+        self.wins = array('d', [self.wins[node] for node in order])
+        self.proven = array('d', [self.proven[node] for node in order])
+        self.amaf_visits = array('l', [self.amaf_visits[node] for node in order])
+        self.amaf_wins = array('d', [self.amaf_wins[node] for node in order])
+        self.move = [self.move[node] for node in order]
+        self.mover = [self.mover[node] for node in order]
+        self.move[0] = self.mover[0] = None
+
+    def add_virtual_loss(self, node: int, root: int, amount: int):
+        """
+        Adds 'amount' visits without reward to the node and its ancestors
+        """
+        while True:
+            self.visits[node] += amount
+            if node == root:
+                break
+            node = self.parent[node]
+
+    def run(self, root: int, state):
+        """
+        Runs the UCT iterations (selection, expansion, playout, backpropagation) from the root node
+        """
+        start = time.time()
+        deadline = start + self.time_budget if self.time_budget is not None else None
+        iterations = 0
+        while self.proven[root] == UNKNOWN:
+            if self.iterations is not None and iterations >= self.iterations:
+                break
+            if deadline is not None and time.time() >= deadline:
+                break
+            if self.stop is not None and self.stop.value:
+                break
+            node, leaf_state = self.select(root, state)
+            moves = [] if self.rave else None
+            if leaf_state.is_terminal():
+                results = [leaf_state.winner()]
+                self.proven[node] = reward(results[0], self.mover[node])
+            else:
+                if len(self) < self.max_nodes:
+                    node, leaf_state = self.expand(node, leaf_state)
+                results = self.simulate(leaf_state, moves)
+            for result in results:
+                self.backpropagate(node, root, result)
+                if moves is not None:
+                    self.update_amaf(node, root, result, moves)
+            iterations += len(results)
+        self.playouts += iterations
+        self.elapsed += time.time() - start
+
+    def select(self, node: int, state):
+        """
+        Descends from the node through the best children (UCT) until a node that is
+        not expanded, and returns it with its state
+        """
+        while self.first_child[node] != -1:
+            node = self.best_child(node)
+            state = state.next_state(self.move[node])
+        return node, state
+
+    def rave_weight(self, visits: int, amaf_visits: int) -> float:
+        """
+        Returns the weight of the AMAF mean in the value of a node (see the rave parameters)
+        """
+        if self.rave_bias is None:
+            return math.sqrt(self.rave / (3 * visits + self.rave))
+        return amaf_visits / (visits + amaf_visits + 4 * self.rave_bias ** 2 * visits * amaf_visits)
+
+    def best_child(self, node: int) -> int:
+        """
+        Returns the child with the highest UCT value (the first child not visited yet, if any).
+        With RAVE, the mean result of each child is blended with its AMAF mean, and a child
+        not visited yet that has AMAF statistics is valued by them (as if it had one visit)
+        """
+        if self.rave:
+            return self.best_child_rave(node)
+        # a node expanded by a leaf-parallel round that was cut by the deadline has no visits
+        log_visits = math.log(max(1, self.visits[node]))
+        visits, wins, proven = self.visits, self.wins, self.proven
+        best, best_value = -1, -1.0
+        first = self.first_child[node]
+        for child in range(first, first + self.n_children[node]):
+            n = visits[child]
+            if n == 0:
+                return child
+            mean = proven[child] if proven[child] != UNKNOWN else wins[child] / n
+            value = mean + self.exploration * math.sqrt(log_visits / n)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    def best_child_rave(self, node: int) -> int:
+        """
+        best_child with the RAVE blend
+        """
+        # a node expanded by a leaf-parallel round that was cut by the deadline has no visits
+        log_visits = math.log(max(1, self.visits[node]))
+        visits, wins, proven = self.visits, self.wins, self.proven
+        amaf_visits, amaf_wins = self.amaf_visits, self.amaf_wins
+        best, best_value = -1, -1.0
+        first = self.first_child[node]
+        for child in range(first, first + self.n_children[node]):
+            n, amaf_n = visits[child], amaf_visits[child]
+            if proven[child] != UNKNOWN:
+                mean = proven[child]
+            elif amaf_n:
+                beta = self.rave_weight(n, amaf_n)
+                mean = (1 - beta) * (wins[child] / n if n else 0.0) + beta * amaf_wins[child] / amaf_n
+            elif n == 0:
+                return child
+            else:
+                mean = wins[child] / n
+            value = mean + self.exploration * math.sqrt(log_visits / (n or 1))
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    def expand(self, node: int, state):
+        """
+        Creates the children of the node (in random order) and returns
+        the first of them with its state
+        """
+        moves = list(state.legal_moves())
+        self.rng.shuffle(moves)
+        first = len(self.move)
+        for move in moves:
+            self.add_node(node, move, state.player)
+        self.first_child[node] = first
+        self.n_children[node] = len(moves)
+        return first, state.next_state(self.move[first])
+
+    def simulate(self, state, moves: list = None) -> list:
+        """
+        Returns the winners of the playouts of a new leaf (a single random game here)
+        :param moves: optional list that receives the (player, move) pairs of the playouts
+        """
+        return [random_game(state, self.rng, moves)]
+
+    def backpropagate(self, node: int, root: int, winner: Union[str, None]):
+        """
+        Adds the result of a playout to the node and its ancestors up to the root,
+        solving the ancestors whose children are all solved (or that have a winning child)
+        """
+        if winner is None:
+            self.backpropagate_value(node, root, 0.5, None)
+        else:
+            self.backpropagate_value(node, root, 1.0, winner)
+
+    def backpropagate_value(self, node: int, root: int, value: float, player: Union[str, None]):
+        """
+        Same as backpropagate, with the result given as a value between 0 and 1 for the player
+        (the other player gets 1 - value)
+        """
+        solving = self.proven[node] != UNKNOWN
+        while True:
+            self.visits[node] += 1
+            self.wins[node] += value if self.mover[node] == player else 1 - value
+            if node == root:
+                break
+            node = self.parent[node]
+            if solving:
+                solving = self.solve(node)
+
+    def update_amaf(self, node: int, root: int, winner: Union[str, None], moves: list):
+        """
+        Adds the result of a playout to the AMAF statistics of the children of the
+        ancestors of the node: a child is updated if its move was made by its mover
+        after its parent, in the tree path or in the playout
+        :param moves: (player, move) pairs of the playout
+        """
+        played = set(moves)
+        amaf_visits, amaf_wins, move = self.amaf_visits, self.amaf_wins, self.move
+        while node != root:
+            played.add((self.mover[node], move[node]))
+            node = self.parent[node]
+            first = self.first_child[node]
+            to_move = self.mover[first]
+            result = reward(winner, to_move)
+            for child in range(first, first + self.n_children[node]):
+                if (to_move, move[child]) in played:
+                    amaf_visits[child] += 1
+                    amaf_wins[child] += result
+
+    def solve(self, node: int) -> bool:
+        """
+        Computes the exact result of the node from its children, if possible
+        :return: whether the node was solved
+        """
+        first = self.first_child[node]
+        to_move = self.mover[first]
+        best = UNKNOWN
+        for child in range(first, first + self.n_children[node]):
+            if self.proven[child] == UNKNOWN:
+                continue
+            value = self.proven[child] if self.mover[child] == to_move else 1 - self.proven[child]
+            best = max(best, value)
+        if best != 1.0 and any(self.proven[child] == UNKNOWN
+                               for child in range(first, first + self.n_children[node])):
+            return False    # a child not solved yet may be better for the player to move
+        self.proven[node] = best if self.mover[node] == to_move else 1 - best
+        return True
+
+    def best_move(self, root: int, player: str):
+        """
+        Returns the move of the root child with most visits (a child known to win is preferred,
+        and ties are broken by the mean result)
+        """
+        first = self.first_child[root]
+        if first == -1:
+            return None
+
+        def score(child):
+            proven = self.proven[child]
+            if proven != UNKNOWN:
+                proven = proven if self.mover[child] == player else 1 - proven
+            mean = self.wins[child] / self.visits[child] if self.visits[child] else 0.0
+            return proven == 1.0, self.visits[child], mean
+
+        return self.move[max(range(first, first + self.n_children[root]), key=score)]
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the searches
+        """
+        return {
+            'nodes': len(self),
+            'playouts': self.playouts,
+            'elapsed': self.elapsed,
+            'playouts_per_sec': self.playouts / self.elapsed if self.elapsed else 0.0,
+            'inherited': self.inherited,
+            'last_inherited_fraction': self.last_inherited,
+        }
+
+
+class ValueMCTS(MCTS):
+    """
+    MCTS that evaluates the new leaves with a value function instead of random playouts.
+    The leaves are evaluated in batches: 'batch_size' leaves are selected with a virtual loss
+    on their paths (so the selections spread over the tree) and sent to the value function
+    in a single call
+    """
+
+    def __init__(self, value_func: Callable, scale: float = 10.0, batch_size: int = 8, **kwargs):
+        """
+        :param value_func: function (states, player) -> list with the value of each state for the player
+                           (e.g. evaluation.evaluate_custom_batch)
+        :param scale: values are turned into win probabilities by 1 / (1 + exp(-value / scale))
+        :param batch_size: number of leaves evaluated in each call of value_func
+        :param kwargs: arguments of MCTS
+        """
+        super().__init__(**kwargs)
+        self.value_func = value_func
+        self.scale = scale
+        self.batch_size = batch_size
+
+    def win_probability(self, value: float) -> float:
+        """
+        Converts a value of the value function into an estimate of the result (0 to 1)
+        """
+        return 1.0 / (1.0 + math.exp(max(-500.0, min(500.0, -value / self.scale))))
+
+    def run(self, root: int, state):
+        """
+        Runs the UCT iterations in batches of leaves evaluated by the value function
+        """
+        start = time.time()
+        deadline = start + self.time_budget if self.time_budget is not None else None
+        iterations = 0
+        while self.proven[root] == UNKNOWN:
+            if self.iterations is not None and iterations >= self.iterations:
+                break
+            if deadline is not None and time.time() >= deadline:
+                break
+            if self.stop is not None and self.stop.value:
+                break
+
+            leaves = []
+            for _ in range(self.batch_size):
+                if self.iterations is not None and iterations + len(leaves) >= self.iterations:
+                    break
+                node, leaf_state = self.select(root, state)
+                if leaf_state.is_terminal():  # exact result, no need to evaluate
+                    winner = leaf_state.winner()
+                    self.proven[node] = reward(winner, self.mover[node])
+                    self.backpropagate(node, root, winner)
+                    iterations += 1
+                    if self.proven[root] != UNKNOWN:
+                        break
+                    continue
+                if len(self) < self.max_nodes:
+                    node, leaf_state = self.expand(node, leaf_state)
+                self.add_virtual_loss(node, root, 1)
+                leaves.append((node, leaf_state))
+            if not leaves:
+                continue
+
+            values = self.value_func([leaf_state for _, leaf_state in leaves], state.player)
+            for (node, _), value in zip(leaves, values):
+                self.add_virtual_loss(node, root, -1)
+                self.backpropagate_value(node, root, self.win_probability(value), state.player)
+            iterations += len(leaves)
+        self.playouts += iterations
+        self.elapsed += time.time() - start
+
+
+# Parallel MCTS with worker processes (the search is pure python: threads would not help).
+# The pools are started at the first search and kept for the next moves.
+#
+# Root parallelism: each worker grows its own tree from the same state (the trees are kept
+# in the workers between moves), and the visits of the root children are summed.
+# Leaf parallelism: a single tree, and the new leaves are sent to the workers in rounds,
+# each leaf with a batch of playouts.
+
+# share of the time budget kept at the end of a root-parallel search to send back and merge
+# the trees of the workers
+MERGE_SHARE = 0.05
+
+# state of each worker process, set by _init_worker when the process starts
+_RNG = None
+_ENGINE = None
+
+
+def _init_worker(stop):
+    """
+    Initializer of the worker processes: each one needs its own random sequence
+    (a forked process would repeat the playouts of its parent)
+    :param stop: shared flag that interrupts the searches of the worker (or None)
+    """
+    global _RNG, _ENGINE
+    _RNG = random.Random()
+    _ENGINE = MCTS(time_budget=None)
+    _ENGINE.stop = stop
+
+
+def _root_job(state, deadline: float, exploration: float):
+    """
+    Job of a root-parallel worker: searches the state with the tree of the worker until the deadline
+    or the stop flag
+    :return: (pid of the worker, list of (move, visits, wins) of the root children, number of playouts)
+    """
+    _ENGINE.exploration = exploration
+    _ENGINE.time_budget = max(0.0, deadline - time.time())
+    playouts = _ENGINE.playouts
+    _ENGINE.search(state)
+    first = _ENGINE.first_child[0]
+    children = range(first, first + _ENGINE.n_children[0]) if first != -1 else ()
+    return (os.getpid(), [(_ENGINE.move[c], _ENGINE.visits[c], _ENGINE.wins[c]) for c in children],
+            _ENGINE.playouts - playouts)
+
+
+def _rollout_job(states: list, n: int) -> list:
+    """
+    Job of a leaf-parallel worker: returns, for each state, the winners of n random games from it
+    """
+    return [[random_game(state, _RNG) for _ in range(n)] for state in states]
+
+
+def start_pool(workers: int, stop=None) -> ProcessPoolExecutor:
+    """
+    Returns a pool of worker processes for the parallel searches
+    :param stop: shared flag (multiprocessing.RawValue) that interrupts the root-parallel jobs
+    """
+    return ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(stop,))
+
+
+def merge_roots(results: list) -> Tuple[dict, dict]:
+    """
+    Sums the visits and wins of each root move over the results of the root-parallel jobs.
+    A worker that ran two jobs of the same search returns its (reused) tree twice, so only
+    its result with most root visits is counted
+    :param results: list of (pid, children, playouts), as returned by _root_job
+    :return: (visits, wins) dicts indexed by the moves
+    """
+    trees = {}
+    for pid, children, _ in results:
+        if pid not in trees or sum(n for _, n, _ in children) > sum(n for _, n, _ in trees[pid]):
+            trees[pid] = children
+    visits, wins = {}, {}
+    for children in trees.values():
+        for move, n, w in children:
+            visits[move] = visits.get(move, 0) + n
+            wins[move] = wins.get(move, 0.0) + w
+    return visits, wins
+
+
+class RootParallelMCTS(object):
+    """
+    Root-parallel MCTS: the workers search the same state independently until MERGE_SHARE
+    of the time budget is left, and the move with most visits, summed over all the trees,
+    is played
+    """
+
+    def __init__(self, workers: int = None, time_budget: float = TIME_BUDGET, exploration: float = math.sqrt(2)):
+        """
+        :param workers: number of worker processes (default: the number of CPUs)
+        :param time_budget: time (in seconds) of each search
+        :param exploration: constant c of the UCT formula of the workers
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.time_budget = time_budget
+        self.exploration = exploration
+        self.pool = None
+        self.stop = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Resets the counters reported by stats()
+        """
+        self.playouts = 0
+        self.elapsed = 0.0
+
+    def shutdown(self):
+        """
+        Stops the worker processes
+        """
+        if self.pool is not None:
+            self.stop.value = 1
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def search(self, state) -> Tuple[int, int]:
+        """
+        Searches the state in all the workers and returns the move with most visits
+        """
+        if self.pool is None:
+            self.stop = multiprocessing.RawValue('b', 0)
+            self.pool = start_pool(self.workers, self.stop)
+        start = time.time()
+        deadline = start + self.time_budget
+        self.stop.value = 0
+        # the workers stop early, so that their results arrive and are merged within the budget
+        futures = [self.pool.submit(_root_job, state, deadline - MERGE_SHARE * self.time_budget, self.exploration)
+                   for _ in range(self.workers)]
+        done, pending = wait(futures, timeout=max(0.0, deadline - time.time()))
+        self.stop.value = 1     # late jobs stop at their next playout
+        for future in pending:
+            future.cancel()
+
+        results = [future.result() for future in done]
+        self.playouts += sum(playouts for _, _, playouts in results)
+        visits, wins = merge_roots(results)
+        self.elapsed += time.time() - start
+        if not visits:  # no worker answered in time
+            return min(state.legal_moves(), default=None)
+        return max(sorted(visits), key=lambda move: (visits[move], wins[move]))
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the searches (playouts of all the workers)
+        """
+        return {
+            'workers': self.workers,
+            'playouts': self.playouts,
+            'elapsed': self.elapsed,
+            'playouts_per_sec': self.playouts / self.elapsed if self.elapsed else 0.0,
+        }
+
+
+class LeafParallelMCTS(MCTS):
+    """
+    Leaf-parallel MCTS: the tree is grown in the main process in rounds. Each round selects
+    'leaves' new leaves (with a virtual loss on their paths, so the selections spread over
+    the tree), sends them to the workers in a single job per worker, where each leaf gets
+    'batch' playouts, and backpropagates all the results
+    """
+
+    def __init__(self, workers: int = None, batch: int = 4, leaves: int = None, **kwargs):
+        """
+        :param workers: number of worker processes (default: the number of CPUs)
+        :param batch: playouts of each leaf
+        :param leaves: leaves of each round (default: 4 per worker)
+        :param kwargs: arguments of MCTS
+        """
+        super().__init__(**kwargs)
+        self.workers = workers or os.cpu_count() or 1
+        self.batch = batch
+        self.leaves = leaves or 4 * self.workers
+        self.pool = None
+
+    def shutdown(self):
+        """
+        Stops the worker processes
+        """
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def run(self, root: int, state):
+        """
+        Runs rounds of leaves played out by the workers. The main process waits for a
+        round only until the deadline: the leaves of the jobs that are late are not updated.
+        With RAVE, only the moves of the tree path enter the AMAF statistics
+        (the moves of the playouts are not sent back)
+        """
+        if self.pool is None:
+            self.pool = start_pool(self.workers)
+        start = time.time()
+        deadline = start + self.time_budget if self.time_budget is not None else None
+        iterations = 0
+        while self.proven[root] == UNKNOWN:
+            if self.iterations is not None and iterations >= self.iterations:
+                break
+            if deadline is not None and time.time() >= deadline:
+                break
+
+            leaves = []
+            for _ in range(self.leaves):
+                node, leaf_state = self.select(root, state)
+                if leaf_state.is_terminal():  # exact result, no playouts needed
+                    winner = leaf_state.winner()
+                    self.proven[node] = reward(winner, self.mover[node])
+                    self.backpropagate(node, root, winner)
+                    if self.rave:
+                        self.update_amaf(node, root, winner, ())
+                    iterations += 1
+                    if self.proven[root] != UNKNOWN:
+                        break
+                    continue
+                if len(self) < self.max_nodes:
+                    node, leaf_state = self.expand(node, leaf_state)
+                self.add_virtual_loss(node, root, 1)
+                leaves.append((node, leaf_state))
+            if not leaves:
+                continue
+
+            chunks = [leaves[i::self.workers] for i in range(min(self.workers, len(leaves)))]
+            futures = [self.pool.submit(_rollout_job, [leaf_state for _, leaf_state in chunk], self.batch)
+                       for chunk in chunks]
+            timeout = max(0.0, deadline - time.time()) if deadline is not None else None
+            _, pending = wait(futures, timeout=timeout)
+            for node, _ in leaves:
+                self.add_virtual_loss(node, root, -1)
+            for chunk, future in zip(chunks, futures):
+                if future in pending:   # deadline reached: the leaves of this job get no playouts
+                    future.cancel()
+                    continue
+                for (node, _), winners in zip(chunk, future.result()):
+                    for winner in winners:
+                        self.backpropagate(node, root, winner)
+                        if self.rave:
+                            self.update_amaf(node, root, winner, ())
+                    iterations += len(winners)
+            if pending:
+                break
+        self.playouts += iterations
+        self.elapsed += time.time() - start
+
+
+# the engine (and its tree) is kept between the moves of a match.
+# RAVE with little exploration (the AMAF statistics already spread the playouts over the
+# moves) beat plain UCT in othello both with the same playouts and with the same time.
+# With several cores, RootParallelMCTS() or LeafParallelMCTS() can be used instead
+ENGINE = MCTS(exploration=0.3, rave=300)
+
 
 def make_move(state) -> Tuple[int, int]:
     """
-    Returns a move for the given game state. 
+    Returns a move for the given game state.
     The game is not specified, but this is MCTS and should handle any game, since
     their implementation has the same interface.
 
     :param state: state to make the move
     :return: (int, int) tuple with x, y coordinates of the move (remember: 0 is the first row/column)
     """
-
-    # o codigo abaixo retorna uma jogada ilegal
-    # Remova-o e coloque a sua implementacao do MCTS
-
-    return (-1, -1)
-
-
+    ENGINE.time_budget = time_budget()
+    return ENGINE.search(state)
@@ -1,8 +1,134 @@
+import os
+import math
+import time
 from typing import Tuple, Callable
 
+from ..timer import TIME_BUDGET_VAR
+from .transposition import TranspositionTable, bound_type
+from .ordering import MoveOrderer
 
+# time (seconds) the agents use to search a move when the server does not set it
+# (see time_budget), safely below the server's default delay (5s)
+TIME_BUDGET = 4.5
 
-def minimax_move(state, max_depth:int, eval_func:Callable) -> Tuple[int, int]:
+# width of the null windows of principal variation search. Evaluations may be
+# fractional, so a window of 1 (as with integer scores) could miss values
+NULL_WINDOW = 1e-6
+
+OPPONENT = {'B': 'W', 'W': 'B'}
+
+
+def time_budget() -> float:
+    """
+    Returns the time (in seconds) the agents use to search a move: the value that server.py
+    and tournament.py set from their delay (advsearch.timer.set_time_budget), or TIME_BUDGET.
+    It is read at every move, so the agents follow the delay of the match
+    """
+    return float(os.environ.get(TIME_BUDGET_VAR, TIME_BUDGET))
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when its deadline is reached
+    """
+    pass
+
+
+class SearchContext(object):
+    """
+    Optional components shared by all the nodes of a search
+    """
+    def __init__(self, tt:TranspositionTable=None, deadline:float=None, orderer:MoveOrderer=None):
+        """
+        :param tt: transposition table (the states need a key() method)
+        :param deadline: time.time() after which the search raises SearchTimeout
+        :param orderer: move ordering of the children of each node
+        """
+        self.tt = tt
+        self.orderer = orderer
+        self.deadline = deadline
+        self.nodes = 0                  # number of searched nodes
+        self.depth_limited = False      # whether some node was cut by the depth limit
+
+    def visit(self):
+        """
+        Counts a node and aborts the search if the deadline has passed
+        """
+        self.nodes += 1
+        if self.deadline is not None and time.time() >= self.deadline:
+            raise SearchTimeout()
+
+
+class AspirationWindow(object):
+    """
+    Configuration and counters of aspiration windows for iterative deepening.
+    Each depth is searched with a narrow window around the value of the previous depth
+    (or of the previous move, for the first depth). When the value falls outside the
+    window (fail-low or fail-high), the failing bound is widened and the depth is searched again.
+    """
+
+    def __init__(self, delta:float=10, growth:float=2, max_delta:float=1000):
+        """
+        :param delta: initial distance of each bound to the estimated value
+        :param growth: factor that multiplies the distance of a failing bound
+        :param max_delta: a bound that would be farther than this becomes infinite
+        """
+        self.delta = delta
+        self.growth = growth
+        self.max_delta = max_delta
+        self.last_value = None  # value of the last completed search, the estimate for the next one
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Resets the counters reported by stats()
+        """
+        self.searches = 0       # depths searched with an aspiration window
+        self.fail_lows = 0      # re-searches because the value was <= alpha
+        self.fail_highs = 0     # re-searches because the value was >= beta
+
+    def search(self, state, max_depth, eval_func:Callable, ctx:SearchContext, pvs:bool=False):
+        """
+        Searches the state with windows around last_value until the value falls inside one.
+        Without a finite estimate (e.g. the previous search found a won or lost game),
+        the full window is used
+        :return: (value, move)
+        """
+        inf = float('inf')
+        if self.last_value is None or not math.isfinite(self.last_value):
+            return search(state, -inf, inf, max_depth, eval_func, ctx, pvs)
+
+        self.searches += 1
+        low_delta = high_delta = self.delta
+        while True:
+            alfa = self.last_value - low_delta if low_delta <= self.max_delta else -inf
+            beta = self.last_value + high_delta if high_delta <= self.max_delta else inf
+            value, move = search(state, alfa, beta, max_depth, eval_func, ctx, pvs)
+            if (value <= alfa and alfa == -inf) or (value >= beta and beta == inf):
+                return value, move      # the failing bound is already infinite: the value is exact
+            if value <= alfa:
+                self.fail_lows += 1
+                low_delta *= self.growth
+            elif value >= beta:
+                self.fail_highs += 1
+                high_delta *= self.growth
+            else:
+                return value, move
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the aspiration windows
+        """
+        return {
+            'searches': self.searches,
+            'fail_lows': self.fail_lows,
+            'fail_highs': self.fail_highs,
+            'researches_per_search': (self.fail_lows + self.fail_highs) / self.searches if self.searches else 0.0,
+        }
+
+
+def minimax_move(state, max_depth:int, eval_func:Callable, tt:TranspositionTable=None,
+                 orderer:MoveOrderer=None, pvs:bool=False) -> Tuple[int, int]:
     """
     Returns a move computed by the minimax algorithm with alpha-beta pruning for the given game state.
     :param state: state to make the move (instance of GameState)
@@ -10,42 +136,309 @@ def minimax_move(state, max_depth:int, eval_func:Callable) -> Tuple[int, int]:
     :param eval_func: the function to evaluate a terminal or leaf state (when search is interrupted at max_depth)
                     This function should take a GameState object and a string identifying the player,
                     and should return a float value representing the utility of the state for the player.
+    :param tt: optional transposition table, that can be kept between calls to reuse previous searches
+    :param orderer: optional move ordering (see ordering.MoveOrderer), the children are searched in
+                    the order of state.legal_moves() otherwise
+    :param pvs: whether to use principal variation search (negascout) instead of plain alpha-beta.
+                It finds the same value, visiting less nodes when the first child is usually the best
     :return: (int, int) tuple with x, y coordinates of the move (remember: 0 is the first row/column)
     """
     if max_depth == -1:
         max_depth = float('inf')
 
-    _, a = maxGain(state, float('-inf'), float('inf'), state.player, max_depth, eval_func)
+    if tt is not None:
+        tt.new_search(state.player)
+    if orderer is not None:
+        orderer.new_search()
+
+    ctx = SearchContext(tt, orderer=orderer)
+    _, a = search(state, float('-inf'), float('inf'), max_depth, eval_func, ctx, pvs)
     return a
 
-def maxGain(state, alfa, beta, player, max_depth:int, eval_func:Callable):
-    if state.is_terminal() or max_depth == 0:
+def iterative_deepening_move(state, time_budget:float, eval_func:Callable, max_depth:int=-1,
+                             tt:TranspositionTable=None, orderer:MoveOrderer=None,
+                             pvs:bool=False, aspiration:AspirationWindow=None,
+                             info:dict=None) -> Tuple[int, int]:
+    """
+    Returns a move computed by successive alpha-beta searches with depth 1, 2, 3...
+    until the time budget is over. The move of the deepest completed search is returned:
+    a search that is still running when the deadline arrives is aborted and discarded.
+    :param state: state to make the move (instance of GameState)
+    :param time_budget: time (in seconds) to search
+    :param eval_func: the function to evaluate a terminal or leaf state (see minimax_move)
+    :param max_depth: maximum depth of search (-1 = unlimited)
+    :param tt: optional transposition table (the searches of lower depths fill it with good first moves)
+    :param orderer: optional move ordering (killers and history are kept between the depths)
+    :param pvs: whether to use principal variation search instead of plain alpha-beta
+    :param aspiration: optional aspiration windows (keep the same object between moves,
+                       so the value of the previous move estimates the first depth)
+    :param info: optional dict, filled with the 'depth' and 'value' of the deepest completed
+                 search and the 'nodes' visited by all of them
+    :return: (int, int) tuple with x, y coordinates of the move (remember: 0 is the first row/column)
+    """
+    deadline = time.time() + time_budget
+    if max_depth == -1:
+        max_depth = float('inf')
+
+    if tt is not None:
+        tt.new_search(state.player)
+    if orderer is not None:
+        orderer.new_search()
+
+    # fallback in case not even the depth-1 search completes
+    best_move = min(state.legal_moves(), default=None)
+    if info is not None:
+        info.update(depth=0, value=None, nodes=0)
+
+    depth = 1
+    while depth <= max_depth:
+        ctx = SearchContext(tt, deadline, orderer)
+        try:
+            if aspiration is not None:
+                value, move = aspiration.search(state, depth, eval_func, ctx, pvs)
+                aspiration.last_value = value
+            else:
+                value, move = search(state, float('-inf'), float('inf'), depth, eval_func, ctx, pvs)
+        except SearchTimeout:
+            if info is not None:
+                info['nodes'] += ctx.nodes
+            break
+        best_move = move
+        if info is not None:
+            info.update(depth=depth, value=value, nodes=info['nodes'] + ctx.nodes)
+
+        if not ctx.depth_limited:  # the whole game tree was searched, deeper searches are useless
+            break
+        depth += 1
+
+    return best_move
+
+def search(state, alfa, beta, max_depth, eval_func:Callable, ctx:SearchContext, pvs:bool=False):
+    """
+    Searches the state for its player to move with the chosen algorithm
+    :return: (value, move)
+    """
+    if pvs:
+        return negascout(state, alfa, beta, state.player, state.player, max_depth, eval_func, ctx)
+    return maxGain(state, alfa, beta, state.player, max_depth, eval_func, ctx)
+
+def next_gain(state, player) -> Callable:
+    """
+    Returns the function that searches a child state: maxGain if the player is
+    to move in it (e.g. the opponent had to pass), minGain otherwise
+    """
+    return maxGain if state.player == player else minGain
+
+def ordered(moves, first):
+    """
+    Returns the moves with 'first' (e.g. the best move stored in the transposition table) in front
+    """
+    if first is None or first not in moves:
+        return moves
+    return [first] + [move for move in moves if move != first]
+
+def child_order(state, ply:int, tt_move, ctx:SearchContext):
+    """
+    Returns the moves of the state in the order they must be searched
+    """
+    if ctx is not None and ctx.orderer is not None:
+        return ctx.orderer.order(state, state.legal_moves(), ply, tt_move)
+    return ordered(state.legal_moves(), tt_move)
+
+def play(state, move):
+    """
+    Returns the child of the state reached by the move. A state with make_move (othello)
+    is changed in-place, without creating a board, and must be restored with undo(state, child);
+    the other ones (e.g. tic-tac-toe misere) return a new state made by next_state
+    """
+    if hasattr(state, 'make_move'):
+        state.make_move(move)
+        return state
+    return state.next_state(move)
+
+def undo(state, child):
+    """
+    Reverts play(state, move), returning 'state' to the position it had before it
+    """
+    if child is state:
+        state.unmake_move()
+
+def maxGain(state, alfa, beta, player, max_depth:int, eval_func:Callable, ctx:SearchContext=None, ply:int=0):
+    if ctx is not None:
+        ctx.visit()
+    if state.is_terminal():
         return eval_func(state, player), None
+    if max_depth == 0:
+        if ctx is not None:
+            ctx.depth_limited = True
+        return eval_func(state, player), None
+
+    tt = ctx.tt if ctx is not None else None
+    tt_move = None
+    if tt is not None:
+        key = state.key()
+        alfa_orig, beta_orig = alfa, beta
+        value, alfa, beta, tt_move, tt_depth = tt.lookup(key, max_depth, alfa, beta)
+        if value is not None and tt_move in state.legal_moves():
+            if tt_depth != float('inf'):
+                ctx.depth_limited = True
+            return value, tt_move
+        # tracks whether this subtree is cut by the depth limit
+        outer_limited, ctx.depth_limited = ctx.depth_limited, False
+
     v = float('-inf')
     a = None
-    for action in state.legal_moves():
-        new_state = state.next_state(action)
-        val, _ = minGain(new_state, alfa, beta, player, max_depth-1, eval_func)
+    moves = child_order(state, ply, tt_move, ctx)
+    for i, action in enumerate(moves):
+        new_state = play(state, action)
+        try:
+            val, _ = next_gain(new_state, player)(new_state, alfa, beta, player, max_depth-1, eval_func, ctx, ply+1)
+        finally:    # also when the deadline interrupts the search
+            undo(state, new_state)
         if val > v:
             v = val
             a = action
         alfa = max(alfa, v)
         if beta <= alfa:
+            if ctx is not None and ctx.orderer is not None:
+                ctx.orderer.cutoff(state, action, ply, max_depth, i)
             break
+
+    if tt is not None:
+        # a subtree searched until the end of the game has the same value for any depth
+        tt_depth = max_depth if ctx.depth_limited else float('inf')
+        tt.store(key, tt_depth, v, bound_type(v, alfa_orig, beta_orig), a)
+        ctx.depth_limited = ctx.depth_limited or outer_limited
     return v, a
 
-def minGain(state, alfa, beta, player, max_depth:int, eval_func:Callable):
-    if state.is_terminal() or max_depth == 0:
+def minGain(state, alfa, beta, player, max_depth:int, eval_func:Callable, ctx:SearchContext=None, ply:int=0):
+    if ctx is not None:
+        ctx.visit()
+    if state.is_terminal():
+        return eval_func(state, player), None
+    if max_depth == 0:
+        if ctx is not None:
+            ctx.depth_limited = True
         return eval_func(state, player), None
+
+    tt = ctx.tt if ctx is not None else None
+    tt_move = None
+    if tt is not None:
+        key = state.key()
+        alfa_orig, beta_orig = alfa, beta
+        value, alfa, beta, tt_move, tt_depth = tt.lookup(key, max_depth, alfa, beta)
+        if value is not None and tt_move in state.legal_moves():
+            if tt_depth != float('inf'):
+                ctx.depth_limited = True
+            return value, tt_move
+        # tracks whether this subtree is cut by the depth limit
+        outer_limited, ctx.depth_limited = ctx.depth_limited, False
+
     v = float('inf')
     a = None
-    for action in state.legal_moves():
-        new_state = state.next_state(action)
-        val, _ = maxGain(new_state, alfa, beta, player, max_depth-1, eval_func)
+    moves = child_order(state, ply, tt_move, ctx)
+    for i, action in enumerate(moves):
+        new_state = play(state, action)
+        try:
+            val, _ = next_gain(new_state, player)(new_state, alfa, beta, player, max_depth-1, eval_func, ctx, ply+1)
+        finally:    # also when the deadline interrupts the search
+            undo(state, new_state)
         if val < v:
             v = val
             a = action
         beta = min(beta, v)
         if beta <= alfa:
+            if ctx is not None and ctx.orderer is not None:
+                ctx.orderer.cutoff(state, action, ply, max_depth, i)
             break
+
+    if tt is not None:
+        # a subtree searched until the end of the game has the same value for any depth
+        tt_depth = max_depth if ctx.depth_limited else float('inf')
+        tt.store(key, tt_depth, v, bound_type(v, alfa_orig, beta_orig), a)
+        ctx.depth_limited = ctx.depth_limited or outer_limited
+    return v, a
+
+def negascout(state, alfa, beta, side, player, max_depth:int, eval_func:Callable, ctx:SearchContext=None, ply:int=0):
+    """
+    Principal variation search in the negamax formulation: returns the value of the state
+    for 'side' (the player to move in it, or the last to move if it is terminal).
+    The first child is searched with the full window and the others with a null window
+    that only tells whether they are better than the best so far; they are searched again
+    with the full window when that happens.
+    Leaves are evaluated for the player of the root and negated for the other side,
+    so the search agrees with maxGain/minGain for any evaluation function.
+    """
+    if ctx is not None:
+        ctx.visit()
+    sign = 1 if side == player else -1
+    if state.is_terminal():
+        return sign * eval_func(state, player), None
+    if max_depth == 0:
+        if ctx is not None:
+            ctx.depth_limited = True
+        return sign * eval_func(state, player), None
+
+    tt = ctx.tt if ctx is not None else None
+    tt_move = None
+    if tt is not None:
+        # the table keeps values for the root player: converts the window and the value
+        key = state.key()
+        alfa_orig, beta_orig = alfa, beta
+        if sign == 1:
+            value, alfa, beta, tt_move, tt_depth = tt.lookup(key, max_depth, alfa, beta)
+        else:
+            value, low, high, tt_move, tt_depth = tt.lookup(key, max_depth, -beta, -alfa)
+            alfa, beta = -high, -low
+        if value is not None and tt_move in state.legal_moves():
+            if tt_depth != float('inf'):
+                ctx.depth_limited = True
+            return sign * value, tt_move
+        # tracks whether this subtree is cut by the depth limit
+        outer_limited, ctx.depth_limited = ctx.depth_limited, False
+
+    v = float('-inf')
+    a = None
+    moves = child_order(state, ply, tt_move, ctx)
+    for i, action in enumerate(moves):
+        new_state = play(state, action)
+        if new_state.player == side:   # the opponent passed, same side to move
+            child_side, child_sign = side, 1
+        else:
+            child_side, child_sign = OPPONENT[side], -1
+
+        def child_value(low, high):
+            if child_sign == 1:
+                val, _ = negascout(new_state, low, high, child_side, player, max_depth-1, eval_func, ctx, ply+1)
+                return val
+            val, _ = negascout(new_state, -high, -low, child_side, player, max_depth-1, eval_func, ctx, ply+1)
+            return -val
+
+        try:
+            if i == 0:
+                val = child_value(alfa, beta)
+            else:
+                val = child_value(alfa, alfa + NULL_WINDOW)
+                if alfa < val < beta:   # better than the best so far: searches again for the exact value
+                    val = child_value(val, beta)
+        finally:    # also when the deadline interrupts the search
+            undo(state, new_state)
+
+        if val > v:
+            v = val
+            a = action
+        alfa = max(alfa, v)
+        if beta <= alfa:
+            if ctx is not None and ctx.orderer is not None:
+                ctx.orderer.cutoff(state, action, ply, max_depth, i)
+            break
+
+    if tt is not None:
+        # a subtree searched until the end of the game has the same value for any depth
+        tt_depth = max_depth if ctx.depth_limited else float('inf')
+        if sign == 1:
+            tt.store(key, tt_depth, v, bound_type(v, alfa_orig, beta_orig), a)
+        else:
+            tt.store(key, tt_depth, -v, bound_type(-v, -beta_orig, -alfa_orig), a)
+        ctx.depth_limited = ctx.depth_limited or outer_limited
     return v, a
@@ -0,0 +1,120 @@
+from collections import defaultdict
+from typing import Callable, Iterable
+
+
+def positional_prior(template) -> Callable:
+    """
+    Returns a prior function that values a move by the weight of its square in the
+    given 8x8 template (e.g. EVAL_TEMPLATE of othello_minimax_mask), indexed by [row][col]
+    """
+    def prior(state, move) -> float:
+        x, y = move
+        return template[y][x]
+    return prior
+
+
+class MoveOrderer(object):
+    """
+    Orders the children of a node to make alpha-beta prune as early as possible.
+    The moves are sorted by:
+    1. the best move stored in the transposition table (if any)
+    2. the killer moves of the ply (moves that recently caused a cutoff in sibling nodes)
+    3. the history heuristic (how often and how deep the move caused cutoffs
+       for the player) plus the static prior of the move (e.g. a positional template)
+    Each ingredient can be disabled, and the orderer counts how many cutoffs were
+    produced by the first child, which measures the quality of the ordering.
+    """
+
+    MAX_HISTORY_DEPTH = 32  # caps the history bonus of unlimited-depth searches
+
+    def __init__(self, prior:Callable=None, n_killers:int=2, history:bool=True):
+        """
+        :param prior: function (state, move) -> float with the static value of the move for the player to move
+        :param n_killers: number of killer moves kept per ply (0 disables killers)
+        :param history: whether to use the history heuristic
+        """
+        self.prior = prior
+        self.n_killers = n_killers
+        self.use_history = history
+        self.killers = defaultdict(list)    # ply -> killer moves, most recent first
+        self.history = defaultdict(int)     # (player, move) -> score
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Resets the counters reported by stats()
+        """
+        self.nodes = 0              # ordered nodes
+        self.cutoffs = 0            # nodes that were pruned
+        self.first_cutoffs = 0      # nodes that were pruned by the first child
+
+    def new_search(self):
+        """
+        Must be called before each search: killers are forgotten (plies have new meaning)
+        and the history is aged, so that old cutoffs weigh less than new ones
+        """
+        self.killers.clear()
+        for key in self.history:
+            self.history[key] //= 2
+
+    def order(self, state, moves:Iterable, ply:int, tt_move=None) -> list:
+        """
+        Returns the moves sorted from the most to the least promising
+        :param state: state whose moves are ordered
+        :param moves: legal moves of the state
+        :param ply: distance from the root of the search
+        :param tt_move: best move stored in the transposition table (or None)
+        """
+        self.nodes += 1
+        killers = self.killers[ply] if self.n_killers else ()
+        player = state.player
+        history = self.history
+        prior = self.prior
+
+        def score(move):
+            value = 0
+            if self.use_history:
+                value += history[(player, move)]
+            if prior is not None:
+                value += prior(state, move)
+            return (
+                move == tt_move,
+                len(killers) - killers.index(move) if move in killers else 0,
+                value,
+            )
+        return sorted(moves, key=score, reverse=True)
+
+    def cutoff(self, state, move, ply:int, depth:float, index:int):
+        """
+        Records that a move caused a cutoff
+        :param state: state where the cutoff happened
+        :param move: move that caused it
+        :param ply: distance from the root of the search
+        :param depth: remaining depth of the node
+        :param index: position of the move in the ordered list (0 = first child)
+        """
+        self.cutoffs += 1
+        if index == 0:
+            self.first_cutoffs += 1
+
+        if self.n_killers:
+            killers = self.killers[ply]
+            if move in killers:
+                killers.remove(move)
+            killers.insert(0, move)
+            del killers[self.n_killers:]
+
+        if self.use_history:
+            depth = min(depth, self.MAX_HISTORY_DEPTH)
+            self.history[(state.player, move)] += depth * depth
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the orderer
+        """
+        return {
+            'nodes': self.nodes,
+            'cutoffs': self.cutoffs,
+            'first_cutoffs': self.first_cutoffs,
+            'first_cutoff_rate': self.first_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+        }
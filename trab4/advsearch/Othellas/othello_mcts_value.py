@@ -0,0 +1,30 @@
+from typing import Tuple
+from ..othello.gamestate import GameState
+from ..othello.bitboard import BitBoard
+from .mcts import ValueMCTS
+from .minimax import time_budget
+from .evaluation import evaluate_custom_batch
+
+# Voce pode criar funcoes auxiliares neste arquivo
+# e tambem modulos auxiliares neste pacote.
+#
+# Nao esqueca de renomear 'your_agent' com o nome
+# do seu agente.
+
+# MCTS that evaluates its leaves with evaluate_custom (computed on the bitboards, in batches
+# of leaves) instead of random playouts. The engine keeps its tree between the moves of a match.
+# advsearch/Othellas/mcts.py is the same search with random playouts. Against it, in 10 matches
+# with delay 1s (python tournament.py othello ... -d 1 -r 5): 5 wins and 5 losses, -12 discs.
+ENGINE = ValueMCTS(evaluate_custom_batch)
+
+
+def make_move(state) -> Tuple[int, int]:
+    """
+    Returns a move for the given game state
+    :param state: state to make the move
+    :return: (int, int) tuple with x, y coordinates of the move (remember: 0 is the first row/column)
+    """
+    # searches on a bitboard copy of the received state (same interface, much faster)
+    state = GameState(BitBoard.from_board(state.get_board()), state.player)
+    ENGINE.time_budget = time_budget()
+    return ENGINE.search(state)
@@ -2,7 +2,9 @@ import random
 from typing import Tuple
 from ..othello.gamestate import GameState
 from ..othello.board import Board
-from .minimax import minimax_move
+from ..othello.bitboard import BitBoard
+from .minimax import iterative_deepening_move, time_budget
+from .evaluation import evaluate_custom_bits
 
 # Voce pode criar funcoes auxiliares neste arquivo
 # e tambem modulos auxiliares neste pacote.
@@ -23,7 +25,10 @@ def make_move(state) -> Tuple[int, int]:
     # Remova-o e coloque uma chamada para o minimax_move (que vc implementara' no modulo minimax).
     # A chamada a minimax_move deve receber sua funcao evaluate como parametro.
 
-    return minimax_move(state, 4, evaluate_custom)
+    # searches on a bitboard copy of the received state (same interface, much faster)
+    # evaluate_custom_bits gives the same values as evaluate_custom, computed on the bitboards
+    state = GameState(BitBoard.from_board(state.get_board()), state.player)
+    return iterative_deepening_move(state, time_budget(), evaluate_custom_bits)
 
 ''' 
     ## Source
@@ -43,6 +48,9 @@ def evaluate_custom(state, player:str) -> float:
     :param state: state to evaluate (instance of GameState)
     :param player: player to evaluate the state for (B or W)
     """
+    board = state.get_board()
+    opponent = Board.opponent(player)
+
     # Initialization 
     player_score = 0
     opponent_score = 0
@@ -51,69 +59,49 @@ def evaluate_custom(state, player:str) -> float:
     corners = [(0, 0), (0, 7), (7, 0), (7, 7)]
     corner_weight = 30
     for i, j in corners:
-        if state.get_board().tiles[i][j] == player:
+        if board.tiles[i][j] == player:
             player_score += corner_weight
-        elif state.get_board().tiles[i][j] == Board.opponent(player):
+        elif board.tiles[i][j] == opponent:
             opponent_score += corner_weight
 
     # Edge and stability evaluation
+    # (stable discs come from the stability analysis of the bitboard, cached until the next move)
+    stable = stable_discs(board)
     stability_score = 0
     edge_weight = 10
     stability_weight = 30
     for i in range(8):
         for j in range(8):
-            if state.get_board().tiles[i][j] == player:
-                if is_stable(state, i, j, player):
+            if board.tiles[i][j] == player:
+                if stable[player] >> (i * 8 + j) & 1:
                     stability_score += stability_weight
                 elif (i == 0 or i == 7 or j == 0 or j == 7):
                     player_score += edge_weight
-            elif state.get_board().tiles[i][j] == Board.opponent(player):
-                if is_stable(state, i, j, Board.opponent(player)):
+            elif board.tiles[i][j] == opponent:
+                if stable[opponent] >> (i * 8 + j) & 1:
                     stability_score -= stability_weight
                 elif (i == 0 or i == 7 or j == 0 or j == 7):
                     opponent_score += edge_weight
 
     # Mobility evaluation
     mobility_weight = 15
-    player_mobility = len(state.get_board().legal_moves(player))
-    opponent_mobility = len(state.get_board().legal_moves(Board.opponent(player)))
+    player_mobility = len(board.legal_moves(player))
+    opponent_mobility = len(board.legal_moves(opponent))
     mobility_score = mobility_weight * (player_mobility - opponent_mobility)
 
     # Parity evaluation
     parity_weight = 15
-    parity_score = parity_weight * (state.get_board().num_pieces(player) - state.get_board().num_pieces(Board.opponent(player)))/(state.get_board().num_pieces(player) + state.get_board().num_pieces(Board.opponent(player)))
+    parity_score = parity_weight * (board.num_pieces(player) - board.num_pieces(opponent))/(board.num_pieces(player) + board.num_pieces(opponent))
 
     # Sum of all factors
     total_score = player_score - opponent_score + stability_score + mobility_score + parity_score
 
     return total_score
 
-def is_stable(state, x, y, player):
+def stable_discs(board) -> dict:
     """
-    Determines if a piece at position (x, y) is stable.
-
-    The stability measure of a coin is a quantitative representation 
-    of how vulnerable it is to being flanked. Stable coins are coins which
-    cannot be flanked at any point of time in the
-    game from the given state. 
+    Returns a dict color -> bitmask of the stable discs of that color (discs that can
+    never be flipped), bit i*8+j being the tile in row i, column j.
+    The analysis is cached by the board until the next move (see Board.stable_bits and BitBoard.stable_bits).
     """
-
-    '''
-    Corners are always stable in nature, and as you build upon
-    corners, more coins become stable in the region. 
-    '''
-    if (x == 0 or x == 7) and (y == 0 or y == 7):
-        return True  
-    
-    # Checking stability at the edges
-    stable = True
-    # Directions: right, down, left, up
-    directions = [(0, 1), (1, 0), (0, -1), (-1, 0)] 
-    for dx, dy in directions:
-        tx, ty = x + dx, y + dy
-        if 0 <= tx < 8 and 0 <= ty < 8:
-            if state.get_board().tiles[tx][ty] != player:
-                stable = False
-                break
-    return stable
-
+    return {color: board.stable_bits(color) for color in (Board.BLACK, Board.WHITE)}
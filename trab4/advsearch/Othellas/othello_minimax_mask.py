@@ -2,7 +2,8 @@ import random
 from typing import Tuple
 from ..othello.gamestate import GameState
 from ..othello.board import Board
-from .minimax import minimax_move
+from ..othello.bitboard import BitBoard
+from .minimax import iterative_deepening_move, time_budget
 
 # Voce pode criar funcoes auxiliares neste arquivo
 # e tambem modulos auxiliares neste pacote.
@@ -37,7 +38,9 @@ def make_move(state) -> Tuple[int, int]:
     # Remova-o e coloque uma chamada para o minimax_move (que vc implementara' no modulo minimax).
     # A chamada a minimax_move deve receber sua funcao evaluate como parametro.
 
-    return minimax_move(state, 4, evaluate_mask)
+    # searches on a bitboard copy of the received state (same interface, much faster)
+    state = GameState(BitBoard.from_board(state.get_board()), state.player)
+    return iterative_deepening_move(state, time_budget(), evaluate_mask)
 
 
 def evaluate_mask(state, player:str) -> float:
@@ -0,0 +1,211 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Tuple, Callable
+
+from .minimax import SearchContext, SearchTimeout, NULL_WINDOW, OPPONENT, next_gain, negascout
+from .transposition import TranspositionTable
+from .ordering import MoveOrderer, positional_prior
+from .othello_minimax_mask import EVAL_TEMPLATE
+
+# Root splitting: the children of the root are searched in parallel by a pool of
+# worker processes (threads would not help, the search is pure python and holds the GIL).
+# The best value found so far at the root (alpha) lives in shared memory: each worker
+# publishes the values it finds and every child starts its search with the best one,
+# so the later children are pruned as much as in the sequential search.
+#
+# The workers keep their own transposition table and move orderer between jobs, and the
+# pool is kept between moves, so the processes are started only once per match.
+
+# state of each worker process, set by _init_worker when the process starts
+_ALPHA = None       # shared best root value of the current depth (multiprocessing.Value)
+_TT = None
+_ORDERER = None
+_EVAL = None        # evaluation function of the values in _TT
+
+
+def _init_worker(alpha, tt_entries: int):
+    """
+    Initializer of the worker processes
+    :param alpha: shared multiprocessing.Value with the best root value
+    :param tt_entries: size of the transposition table of the worker (0 = no table)
+    """
+    global _ALPHA, _TT, _ORDERER
+    _ALPHA = alpha
+    _TT = TranspositionTable(tt_entries) if tt_entries else None
+    _ORDERER = MoveOrderer(prior=positional_prior(EVAL_TEMPLATE))
+
+
+def child_value(child, alpha: float, beta: float, player: str, depth: int, eval_func: Callable,
+                ctx: SearchContext, pvs: bool) -> float:
+    """
+    Searches a child of the root and returns its value for the root player
+    """
+    if not pvs:
+        value, _ = next_gain(child, player)(child, alpha, beta, player, depth, eval_func, ctx, 1)
+        return value
+    if child.player == player:  # the opponent passed
+        value, _ = negascout(child, alpha, beta, player, player, depth, eval_func, ctx, 1)
+        return value
+    value, _ = negascout(child, -beta, -alpha, OPPONENT[player], player, depth, eval_func, ctx, 1)
+    return -value
+
+
+def _search_child(state, index: int, move, depth: int, eval_func: Callable, deadline: float, pvs: bool):
+    """
+    Job of a worker: searches the child of the root reached by 'move' with the depth
+    left after the root move, starting from the best root value published so far.
+    :return: (index, value, alpha, nodes, depth_limited). value is None if the deadline
+             was reached; a value <= alpha is only an upper bound (the child is worse than another one)
+    """
+    global _EVAL
+    # slightly below the shared value, so a child as good as the best one gets its exact value
+    # (the ties are then broken by the order of the moves, not by the order the jobs finish)
+    alpha = _ALPHA.value - NULL_WINDOW
+    if _TT is not None:
+        if eval_func is not _EVAL:  # the stored values came from another evaluation
+            _TT.clear()
+            _EVAL = eval_func
+        _TT.new_search(state.player)
+    _ORDERER.new_search()
+
+    ctx = SearchContext(_TT, deadline, _ORDERER)
+    try:
+        value = child_value(state.next_state(move), alpha, float('inf'), state.player,
+                            depth - 1, eval_func, ctx, pvs)
+    except SearchTimeout:
+        return index, None, alpha, ctx.nodes, True
+
+    with _ALPHA.get_lock():
+        if value > _ALPHA.value:
+            _ALPHA.value = value
+    return index, value, alpha, ctx.nodes, ctx.depth_limited
+
+
+class RootSplitSearch(object):
+    """
+    Iterative deepening whose depths are searched by splitting the root moves among a pool
+    of worker processes. The pool is started at the first search and reused by the next ones;
+    call shutdown() to stop it.
+
+    The result of a depth does not depend on the order the jobs finish: the move with the
+    highest exact value is chosen and ties go to the move that comes first in the order of the
+    depth (the best move of the previous depth, then the moves sorted by coordinates).
+    """
+
+    def __init__(self, workers: int = None, tt_entries: int = 2 ** 16):
+        """
+        :param workers: number of worker processes (default: the number of CPUs)
+        :param tt_entries: size of the transposition table of each worker
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.tt_entries = tt_entries
+        self.alpha = None
+        self.pool = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Resets the counters reported by stats()
+        """
+        self.searches = 0   # completed depths
+        self.jobs = 0       # root children searched by the workers
+        self.nodes = 0      # nodes visited by the workers
+
+    def start(self):
+        """
+        Starts the worker processes (if they are not running yet)
+        """
+        if self.pool is None:
+            self.alpha = multiprocessing.Value('d', float('-inf'))
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                            initargs=(self.alpha, self.tt_entries))
+
+    def shutdown(self):
+        """
+        Stops the worker processes
+        """
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def search_depth(self, state, moves: list, depth: int, eval_func: Callable,
+                     deadline: float, pvs: bool = False) -> Tuple[float, Tuple[int, int], bool]:
+        """
+        Searches all the root moves with the given depth in the workers.
+        Raises SearchTimeout if some of them did not finish before the deadline.
+        :param moves: root moves, in the order that breaks ties
+        :return: (value, move, depth_limited)
+        """
+        self.start()
+        with self.alpha.get_lock():
+            self.alpha.value = float('-inf')
+        futures = [self.pool.submit(_search_child, state, i, move, depth, eval_func, deadline, pvs)
+                   for i, move in enumerate(moves)]
+        done, pending = wait(futures, timeout=max(0.0, deadline - time.time()))
+        for future in pending:
+            future.cancel()     # jobs already running stop by themselves at the deadline
+
+        results = [future.result() for future in done]
+        self.jobs += len(results)
+        self.nodes += sum(nodes for _, _, _, nodes, _ in results)
+        if pending or any(value is None for _, value, _, _, _ in results):
+            raise SearchTimeout()
+
+        best_index, best_value = None, float('-inf')
+        for index, value, alpha, _, _ in sorted(results):
+            # a value <= alpha is a bound: the child was worse than one already finished
+            if value > alpha and (best_index is None or value > best_value):
+                best_index, best_value = index, value
+        self.searches += 1
+        return best_value, moves[best_index], any(limited for _, _, _, _, limited in results)
+
+    def iterative_deepening_move(self, state, time_budget: float, eval_func: Callable, max_depth: int = -1,
+                                 pvs: bool = False, info: dict = None) -> Tuple[int, int]:
+        """
+        Same as minimax.iterative_deepening_move, with each depth searched by the workers.
+        The evaluation function must be picklable (a function defined at module level).
+        :param state: state to make the move (instance of GameState)
+        :param time_budget: time (in seconds) to search
+        :param eval_func: the function to evaluate a terminal or leaf state
+        :param max_depth: maximum depth of search (-1 = unlimited)
+        :param pvs: whether the workers use principal variation search
+        :param info: optional dict, filled with the 'depth' and 'value' of the deepest completed search
+        :return: (int, int) tuple with x, y coordinates of the move (remember: 0 is the first row/column)
+        """
+        deadline = time.time() + time_budget
+        if max_depth == -1:
+            max_depth = float('inf')
+
+        moves = sorted(state.legal_moves())
+        best_move = moves[0] if moves else None
+        if info is not None:
+            info.update(depth=0, value=None)
+        if len(moves) <= 1:
+            return best_move
+
+        depth = 1
+        while depth <= max_depth:
+            order = [best_move] + [move for move in moves if move != best_move]
+            try:
+                value, best_move, depth_limited = self.search_depth(state, order, depth, eval_func, deadline, pvs)
+            except SearchTimeout:
+                break
+            if info is not None:
+                info.update(depth=depth, value=value)
+            if not depth_limited:
+                break
+            depth += 1
+        return best_move
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the searches
+        """
+        return {
+            'workers': self.workers,
+            'searches': self.searches,
+            'jobs': self.jobs,
+            'nodes': self.nodes,
+        }
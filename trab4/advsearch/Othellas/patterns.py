@@ -0,0 +1,233 @@
+import os
+import sys
+import random
+import struct
+import argparse
+from array import array
+from typing import Tuple
+
+from .evaluation import position_bits
+from ..othello.bitboard import BitBoard, popcount, FULL, flip_vertical, mirror_horizontal, transpose
+from ..othello.gamestate import GameState
+
+# N-tuple (pattern) evaluation: the board is read through a set of lines and regions
+# (edges, rows, diagonals, 3x3 corners) in its 4 rotations. The content of each
+# pattern is encoded in base 3 (0 = empty, 1 = own piece, 2 = opponent piece) and
+# indexes a table of weights, one table per pattern family and game stage.
+# The value of a position is the sum of the weights found (plus a bias per stage).
+#
+# The weights are fitted offline from game records with
+#   python -m advsearch.Othellas.patterns history1.txt history2.txt ...
+# and stored in WEIGHTS_FILE, which is loaded once, when this module is imported.
+# No weights file is shipped: until one is trained, WEIGHTS_LOADED is False,
+# evaluate_patterns cannot be used and the tournament agent uses evaluate_custom.
+
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'patterns.bin')
+MAGIC = b'NTUP'
+HEADER = struct.Struct('<4sII')     # magic, version, number of stages
+VERSION = 1
+
+# TERNARY[bits]: base-3 number with a 1 in the digits of the set bits (the own pieces of a pattern)
+TERNARY = tuple(sum(3 ** i for i in range(9) if bits >> i & 1) for bits in range(512))
+
+# multiplying a bitboard with at most one bit per column by this constant
+# gathers its bits in the top byte (bit x of the byte = column x)
+COLLECT_COLUMNS = 0x0101010101010101
+
+
+def diagonal_mask(x0: int, y0: int) -> int:
+    """
+    Returns the squares of the diagonal that goes from (x0, y0) down and to the right
+    """
+    mask = 0
+    x, y = x0, y0
+    while x < 8 and y < 8:
+        mask |= 1 << (y * 8 + x)
+        x, y = x + 1, y + 1
+    return mask
+
+
+# (name, number of squares) of each pattern family, in the order of the weight tables
+FAMILIES = (
+    ('edge', 8), ('row2', 8), ('row3', 8), ('row4', 8), ('corner3x3', 9),
+    ('diag8', 8), ('diag7', 7), ('diag6', 6), ('diag5', 5), ('diag4', 4),
+)
+OFFSETS = {}
+_offset = 0
+for _name, _size in FAMILIES:
+    OFFSETS[_name] = _offset
+    _offset += 3 ** _size
+BIAS = _offset                  # index of the bias weight of the stage
+STAGE_SIZE = _offset + 1        # number of weights of each stage
+
+# (offset of the table, mask, shift) of the diagonals: the diagonals above the main one start
+# in column k of the first row (shift k drops the empty columns of the gathered byte),
+# the ones below start in row k of the first column
+DIAGONALS = tuple(
+    (OFFSETS['diag%d' % (8 - k)], diagonal_mask(x0, y0), x0)
+    for k in range(5) for x0, y0 in sorted({(k, 0), (0, k)})
+)
+
+def rotations(bits: int) -> Tuple[int, int, int, int]:
+    """
+    Returns the bitboard rotated by 0, 90, 180 and 270 degrees
+    """
+    t = transpose(bits)
+    return bits, flip_vertical(t), flip_vertical(mirror_horizontal(bits)), mirror_horizontal(t)
+
+
+def stage_of(n_pieces: int, n_stages: int) -> int:
+    """
+    Returns the game stage (0 to n_stages-1) of a position with the given number of pieces
+    """
+    return min(n_stages - 1, (n_pieces - 4) * n_stages // 61)
+
+
+def feature_indices(own: int, opp: int, base: int = 0) -> list:
+    """
+    Returns the indices of the weights of all the patterns of the position
+    (the bias included), from the point of view of the player that owns 'own'
+    :param own: pieces of the player
+    :param opp: pieces of the opponent
+    :param base: index of the first weight of the stage of the position
+    """
+    indices = [base + BIAS]
+    append = indices.append
+    edge, row2, row3, row4 = (base + OFFSETS[name] for name in ('edge', 'row2', 'row3', 'row4'))
+    corner = base + OFFSETS['corner3x3']
+    for own_r, opp_r in zip(rotations(own), rotations(opp)):
+        append(edge + TERNARY[own_r & 0xFF] + 2 * TERNARY[opp_r & 0xFF])
+        append(row2 + TERNARY[own_r >> 8 & 0xFF] + 2 * TERNARY[opp_r >> 8 & 0xFF])
+        append(row3 + TERNARY[own_r >> 16 & 0xFF] + 2 * TERNARY[opp_r >> 16 & 0xFF])
+        append(row4 + TERNARY[own_r >> 24 & 0xFF] + 2 * TERNARY[opp_r >> 24 & 0xFF])
+        append(corner
+               + TERNARY[(own_r & 7) | (own_r >> 5 & 0x38) | (own_r >> 10 & 0x1C0)]
+               + 2 * TERNARY[(opp_r & 7) | (opp_r >> 5 & 0x38) | (opp_r >> 10 & 0x1C0)])
+        for offset, mask, shift in DIAGONALS:
+            own_d = ((own_r & mask) * COLLECT_COLUMNS & FULL) >> (56 + shift)
+            opp_d = ((opp_r & mask) * COLLECT_COLUMNS & FULL) >> (56 + shift)
+            append(base + offset + TERNARY[own_d] + 2 * TERNARY[opp_d])
+    return indices
+
+
+def load_weights(path: str) -> Tuple[array, int]:
+    """
+    Reads a weights file written by save_weights
+    :return: (weights, number of stages), or (None, 0) if the file does not exist
+    """
+    if not os.path.exists(path):
+        return None, 0
+    with open(path, 'rb') as f:
+        magic, version, n_stages = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('%s is not a pattern weights file (version %d)' % (path, VERSION))
+        weights = array('f')
+        weights.fromfile(f, n_stages * STAGE_SIZE)
+    if sys.byteorder != 'little':
+        weights.byteswap()
+    return weights, n_stages
+
+
+def save_weights(path: str, weights, n_stages: int):
+    """
+    Writes the weights (n_stages * STAGE_SIZE values) as little-endian 32-bit floats after a small header
+    """
+    data = array('f', weights)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, n_stages))
+        data.tofile(f)
+
+
+WEIGHTS, N_STAGES = load_weights(WEIGHTS_FILE)
+WEIGHTS_LOADED = WEIGHTS is not None
+
+
+def evaluate_patterns(state, player: str) -> float:
+    """
+    Evaluates an othello state from the point of view of the given player with the
+    pattern weights (an estimate of the final disc differential).
+    Raises ValueError if no weights file was found (see WEIGHTS_LOADED).
+    :param state: state to evaluate (instance of GameState)
+    :param player: player to evaluate the state for (B or W)
+    """
+    if not WEIGHTS_LOADED:
+        raise ValueError('No pattern weights: train them into %s first' % WEIGHTS_FILE)
+    _, own, opp = position_bits(state, player)
+    weights = WEIGHTS
+    base = stage_of(popcount(own | opp), N_STAGES) * STAGE_SIZE
+    return sum([weights[i] for i in feature_indices(own, opp, base)])
+
+
+def read_history(path: str) -> list:
+    """
+    Replays a game record written by server.py (one 'x,y,color' line per move)
+    and returns its positions as (black pieces, white pieces) bitboards, with the final
+    disc differential (black - white). Illegal moves are skipped, like the server does.
+    :return: (list of (int, int), int)
+    """
+    state = GameState(BitBoard(), 'B')
+    positions = [state.board.bits('B')]
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            x, y, color = line.strip().split(',')
+            move = (int(x), int(y))
+            if color == state.player and state.is_legal_move(move):
+                state = state.next_state(move)
+                positions.append(state.board.bits('B'))
+    board = state.board
+    return positions, board.num_pieces('B') - board.num_pieces('W')
+
+
+def train(paths: list, n_stages: int = 4, epochs: int = 20, learning_rate: float = 0.005,
+          seed: int = 0, log=print) -> array:
+    """
+    Fits the weights by stochastic gradient descent on the squared error between the value
+    of each position of the records and the final disc differential of its game. Every position
+    is used from the point of view of both players.
+    :param paths: history files written by server.py
+    :param n_stages: number of game stages (one set of tables per stage)
+    :param epochs: passes over the positions
+    :param learning_rate: step of each update (divided by the number of weights of a position)
+    :return: the weights
+    """
+    samples = []
+    for path in paths:
+        positions, result = read_history(path)
+        for black, white in positions:
+            base = stage_of(popcount(black | white), n_stages) * STAGE_SIZE
+            samples.append((feature_indices(black, white, base), result))
+            samples.append((feature_indices(white, black, base), -result))
+    log('%d games, %d samples' % (len(paths), len(samples)))
+
+    weights = [0.0] * (n_stages * STAGE_SIZE)
+    rng = random.Random(seed)
+    for epoch in range(epochs):
+        rng.shuffle(samples)
+        squared_error = 0.0
+        for indices, target in samples:
+            error = target - sum([weights[i] for i in indices])
+            squared_error += error * error
+            step = learning_rate * error / len(indices)
+            for i in indices:
+                weights[i] += step
+        log('epoch %d: mean squared error %.2f' % (epoch + 1, squared_error / max(1, len(samples))))
+    return array('f', weights)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fits the pattern weights from game histories written by server.py.')
+    parser.add_argument('histories', nargs='+', help='History files (one "x,y,color" line per move).')
+    parser.add_argument('-o', '--output', default=WEIGHTS_FILE, help='Weights file to write.')
+    parser.add_argument('--stages', type=int, default=4, help='Number of game stages.')
+    parser.add_argument('--epochs', type=int, default=20, help='Passes over the positions.')
+    parser.add_argument('--lr', type=float, default=0.005, help='Learning rate.')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='Random seed of the sample order.')
+    args = parser.parse_args()
+
+    trained = train(args.histories, args.stages, args.epochs, args.lr, args.seed)
+    save_weights(args.output, trained, args.stages)
+    print('weights saved to %s (%d bytes)' % (args.output, os.path.getsize(args.output)))
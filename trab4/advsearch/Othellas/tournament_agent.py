@@ -1,9 +1,17 @@
-import random
+import time
 from typing import Tuple
 
-from .minimax import minimax_move
+from .minimax import iterative_deepening_move, time_budget, SearchTimeout
+from .endgame import EndgameSolver, endgame_move
+from .evaluation import evaluate_custom_bits
+from .patterns import evaluate_patterns, WEIGHTS_LOADED
+from .book import open_book
+from .parallel import RootSplitSearch
+from .transposition import TranspositionTable
+from .ordering import MoveOrderer, positional_prior
+from .othello_minimax_mask import EVAL_TEMPLATE
 from ..othello.gamestate import GameState
-from ..othello.board import Board
+from ..othello.bitboard import BitBoard
 
 # Voce pode criar funcoes auxiliares neste arquivo
 # e tambem modulos auxiliares neste pacote.
@@ -11,6 +19,34 @@ from ..othello.board import Board
 # Nao esqueca de renomear 'your_agent' com o nome
 # do seu agente.
 
+# transposition table kept between moves (the agent plays with the same color during the whole match)
+TT = TranspositionTable(2 ** 17)
+
+# move ordering with killers, history and the positional template as prior
+ORDERER = MoveOrderer(prior=positional_prior(EVAL_TEMPLATE))
+
+# solves the last empty squares exactly; if it does not finish in ENDGAME_SHARE of the
+# time budget, the normal search runs with the rest of the time
+SOLVER = EndgameSolver()
+ENDGAME_SHARE = 0.5
+
+# opening book (see build_book.py), memory-mapped once, when the agent is imported
+BOOK = open_book()
+
+# pattern evaluation when trained weights are available (see patterns.py; none are
+# shipped, so it is inactive until they are trained), otherwise evaluate_custom
+# (computed on the bitboards, with the same values)
+EVALUATE = evaluate_patterns if WEIGHTS_LOADED else evaluate_custom_bits
+
+# aspiration windows (minimax.AspirationWindow) are not used: in benchmark.py aspiration
+# they never reached a deeper search than the full window (same or lower mean depth)
+
+# parallel search for machines with several cores, e.g. RootSplitSearch(4) (parallel.py)
+# or LazySMPSearch(4) (lazysmp.py).
+# The worker processes are started at the first move and kept for the whole match.
+# None keeps the sequential search
+PARALLEL = None
+
 def make_move(state) -> Tuple[int, int]:
     """
     Returns a move for the given game state. 
@@ -25,88 +61,20 @@ def make_move(state) -> Tuple[int, int]:
     # a primeira jogada 
     # Remova-o e coloque a sua implementacao da poda alpha-beta
 
-    return minimax_move(state, 4, evaluate_custom)
-
-def evaluate_custom(state, player:str) -> float:
-    """
-    Evaluates an othello state from the point of view of the given player. 
-    If the state is terminal, returns its utility. 
-    If non-terminal, returns an estimate of its value based on your custom heuristic
-    :param state: state to evaluate (instance of GameState)
-    :param player: player to evaluate the state for (B or W)
-    """
-    # Initialization 
-    player_score = 0
-    opponent_score = 0
-
-    # Corner evaluation
-    corners = [(0, 0), (0, 7), (7, 0), (7, 7)]
-    corner_weight = 30
-    for i, j in corners:
-        if state.get_board().tiles[i][j] == player:
-            player_score += corner_weight
-        elif state.get_board().tiles[i][j] == Board.opponent(player):
-            opponent_score += corner_weight
-
-    # Edge and stability evaluation
-    stability_score = 0
-    edge_weight = 10
-    stability_weight = 30
-    for i in range(8):
-        for j in range(8):
-            if state.get_board().tiles[i][j] == player:
-                if is_stable(state, i, j, player):
-                    stability_score += stability_weight
-                elif (i == 0 or i == 7 or j == 0 or j == 7):
-                    player_score += edge_weight
-            elif state.get_board().tiles[i][j] == Board.opponent(player):
-                if is_stable(state, i, j, Board.opponent(player)):
-                    stability_score -= stability_weight
-                elif (i == 0 or i == 7 or j == 0 or j == 7):
-                    opponent_score += edge_weight
-
-    # Mobility evaluation
-    mobility_weight = 15
-    player_mobility = len(state.get_board().legal_moves(player))
-    opponent_mobility = len(state.get_board().legal_moves(Board.opponent(player)))
-    mobility_score = mobility_weight * (player_mobility - opponent_mobility)
-
-    # Parity evaluation
-    parity_weight = 15
-    parity_score = parity_weight * (state.get_board().num_pieces(player) - state.get_board().num_pieces(Board.opponent(player)))/(state.get_board().num_pieces(player) + state.get_board().num_pieces(Board.opponent(player)))
-
-    # Sum of all factors
-    total_score = player_score - opponent_score + stability_score + mobility_score + parity_score
-
-    return total_score
-
-def is_stable(state, x, y, player):
-    """
-    Determines if a piece at position (x, y) is stable.
-
-    The stability measure of a coin is a quantitative representation 
-    of how vulnerable it is to being flanked. Stable coins are coins which
-    cannot be flanked at any point of time in the
-    game from the given state. 
-    """
-
-    '''
-    Corners are always stable in nature, and as you build upon
-    corners, more coins become stable in the region. 
-    '''
-    if (x == 0 or x == 7) and (y == 0 or y == 7):
-        return True  
-    
-    # Checking stability at the edges
-    stable = True
-    # Directions: right, down, left, up
-    directions = [(0, 1), (1, 0), (0, -1), (-1, 0)] 
-    for dx, dy in directions:
-        tx, ty = x + dx, y + dy
-        if 0 <= tx < 8 and 0 <= ty < 8:
-            if state.get_board().tiles[tx][ty] != player:
-                stable = False
-                break
-    return stable
-
-
+    # searches on a bitboard copy of the received state (same interface, much faster)
+    start = time.time()
+    total = time_budget()
+    state = GameState(BitBoard.from_board(state.get_board()), state.player)
+    if BOOK is not None:
+        move = BOOK.lookup(state)
+        if move is not None:
+            return move
+    if SOLVER.applies(state):
+        try:
+            return endgame_move(state, SOLVER, start + total * ENDGAME_SHARE)
+        except SearchTimeout:
+            pass
+    budget = total - (time.time() - start)
+    if PARALLEL is not None:
+        return PARALLEL.iterative_deepening_move(state, budget, EVALUATE, pvs=True)
+    return iterative_deepening_move(state, budget, EVALUATE, tt=TT, orderer=ORDERER, pvs=True)
@@ -0,0 +1,165 @@
+from typing import Tuple, Union
+
+# bound types of a stored value
+EXACT = 0   # the value is the minimax value of the position
+LOWER = 1   # the search failed high (value >= beta): the real value is at least this
+UPPER = 2   # the search failed low (value <= alpha): the real value is at most this
+
+
+class TranspositionTable(object):
+    """
+    Bounded transposition table indexed by the position hash (GameState.key()).
+    Each entry is a tuple (key, depth, value, bound, move, generation).
+
+    The table has max_entries // 2 buckets with two slots each:
+    - a depth-preferred slot, that keeps the deepest search of the bucket
+      (unless it comes from an older search, see new_search)
+    - an always-replace slot, that keeps the most recent entry that did not fit in the first one
+
+    Values are relative to the player that started the search, so the table
+    is cleared when it is used to search for another player.
+    """
+
+    def __init__(self, max_entries: int = 2 ** 18):
+        """
+        :param max_entries: maximum number of stored positions
+        """
+        self.n_buckets = max(1, max_entries // 2)
+        self.max_entries = 2 * self.n_buckets
+        self.player = None
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        """
+        Removes all entries and resets the counters
+        """
+        self._deep = [None] * self.n_buckets
+        self._recent = [None] * self.n_buckets
+        self.size = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Resets the counters reported by stats()
+        """
+        self.probes = 0     # lookups
+        self.hits = 0       # lookups that found the position
+        self.cutoffs = 0    # hits whose stored value decided the node without searching it
+        self.stores = 0     # stored entries
+        self.replaced = 0   # stores that evicted another position
+
+    def new_search(self, player: str):
+        """
+        Must be called before each search. Starts a new generation (entries of
+        older generations lose their priority in the depth-preferred slots)
+        and clears the table if the search is for another player.
+        :param player: player whose point of view is used for the values
+        """
+        if player != self.player:
+            self.clear()
+            self.player = player
+        self.generation += 1
+
+    def probe(self, key: int) -> Union[tuple, None]:
+        """
+        Returns the entry of the given position or None if it is not stored
+        :param key: position hash
+        """
+        self.probes += 1
+        idx = key % self.n_buckets
+        entry = self._deep[idx]
+        if entry is None or entry[0] != key:
+            entry = self._recent[idx]
+            if entry is None or entry[0] != key:
+                return None
+        self.hits += 1
+        return entry
+
+    def lookup(self, key: int, depth: float, alpha: float, beta: float) -> Tuple[Union[float, None], float, float, object, float]:
+        """
+        Probes the table at a node searched with the given depth and (alpha, beta) window.
+        :return: (value, alpha, beta, move, depth), where value is not None if the stored bound alone
+                 decides the node, alpha and beta are the window narrowed by the stored bound,
+                 move is the stored best move (for move ordering, may be None) and depth is
+                 the depth of the stored search (None if the position is not stored)
+        """
+        entry = self.probe(key)
+        if entry is None:
+            return None, alpha, beta, None, None
+
+        _, entry_depth, value, bound, move, _ = entry
+        if entry_depth >= depth:
+            if bound == EXACT:
+                self.cutoffs += 1
+                return value, alpha, beta, move, entry_depth
+            if bound == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                self.cutoffs += 1
+                return value, alpha, beta, move, entry_depth
+        return None, alpha, beta, move, entry_depth
+
+    def store(self, key: int, depth: float, value: float, bound: int, move):
+        """
+        Stores the result of a search
+        :param key: position hash
+        :param depth: depth searched below the position (float('inf') if the search
+                      reached the end of the game in every line, so the value holds for any depth)
+        :param value: value found
+        :param bound: EXACT, LOWER or UPPER
+        :param move: best move found (or None)
+        """
+        self.stores += 1
+        idx = key % self.n_buckets
+        entry = (key, depth, value, bound, move, self.generation)
+
+        deep = self._deep[idx]
+        if deep is None or deep[0] == key or depth >= deep[1] or deep[5] != self.generation:
+            self._deep[idx] = entry
+            if deep is not None and deep[0] != key:
+                # the old deep entry is still useful, moves it to the always-replace slot
+                self._put_recent(idx, deep)
+            elif deep is None:
+                self.size += 1
+        else:
+            self._put_recent(idx, entry)
+
+    def _put_recent(self, idx: int, entry: tuple):
+        """
+        Puts the entry in the always-replace slot of the bucket
+        """
+        recent = self._recent[idx]
+        if recent is None:
+            self.size += 1
+        elif recent[0] != entry[0]:
+            self.replaced += 1
+        self._recent[idx] = entry
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the table, useful to size it
+        """
+        return {
+            'entries': self.size,
+            'capacity': self.max_entries,
+            'probes': self.probes,
+            'hits': self.hits,
+            'cutoffs': self.cutoffs,
+            'stores': self.stores,
+            'replaced': self.replaced,
+            'hit_rate': self.hits / self.probes if self.probes else 0.0,
+        }
+
+
+def bound_type(value: float, alpha: float, beta: float) -> int:
+    """
+    Returns the bound type of a value found with the (alpha, beta) window
+    """
+    if value <= alpha:
+        return UPPER
+    if value >= beta:
+        return LOWER
+    return EXACT
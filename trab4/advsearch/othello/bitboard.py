@@ -0,0 +1,638 @@
+from typing import Tuple, Union
+
+from .board import Board, ZOBRIST_TILES
+
+# Square (x, y) is stored in bit y*8 + x, so bit 0 is the top-left corner (0,0)
+# and bit 63 is the bottom-right corner (7,7).
+FULL = 0xFFFFFFFFFFFFFFFF
+NOT_A_FILE = 0xFEFEFEFEFEFEFEFE  # every square except column x=0
+NOT_H_FILE = 0x7F7F7F7F7F7F7F7F  # every square except column x=7
+
+# (shift, mask) pairs. The mask removes the bits that wrapped around a row after the shift
+LEFT_SHIFTS = ((1, NOT_A_FILE), (8, FULL), (9, NOT_A_FILE), (7, NOT_H_FILE))    # RIGHT, DOWN, DOWN_RIGHT, DOWN_LEFT
+RIGHT_SHIFTS = ((1, NOT_H_FILE), (8, FULL), (9, NOT_H_FILE), (7, NOT_A_FILE))   # LEFT, UP, UP_LEFT, UP_RIGHT
+
+# (x, y) coordinates of each bit index
+SQUARES = tuple((sq % 8, sq // 8) for sq in range(64))
+
+# the zobrist keys of board.Board indexed by bit, so both boards hash a position the same way.
+# ZOBRIST_FLIP[sq] is the change in the hash when the piece in sq changes color
+ZOBRIST_BITS = {color: tuple(ZOBRIST_TILES[color][y][x] for x, y in SQUARES) for color in ZOBRIST_TILES}
+ZOBRIST_FLIP = tuple(b ^ w for b, w in zip(ZOBRIST_BITS[Board.BLACK], ZOBRIST_BITS[Board.WHITE]))
+
+# board borders, used by the stability analysis (a line that leaves the board cannot be bracketed)
+TOP_ROW = 0x00000000000000FF
+BOTTOM_ROW = 0xFF00000000000000
+A_FILE = ~NOT_A_FILE & FULL     # column x=0
+H_FILE = ~NOT_H_FILE & FULL     # column x=7
+BORDER = TOP_ROW | BOTTOM_ROW | A_FILE | H_FILE
+
+
+def _line_masks(dx: int, dy: int) -> tuple:
+    """
+    Returns the masks of all the lines of the board in the direction (dx, dy),
+    each line starting from a square whose previous square is outside the board
+    """
+    masks = []
+    for x0, y0 in SQUARES:
+        if 0 <= x0 - dx < 8 and 0 <= y0 - dy < 8:
+            continue
+        mask, x, y = 0, x0, y0
+        while 0 <= x < 8 and 0 <= y < 8:
+            mask |= 1 << (y * 8 + x)
+            x, y = x + dx, y + dy
+        masks.append(mask)
+    return tuple(masks)
+
+
+# the 15 diagonals and the 15 anti-diagonals of the board (the rows and columns are handled with bytes)
+DIAGONAL_LINES = _line_masks(1, 1)
+ANTI_DIAGONAL_LINES = _line_masks(-1, 1)
+
+try:
+    popcount = int.bit_count  # python >= 3.10
+except AttributeError:
+    def popcount(bits: int) -> int:
+        return bin(bits).count('1')
+
+
+def square_bit(x: int, y: int) -> int:
+    """
+    Returns the bit that represents the tile in x,y (col,row) coordinates
+    """
+    return 1 << (y * 8 + x)
+
+
+def legal_bits(own: int, opp: int) -> int:
+    """
+    Returns a bitmask with the legal moves of the player that owns the 'own' pieces.
+    Each direction is flooded from the own pieces through contiguous opponent pieces,
+    and an empty square right after the flood is a legal move.
+    :param own: pieces of the player to move
+    :param opp: pieces of the opponent
+    :return: int
+    """
+    empty = ~(own | opp) & FULL
+    moves = 0
+    for shift, mask in LEFT_SHIFTS:
+        opp_m = opp & mask
+        flood = (own << shift) & opp_m
+        flood |= (flood << shift) & opp_m
+        flood |= (flood << shift) & opp_m
+        flood |= (flood << shift) & opp_m
+        flood |= (flood << shift) & opp_m
+        flood |= (flood << shift) & opp_m
+        moves |= (flood << shift) & mask & empty
+    for shift, mask in RIGHT_SHIFTS:
+        opp_m = opp & mask
+        flood = (own >> shift) & opp_m
+        flood |= (flood >> shift) & opp_m
+        flood |= (flood >> shift) & opp_m
+        flood |= (flood >> shift) & opp_m
+        flood |= (flood >> shift) & opp_m
+        flood |= (flood >> shift) & opp_m
+        moves |= (flood >> shift) & mask & empty
+    return moves
+
+
+def flip_bits(own: int, opp: int, move: int) -> int:
+    """
+    Returns a bitmask with the opponent pieces that are flipped when
+    the player that owns the 'own' pieces plays on the 'move' bit
+    :param own: pieces of the player to move
+    :param opp: pieces of the opponent
+    :param move: single-bit mask of the square being played
+    :return: int
+    """
+    flips = 0
+    for shift, mask in LEFT_SHIFTS:
+        line = 0
+        cursor = (move << shift) & mask
+        while cursor & opp:
+            line |= cursor
+            cursor = (cursor << shift) & mask
+        if cursor & own:
+            flips |= line
+    for shift, mask in RIGHT_SHIFTS:
+        line = 0
+        cursor = (move >> shift) & mask
+        while cursor & opp:
+            line |= cursor
+            cursor = (cursor >> shift) & mask
+        if cursor & own:
+            flips |= line
+    return flips
+
+
+def full_lines(filled: int) -> Tuple[int, int, int, int]:
+    """
+    Returns the squares whose line is completely filled, for each of the 4 line directions
+    (horizontal, vertical, diagonal and anti-diagonal). A disc in a full line cannot be
+    flipped along that line, since no move can be made on it anymore.
+    :param filled: bitmask of the occupied squares
+    :return: (int, int, int, int)
+    """
+    horizontal = 0
+    columns = 0xFF
+    for shift in range(0, 64, 8):
+        row = (filled >> shift) & 0xFF
+        columns &= row
+        if row == 0xFF:
+            horizontal |= 0xFF << shift
+    vertical = columns * 0x0101010101010101
+    diagonal = 0
+    for mask in DIAGONAL_LINES:
+        if filled & mask == mask:
+            diagonal |= mask
+    anti_diagonal = 0
+    for mask in ANTI_DIAGONAL_LINES:
+        if filled & mask == mask:
+            anti_diagonal |= mask
+    return horizontal, vertical, diagonal, anti_diagonal
+
+
+def stable_bits(black: int, white: int) -> Tuple[int, int]:
+    """
+    Returns the stable discs (discs that can never be flipped) of both colors.
+    A disc is stable when, in each of the 4 line directions, its line is full or
+    one of its two neighbors in that direction is the border or a stable disc of the same color.
+    Starting from no stable disc, this grows from the corners along the edges and
+    into the board until nothing changes. Full lines are computed once for both colors.
+    The result is a subset of the true stable discs (it never marks an unstable disc).
+    :param black: black pieces
+    :param white: white pieces
+    :return: (black stable discs, white stable discs)
+    """
+    horizontal, vertical, diagonal, anti_diagonal = full_lines(black | white)
+    horizontal |= A_FILE | H_FILE
+    vertical |= TOP_ROW | BOTTOM_ROW
+    diagonal |= BORDER
+    anti_diagonal |= BORDER
+
+    stable = [0, 0]
+    for i, own in enumerate((black, white)):
+        own_stable = 0
+        while True:
+            new = own & (horizontal | ((own_stable << 1) & NOT_A_FILE) | ((own_stable >> 1) & NOT_H_FILE)) \
+                & (vertical | ((own_stable << 8) & FULL) | (own_stable >> 8)) \
+                & (diagonal | ((own_stable << 9) & NOT_A_FILE) | ((own_stable >> 9) & NOT_H_FILE)) \
+                & (anti_diagonal | ((own_stable << 7) & NOT_H_FILE) | ((own_stable >> 7) & NOT_A_FILE))
+            if new == own_stable:
+                break
+            own_stable = new
+        stable[i] = own_stable
+    return stable[0], stable[1]
+
+
+# REVERSED_BYTES[b]: byte b with its bits in reverse order
+REVERSED_BYTES = bytes(int('{:08b}'.format(b)[::-1], 2) for b in range(256))
+
+
+def flip_vertical(bits: int) -> int:
+    """
+    Mirrors the bitboard top-bottom (row y goes to row 7-y)
+    """
+    return int.from_bytes(bits.to_bytes(8, 'little'), 'big')
+
+
+def mirror_horizontal(bits: int) -> int:
+    """
+    Mirrors the bitboard left-right (column x goes to column 7-x)
+    """
+    return int.from_bytes(bits.to_bytes(8, 'little').translate(REVERSED_BYTES), 'little')
+
+
+def transpose(bits: int) -> int:
+    """
+    Mirrors the bitboard on the main diagonal (square (x, y) goes to (y, x))
+    """
+    t = 0x0F0F0F0F00000000 & (bits ^ (bits << 28))
+    bits ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (bits ^ (bits << 14))
+    bits ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (bits ^ (bits << 7))
+    bits ^= t ^ (t >> 7)
+    return bits & FULL
+
+
+def bits_to_moves(bits: int) -> set:
+    """
+    Converts a bitmask into a set of (x,y) tuples
+    """
+    moves = set()
+    while bits:
+        lsb = bits & -bits
+        moves.add(SQUARES[lsb.bit_length() - 1])
+        bits ^= lsb
+    return moves
+
+
+def random_playout(own: int, opp: int, rng, played: list = None) -> int:
+    """
+    Plays random legal moves (uniformly chosen, passing when there is none) until
+    the end of the game, directly on the bitboards
+    :param own: pieces of the player to move
+    :param opp: pieces of the opponent
+    :param rng: random number generator (random.Random)
+    :param played: optional list that receives a (mine, square) pair for each move, where mine
+                   tells whether the player that was to move made it and square is y*8+x
+    :return: final disc differential for the player that was to move
+    """
+    sign = 1            # whether 'own' still belongs to the player that was to move
+    passed = False
+    while True:
+        moves = legal_bits(own, opp)
+        if moves:
+            for _ in range(rng.randrange(popcount(moves))):
+                moves &= moves - 1      # drops the lowest moves until the chosen one
+            move = moves & -moves
+            if played is not None:
+                played.append((sign > 0, move.bit_length() - 1))
+            flips = flip_bits(own, opp, move)
+            own, opp = opp ^ flips, own | move | flips
+            passed = False
+        elif passed:    # neither player can move
+            break
+        else:
+            own, opp = opp, own
+            passed = True
+        sign = -sign
+    return sign * (popcount(own) - popcount(opp))
+
+
+_ROW_TILES = {}
+
+
+def row_tiles(black_row: int, white_row: int) -> tuple:
+    """
+    Returns the 8 characters of a row given its black and white bytes.
+    Rows are memoized, since a game only produces a few of the 3^8 possible rows.
+    """
+    key = (black_row << 8) | white_row
+    row = _ROW_TILES.get(key)
+    if row is None:
+        row = _ROW_TILES[key] = tuple(
+            Board.BLACK if black_row >> x & 1 else Board.WHITE if white_row >> x & 1 else Board.EMPTY
+            for x in range(8)
+        )
+    return row
+
+
+class BitBoard(object):
+    """
+    Drop-in replacement for board.Board that stores the position in two 64-bit integers,
+    one per color. Legal moves and flips are computed with shifts and masks instead of
+    walking the tiles one by one, which makes search much faster.
+
+    The public interface is the same as board.Board (legal_moves, process_move, num_pieces,
+    is_terminal_state, winner, from_string, __str__, ...). The 'tiles' matrix is
+    still available for evaluation functions, but it is a read-only view rebuilt
+    from the bitboards (changing it does not change the board).
+    """
+
+    BLACK = Board.BLACK
+    WHITE = Board.WHITE
+    EMPTY = Board.EMPTY
+
+    DIRECTIONS = Board.DIRECTIONS
+    PIECEMAP = Board.PIECEMAP
+
+    def __init__(self):
+        """
+        Initializes the board with othello's initial position
+        """
+        self.black = square_bit(4, 3) | square_bit(3, 4)
+        self.white = square_bit(3, 3) | square_bit(4, 4)
+
+        self.piece_count = {self.BLACK: 2, self.WHITE: 2, self.EMPTY: 60}
+
+        # caches of legal moves as bitmasks and as sets of (x,y) tuples
+        self._legal_bits = {self.BLACK: None, self.WHITE: None}
+        self._legal_moves = {self.BLACK: None, self.WHITE: None}
+
+        self._tiles = None        # cached 8x8 view, see the tiles property
+        self._stable = None       # cached stable discs of both colors, see stable_bits
+        self._flipped_bits = 0    # pieces flipped by the last move
+
+        # moves done with make_move, so that they can be reverted with unmake_move
+        self._undo_stack = []
+
+        # zobrist hash of the position, updated incrementally at each move
+        self.zobrist = self.zobrist_hash()
+
+    @staticmethod
+    def from_string(string: str) -> 'BitBoard':
+        """
+        Generates a board from the string representation
+        :param string:
+        :return:
+        """
+        b = BitBoard()
+        b.black = b.white = 0
+        b.piece_count = {b.BLACK: 0, b.WHITE: 0, b.EMPTY: 0}
+        for lineno, line in enumerate(string.strip().split('\n')):
+            for colno, col in enumerate(line.strip()):
+                if col == b.BLACK:
+                    b.black |= square_bit(colno, lineno)
+                elif col == b.WHITE:
+                    b.white |= square_bit(colno, lineno)
+                b.piece_count[col] += 1
+        b.zobrist = b.zobrist_hash()
+        return b
+
+    @staticmethod
+    def from_board(board) -> 'BitBoard':
+        """
+        Generates a bitboard with the same position of the given board
+        (a board.Board or another BitBoard)
+        :param board:
+        :return:
+        """
+        if isinstance(board, BitBoard):
+            return board.copy()
+        return BitBoard.from_string(str(board))
+
+    def zobrist_hash(self) -> int:
+        """
+        Computes the zobrist hash of the position from scratch
+        (the 'zobrist' attribute has the same value, but is updated incrementally)
+        :return: int
+        """
+        h = 0
+        for sq in range(64):
+            if self.black >> sq & 1:
+                h ^= ZOBRIST_BITS[self.BLACK][sq]
+            elif self.white >> sq & 1:
+                h ^= ZOBRIST_BITS[self.WHITE][sq]
+        return h
+
+    def bits(self, color: str) -> Tuple[int, int]:
+        """
+        Returns the (own, opponent) bitmasks from the point of view of the given color
+        :param color:
+        :return: (int, int)
+        """
+        if color == self.BLACK:
+            return self.black, self.white
+        return self.white, self.black
+
+    @property
+    def tiles(self) -> list:
+        """
+        Returns the 8x8 matrix of characters (indexed by [row][col]), like board.Board.tiles
+        """
+        if self._tiles is None:
+            black, white = self.black, self.white
+            self._tiles = [
+                list(row_tiles((black >> shift) & 0xFF, (white >> shift) & 0xFF))
+                for shift in range(0, 64, 8)
+            ]
+        return self._tiles
+
+    @property
+    def flipped(self) -> set:
+        """
+        Returns the set of (row, col) positions flipped by the last move
+        """
+        return {(y, x) for x, y in bits_to_moves(self._flipped_bits)}
+
+    def is_within_bounds(self, move):
+        """
+        Returns whether the move refers to a valid board position
+        :param move: (int, int)
+        :return: bool
+        """
+        return 0 <= move[0] < 8 and 0 <= move[1] < 8
+
+    def is_legal(self, move, color):
+        """
+        Returns whether the move is legal for the given color
+        :param move: (int,int) tile position (x,y coords) to place the disk
+        :param color: color of the player making the move
+        :return: bool
+        """
+        return move in self.legal_moves(color)
+
+    def is_terminal_state(self):
+        """
+        Returns whether the current state is terminal (game finished) or not
+        :return:
+        """
+        return self.legal_bits(self.BLACK) == 0 and self.legal_bits(self.WHITE) == 0
+
+    def num_pieces(self, color: str) -> int:
+        """
+        Returns the number of pieces of the given color
+        :param color:
+        :return:
+        """
+        return self.piece_count[color]
+
+    def winner(self) -> Union[str, None]:
+        """
+        Returns the color that has won the match, or None if it is a draw
+        This only makes sense if self is a terminal state (not checked here)
+        :return:
+        """
+        if self.piece_count[self.BLACK] > self.piece_count[self.WHITE]:
+            return self.BLACK
+        elif self.piece_count[self.BLACK] < self.piece_count[self.WHITE]:
+            return self.WHITE
+        else:
+            return None
+
+    def copy(self) -> 'BitBoard':
+        """
+        Returns a copy of this board object
+        :return:
+        """
+        b = BitBoard.__new__(BitBoard)
+        b.black, b.white = self.black, self.white
+        b.piece_count = self.piece_count.copy()
+        b._legal_bits = self._legal_bits.copy()
+        b._legal_moves = self._legal_moves.copy()
+        b._tiles = None
+        b._stable = self._stable
+        b._flipped_bits = 0
+        b._undo_stack = []
+        b.zobrist = self.zobrist
+        return b
+
+    def process_move(self, move_xy, color) -> bool:
+        """
+        Executes the placement of a tile of a given color
+        in a given position. Note that this is done in-place,
+        changing the current board object! If you want to do lookahead searches,
+        make sure to copy the 'original' board first
+        :param move_xy: position to place the tile in x,y (col,row) coordinates
+        :param color:color of the tile to be placed
+        :return: bool
+        """
+        self._flipped_bits = 0
+
+        if color not in [self.WHITE, self.BLACK]:
+            raise ValueError("Move must be made by BLACK or WHITE player")
+
+        if not self.is_legal(move_xy, color):
+            return False  # guards against illegal moves
+
+        self._place(move_xy, color)
+        return True
+
+    def make_move(self, move_xy, color) -> bool:
+        """
+        Executes the move in-place like process_move, but records what is needed
+        to revert it with unmake_move (the flipped pieces, the previous bitboards and caches).
+        This allows a search to walk the game tree on a single board object.
+        :param move_xy: position to place the tile in x,y (col,row) coordinates
+        :param color:color of the tile to be placed
+        :return: bool
+        """
+        if color not in [self.WHITE, self.BLACK]:
+            raise ValueError("Move must be made by BLACK or WHITE player")
+
+        if not self.is_legal(move_xy, color):
+            return False  # guards against illegal moves
+
+        previous = (self.black, self.white, self._legal_bits, self._legal_moves, self._stable,
+                    self._flipped_bits, self.zobrist)
+        self._place(move_xy, color)
+        flips = self._flipped_bits
+        self._undo_stack.append((color, square_bit(*move_xy), flips, popcount(flips), self.zobrist, previous))
+        return True
+
+    def unmake_move(self):
+        """
+        Reverts the last move done with make_move, restoring the
+        bitboards, piece counts and caches
+        :return:
+        """
+        if not self._undo_stack:
+            raise ValueError("There is no move to unmake")
+
+        color, move, flips, n_flips, zobrist, previous = self._undo_stack.pop()
+        opponent = self.WHITE if color == self.BLACK else self.BLACK
+        piece_count = self.piece_count
+        piece_count[color] -= n_flips + 1
+        piece_count[opponent] += n_flips
+        piece_count[self.EMPTY] += 1
+        self._tiles = None
+
+        if self.zobrist == zobrist:
+            # nothing was played after the move: the previous bitboards and caches are valid again
+            (self.black, self.white, self._legal_bits, self._legal_moves, self._stable,
+             self._flipped_bits, self.zobrist) = previous
+            return
+
+        # other moves were processed after this one: removes the piece and flips back
+        # only the pieces of this move, keeping the rest of the board
+        if color == self.BLACK:
+            self.black ^= move | flips
+            self.white |= flips
+        else:
+            self.white ^= move | flips
+            self.black |= flips
+        self.zobrist ^= zobrist ^ previous[-1]
+        self._legal_bits = {self.BLACK: None, self.WHITE: None}
+        self._legal_moves = {self.BLACK: None, self.WHITE: None}
+        self._stable = None
+        self._flipped_bits = 0
+
+    def _place(self, move_xy, color):
+        """
+        Places a piece of the given color (the move must be legal), flips the
+        bracketed pieces and resets the legal moves caches
+        :param move_xy: position to place the tile in x,y (col,row) coordinates
+        :param color:color of the tile to be placed
+        """
+        x, y = move_xy
+        move = square_bit(x, y)
+        own, opp = self.bits(color)
+        flips = flip_bits(own, opp, move)
+        own |= move | flips
+        opp ^= flips
+        if color == self.BLACK:
+            self.black, self.white = own, opp
+        else:
+            self.white, self.black = own, opp
+
+        n_flips = popcount(flips)
+        self.piece_count[color] += n_flips + 1
+        self.piece_count[self.opponent(color)] -= n_flips
+        self.piece_count[self.EMPTY] -= 1
+
+        h = self.zobrist ^ ZOBRIST_BITS[color][y * 8 + x]
+        remaining = flips
+        while remaining:
+            lsb = remaining & -remaining
+            h ^= ZOBRIST_FLIP[lsb.bit_length() - 1]
+            remaining ^= lsb
+        self.zobrist = h
+
+        self._flipped_bits = flips
+        self._tiles = None
+        self._stable = None
+        self._legal_bits = {self.BLACK: None, self.WHITE: None}
+        self._legal_moves = {self.BLACK: None, self.WHITE: None}
+
+    def legal_bits(self, color: str) -> int:
+        """
+        Returns the legal moves of the given color as a bitmask
+        :param color:
+        :return: int
+        """
+        moves = self._legal_bits[color]
+        if moves is None:
+            own, opp = self.bits(color)
+            moves = self._legal_bits[color] = legal_bits(own, opp)
+        return moves
+
+    def legal_moves(self, color: str) -> set:
+        """
+        Returns a set of legal moves for the given color
+        :param color:str
+        :return:
+        """
+        if self._legal_moves[color] is None:
+            self._legal_moves[color] = bits_to_moves(self.legal_bits(color))
+        return self._legal_moves[color]
+
+    def stable_bits(self, color: str) -> int:
+        """
+        Returns the stable discs of the given color as a bitmask (discs that can never
+        be flipped, see the module function stable_bits). Both colors are computed
+        at once and cached until the next move.
+        :param color:
+        :return: int
+        """
+        if self._stable is None:
+            self._stable = stable_bits(self.black, self.white)
+        return self._stable[0] if color == self.BLACK else self._stable[1]
+
+    def stable_discs(self, color: str) -> set:
+        """
+        Returns the set of (x,y) positions of the stable discs of the given color
+        :param color:
+        :return: set
+        """
+        return bits_to_moves(self.stable_bits(color))
+
+    def has_legal_move(self, color):
+        """
+        Returns whether the given color has any legal move
+        :param color:
+        :return:bool
+        """
+        return self.legal_bits(color) != 0
+
+    opponent = staticmethod(Board.opponent)
+
+    print_board = Board.print_board
+    decorated_str = Board.decorated_str
+
+    def __str__(self):
+        """
+        Returns the string representation of the board
+        :return: str
+        """
+        return ''.join('%s\n' % ''.join(row) for row in self.tiles)
@@ -1,3 +1,15 @@
+import random
+
+# Zobrist keys: one random 64-bit number per (color, row, col), plus one per player to move.
+# The hash of a position is the XOR of the keys of its pieces (see Board.zobrist_hash)
+_zobrist_rng = random.Random(0x0DE11)
+ZOBRIST_TILES = {
+    color: [[_zobrist_rng.getrandbits(64) for col in range(8)] for row in range(8)]
+    for color in ('B', 'W')
+}
+ZOBRIST_PLAYER = {'B': 0, 'W': _zobrist_rng.getrandbits(64), None: _zobrist_rng.getrandbits(64)}
+
+
 def from_file(path_to_file):
     """
     Generates a board from the string representation
@@ -82,6 +94,15 @@ class Board(object):
         # stores the flipped tiles at each move
         self.flipped = set()
 
+        # stable discs of both colors (see stable_bits), computed when needed and reset at each move
+        self._stable = None
+
+        # moves done with make_move, so that they can be reverted with unmake_move
+        self._undo_stack = []
+
+        # zobrist hash of the position, updated incrementally at each move
+        self.zobrist = self.zobrist_hash()
+
     @staticmethod
     def from_string(string: str) -> 'Board':
         """
@@ -99,8 +120,23 @@ class Board(object):
                 b.tiles[lineno][colno] = col
                 b.piece_count[col] += 1
 
+        b.zobrist = b.zobrist_hash()
         return b
 
+    def zobrist_hash(self) -> int:
+        """
+        Computes the zobrist hash of the position from scratch
+        (the 'zobrist' attribute has the same value, but is updated incrementally)
+        :return: int
+        """
+        h = 0
+        for row in range(8):
+            for col in range(8):
+                piece = self.tiles[row][col]
+                if piece != self.EMPTY:
+                    h ^= ZOBRIST_TILES[piece][row][col]
+        return h
+
     def is_within_bounds(self, move):
         """
         Returns whether the move refers to a valid board position
@@ -124,10 +160,7 @@ class Board(object):
         Returns whether the current state is terminal (game finished) or not
         :return:
         """
-        no_moves_black = len(self.legal_moves(self.BLACK)) == 0
-        no_moves_white = len(self.legal_moves(self.WHITE)) == 0
-
-        return no_moves_black and no_moves_white
+        return not self.legal_moves(self.BLACK) and not self.legal_moves(self.WHITE)
 
     def num_pieces(self, color: str) -> int:
         """
@@ -159,27 +192,21 @@ class Board(object):
         :param direction: one of eight directions of tile neighborhood
         :return: (int,int)
         """
-        # performing inline boundary check to avoid calls for is_within_bounds
-        # this saves some time
-        dx, dy = direction
-        tx, ty = move
-        tx += dx
-        ty += dy
-
+        # the squares of the ray come from a precomputed table, no bound checks are needed
+        tiles = self.tiles
         opp = self.BLACK if color == self.WHITE else self.WHITE  # inline opponent calc.
+        ray = RAYS[move[0]][move[1]][direction]
 
-        if not (0 <= tx <= 7 and 0 <= ty <= 7) or self.tiles[tx][ty] != opp:
+        if len(ray) < 2 or tiles[ray[0][0]][ray[0][1]] != opp:
             return False
 
-        while self.tiles[tx][ty] == opp:  # putting is_within_bounds here yields more calls
-            tx += dx
-            ty += dy
-            if not (0 <= tx <= 7 and 0 <= ty <= 7):  # self.is_within_bounds((tx, ty)):
-                return False
-
-        if self.tiles[tx][ty] == self.EMPTY:
-            return False
-        return tx, ty
+        for tx, ty in ray:
+            piece = tiles[tx][ty]
+            if piece != opp:
+                if piece == self.EMPTY:
+                    return False
+                return tx, ty
+        return False
 
     def find_where_to_play_from_owned(self, owned, color, direction):
         """
@@ -192,33 +219,55 @@ class Board(object):
         :param direction: one of eight directions of tile neighborhood
         :return: (int,int) or False if not found
         """
-        # performing inline boundary check to avoid calls for is_within_bounds
-        # this saves some time
-        dx, dy = direction
-        tx, ty = owned
-        tx += dx
-        ty += dy
+        tiles = self.tiles
         opp = self.BLACK if color == self.WHITE else self.WHITE  # inline opponent calc.
+        ray = RAYS[owned[0]][owned[1]][direction]
 
-        if not (0 <= tx <= 7 and 0 <= ty <= 7) or self.tiles[tx][ty] != opp:  # color:
+        if len(ray) < 2 or tiles[ray[0][0]][ray[0][1]] != opp:
             return False
 
-        while self.tiles[tx][ty] == opp:
-            tx += dx
-            ty += dy
-            if not (0 <= tx <= 7 and 0 <= ty <= 7):
-                return False
+        for tx, ty in ray:
+            piece = tiles[tx][ty]
+            if piece != opp:
+                if piece != self.EMPTY:
+                    return False
+                return tx, ty
+        return False
 
-        if self.tiles[tx][ty] != self.EMPTY:
-            return False
-        return tx, ty
+    def _brackets_from(self, row, col, color, opp) -> bool:
+        """
+        Returns whether a piece of the given color placed in (row, col) would bracket
+        opponent tiles in any direction (i.e. whether the empty tile is a legal move)
+        """
+        tiles = self.tiles
+        for ray in LONG_RAYS[row][col]:
+            tx, ty = ray[0]
+            if tiles[tx][ty] != opp:
+                continue
+            for tx, ty in ray:
+                piece = tiles[tx][ty]
+                if piece != opp:
+                    if piece == color:
+                        return True
+                    break
+        return False
 
     def copy(self) -> 'Board':
         """
-        Returns a copy of this board object
+        Returns a copy of this board object.
+        Tiles, piece counts and the legal moves caches are cloned directly
+        (the cached sets are shared, since they are replaced, never modified, after a move)
         :return:
         """
-        return self.from_string(self.__str__())
+        b = Board.__new__(Board)
+        b.tiles = [row[:] for row in self.tiles]
+        b.piece_count = self.piece_count.copy()
+        b._legal_moves = self._legal_moves.copy()
+        b._stable = self._stable
+        b.flipped = set()
+        b._undo_stack = []
+        b.zobrist = self.zobrist
+        return b
 
     def process_move(self, move_xy, color) -> bool:
         """
@@ -237,51 +286,118 @@ class Board(object):
             raise ValueError("Move must be made by BLACK or WHITE player")
 
         if self.is_legal(move_xy, color):
-            # places the piece and update piece counts
-            x, y = move_xy  
-            move_yx = y, x  # move is received in x,y but tiles are indexded by y,x
+            self._place(move_xy, color)
+            return True
 
-            self.tiles[y][x] = color
-            self.piece_count[color] += 1
-            self.piece_count[self.EMPTY] -= 1
+        return False  # guards against illegal moves
 
-            # TODO put this inside flip_tiles
-            for direc in self.DIRECTIONS:
-                self.flip_tiles(move_yx, color, direc)  # flip tiles receives moves in y,x
+    def make_move(self, move_xy, color) -> bool:
+        """
+        Executes the move in-place like process_move, but records what is needed
+        to revert it with unmake_move (the flipped tiles and the previous caches).
+        This allows a search to walk the game tree on a single board object.
+        :param move_xy: position to place the tile in x,y (col,row) coordinates
+        :param color:color of the tile to be placed
+        :return: bool
+        """
+        if color not in [self.WHITE, self.BLACK]:
+            raise ValueError("Move must be made by BLACK or WHITE player")
 
-            # resets legal moves
-            self._legal_moves[self.BLACK], self._legal_moves[self.WHITE] = None, None
-            return True
+        if not self.is_legal(move_xy, color):
+            return False  # guards against illegal moves
 
-        return False  # guards against illegal moves
+        previous_legal_moves, previous_stable, previous_flipped = self._legal_moves, self._stable, self.flipped
+        previous_zobrist = self.zobrist
+        self.flipped = set()
+        flips = self._place(move_xy, color)
+        self._undo_stack.append((move_xy, color, flips, self.zobrist,
+                                 previous_legal_moves, previous_stable, previous_flipped, previous_zobrist))
+        return True
 
-    def flip_tiles(self, origin, color, direction):
+    def unmake_move(self):
+        """
+        Reverts the last move done with make_move, restoring the
+        tiles, piece counts and caches
+        :return:
+        """
+        if not self._undo_stack:
+            raise ValueError("There is no move to unmake")
+
+        (x, y), color, flips, zobrist, legal_moves, stable, flipped, previous_zobrist = self._undo_stack.pop()
+        opp = self.opponent(color)
+
+        self.tiles[y][x] = self.EMPTY
+        for fy, fx in flips:
+            self.tiles[fy][fx] = opp
+
+        self.piece_count[color] -= len(flips) + 1
+        self.piece_count[opp] += len(flips)
+        self.piece_count[self.EMPTY] += 1
+
+        if self.zobrist == zobrist:
+            # nothing was played after the move: the previous caches are valid again
+            self._legal_moves, self._stable, self.flipped = legal_moves, stable, flipped
+            self.zobrist = previous_zobrist
+        else:
+            self.zobrist ^= zobrist ^ previous_zobrist
+            self._legal_moves = {self.BLACK: None, self.WHITE: None}
+            self._stable = None
+            self.flipped = set()
+
+    def _place(self, move_xy, color) -> list:
+        """
+        Places a piece of the given color (the move must be legal), flips the
+        bracketed tiles and resets the legal moves and stable discs caches
+        :param move_xy: position to place the tile in x,y (col,row) coordinates
+        :param color:color of the tile to be placed
+        :return: list with the y,x coordinates of the flipped tiles
+        """
+        # places the piece and update piece counts
+        x, y = move_xy
+        move_yx = y, x  # move is received in x,y but tiles are indexded by y,x
+
+        self.tiles[y][x] = color
+        self.piece_count[color] += 1
+        self.piece_count[self.EMPTY] -= 1
+        self.zobrist ^= ZOBRIST_TILES[color][y][x]
+
+        flips = []
+        for direc in self.DIRECTIONS:
+            flips.extend(self.flip_tiles(move_yx, color, direc))  # flip tiles receives moves in y,x
+
+        # resets legal moves (a new dict, since make_move may keep the old one for unmake_move)
+        self._legal_moves = {self.BLACK: None, self.WHITE: None}
+        self._stable = None
+        return flips
+
+    def flip_tiles(self, origin, color, direction) -> list:
         """
         Traverses the board in the given direction,
         transforming the color of appropriate tiles
         :param origin: y,x coordinates where the traversal will begin (y,x for matrix indexing)
         :param color: new color of the pieces
         :param direction: direction of traversal (see the constants on the beginning of the class)
-        :return:
+        :return: list with the y,x coordinates of the flipped tiles
         """
         destination = self.find_bracket(origin, color, direction)  # move, player, board, direction)
         if not destination:
-            return
+            return []
         self.flipped.add(destination)  # for highlighting purposes (see decorated_str)
-        ox, oy = origin
-        dx, dy = direction
-
-        nx, ny = ox + dx, oy + dy  # n stands for 'next'
 
         opp = self.opponent(color)
 
-        while (nx, ny) != destination:
-            # flips the tile and updates piece counts
+        flips = []
+        for nx, ny in RAYS[origin[0]][origin[1]][direction]:  # n stands for 'next'
+            if (nx, ny) == destination:
+                break
+            # flips the tile and updates piece counts and hash
             self.flipped.add((nx, ny))
+            flips.append((nx, ny))
             self.tiles[nx][ny] = color
-            self.piece_count[color] += 1
-            self.piece_count[opp] -= 1
-            nx, ny = nx + dx, ny + dy
+            self.zobrist ^= ZOBRIST_TILES[color][nx][ny] ^ ZOBRIST_TILES[opp][nx][ny]
+        self.piece_count[color] += len(flips)
+        self.piece_count[opp] -= len(flips)
+        return flips
 
     def legal_moves(self, color:str) -> set:
         """
@@ -308,16 +424,13 @@ class Board(object):
         :param color:
         """
         # test if every empty tile on the board is a legal move
-        tiles = [(x, y) for x in range(8) for y in range(8) if self.tiles[x][y] == self.EMPTY]
-
-        for x, y in tiles:
-            if self.tiles[x][y] == self.EMPTY:  # and any(map(hasbracket, self.DIRECTIONS)):
-                # performs the 'inline' any:
-                for direc in self.DIRECTIONS:
-                    if self.find_bracket((x, y), color, direc):
-                        # flips x,y because of the way tiles are stored and the x,y coords in real world
-                        self._legal_moves[color].add((y,x))
-                        break
+        opp = self.opponent(color)
+        legal = self._legal_moves[color]
+        for x, row in enumerate(self.tiles):
+            for y, piece in enumerate(row):
+                if piece == self.EMPTY and self._brackets_from(x, y, color, opp):
+                    # flips x,y because of the way tiles are stored and the x,y coords in real world
+                    legal.add((y, x))
 
     def find_legal_moves_sparse(self, color):
         """
@@ -326,35 +439,55 @@ class Board(object):
         :param color:
         :return:
         """
-        # test if every empty tile on the board is a legal move
-        tiles = [(x, y) for x in range(8) for y in range(8) if self.tiles[x][y] == color]
-
-        for y, x in tiles:
-            if self.tiles[y][x] == color:
-                for direc in self.DIRECTIONS:
-                    move_yx = self.find_where_to_play_from_owned((y, x), color, direc)
-                    if move_yx:
-                        # flips x,y because of matrix indexing vs board coords
-                        m_y, m_x = move_yx
-                        self._legal_moves[color].add((m_x, m_y))
+        # walks the rays from every owned tile, through opponent tiles, to an empty tile
+        opp = self.opponent(color)
+        tiles = self.tiles
+        legal = self._legal_moves[color]
+        for y, row in enumerate(tiles):
+            for x, piece in enumerate(row):
+                if piece != color:
+                    continue
+                for ray in LONG_RAYS[y][x]:
+                    m_y, m_x = ray[0]
+                    if tiles[m_y][m_x] != opp:
+                        continue
+                    for m_y, m_x in ray:
+                        piece = tiles[m_y][m_x]
+                        if piece != opp:
+                            if piece == self.EMPTY:
+                                # flips x,y because of matrix indexing vs board coords
+                                legal.add((m_x, m_y))
+                            break
+
+    def stable_bits(self, color: str) -> int:
+        """
+        Returns the stable discs of the given color as a bitmask, bit y*8+x being the tile
+        in row y, column x (see bitboard.stable_bits). Both colors are computed at once
+        and cached until the next move.
+        :param color:
+        :return: int
+        """
+        if self._stable is None:
+            from .bitboard import stable_bits   # imported here, since bitboard imports this module
+            black = white = 0
+            for y, row in enumerate(self.tiles):
+                for x, piece in enumerate(row):
+                    if piece == self.BLACK:
+                        black |= 1 << (y * 8 + x)
+                    elif piece == self.WHITE:
+                        white |= 1 << (y * 8 + x)
+            self._stable = stable_bits(black, white)
+        return self._stable[0] if color == self.BLACK else self._stable[1]
 
     def has_legal_move(self, color):
         """
-        Returns whether the given color has any legal move
+        Returns whether the given color has any legal move.
+        The whole set of moves is computed (and cached), since it is
+        needed anyway when the color plays in this position
         :param color:
         :return:bool
         """
-        # test if every empty tile on the board is a legal move
-        tiles = [(x, y) for x in range(8) for y in range(8) if self.tiles[x][y] == self.EMPTY]
-
-        for x, y in tiles:
-            # self._legal_moves[color] = [(y, x) for x, y in tiles if self.is_legal((x, y), color)]
-
-            hasbracket = lambda direction: self.find_bracket((x, y), color, direction)
-
-            if self.tiles[x][y] == self.EMPTY and any(map(hasbracket, self.DIRECTIONS)):
-                return True
-        return False
+        return len(self.legal_moves(color)) > 0
 
     @staticmethod
     def opponent(color):
@@ -431,3 +564,24 @@ class Board(object):
             string += '%s\n' % ''.join(row)
 
         return string
+
+
+def _ray(row: int, col: int, direction) -> tuple:
+    """
+    Returns the ordered (row, col) squares from the neighbor of (row, col) to the
+    border of the board, in the given direction (added to (row, col) like in find_bracket)
+    """
+    dx, dy = direction
+    squares = []
+    tx, ty = row + dx, col + dy
+    while 0 <= tx <= 7 and 0 <= ty <= 7:
+        squares.append((tx, ty))
+        tx, ty = tx + dx, ty + dy
+    return tuple(squares)
+
+
+# RAYS[row][col][direction]: squares along each of the 8 rays that leave each of the 64 squares
+RAYS = [[{direction: _ray(row, col, direction) for direction in Board.DIRECTIONS} for col in range(8)] for row in range(8)]
+
+# LONG_RAYS[row][col]: only the rays of at least 2 squares (the shorter ones cannot bracket anything)
+LONG_RAYS = [[tuple(ray for ray in RAYS[row][col].values() if len(ray) >= 2) for col in range(8)] for row in range(8)]
@@ -1,5 +1,6 @@
 from typing import Tuple, Union
-from .board import Board
+from .board import Board, ZOBRIST_PLAYER
+from .bitboard import BitBoard, random_playout
 
 class GameState(object):
     """
@@ -21,11 +22,16 @@ class GameState(object):
         """
         self.board = board
         self.player = player
+        self._previous_players = []  # players to move before each make_move, for unmake_move
 
     def is_terminal(self) -> bool:
         """
         Returns whether this state is terminal
         """
+        # the moves of the player to move are usually cached already (see next_state),
+        # so the opponent's moves only need to be computed if the player must pass
+        if self.player is not None and self.board.has_legal_move(self.player):
+            return False
         return self.board.is_terminal_state()
 
     def is_legal_move(self, move:Tuple[int,int]) -> bool:
@@ -47,6 +53,37 @@ class GameState(object):
         """
         return self.board.winner()
 
+    def rollout(self, rng, moves: list = None) -> Union[str,None]:
+        """
+        Plays random moves from this state until the end of the game and returns
+        the winner (None for a draw). The game is played on bitboards, without
+        creating states, so it is much faster than a loop of next_state calls
+        :param rng: random number generator (random.Random)
+        :param moves: optional list that receives the (player, move) pairs of the random game
+        """
+        if self.player is None:
+            return self.winner()
+        board = self.board if isinstance(self.board, BitBoard) else BitBoard.from_board(self.board)
+        own, opp = board.bits(self.player)
+        if moves is None:
+            diff = random_playout(own, opp, rng)
+        else:
+            played = []
+            diff = random_playout(own, opp, rng, played)
+            opponent = Board.opponent(self.player)
+            moves.extend((self.player if mine else opponent, (square % 8, square // 8))
+                         for mine, square in played)
+        if diff == 0:
+            return None
+        return self.player if diff > 0 else Board.opponent(self.player)
+
+    def key(self) -> int:
+        """
+        Returns a 64-bit hash of this state (board configuration and player to move),
+        suitable to index transposition tables and opening books
+        """
+        return self.board.zobrist ^ ZOBRIST_PLAYER[self.player]
+
     def get_board(self) -> Board:
         """
         Returns the board configuration
@@ -59,6 +96,31 @@ class GameState(object):
         """
         return GameState(self.board.copy(), self.player)
     
+    def make_move(self, move:Tuple[int,int]):
+        """
+        Changes this state in-place into next_state(move), on the same board object
+        (see Board.make_move). unmake_move reverts it, so a search can walk the game
+        tree on a single state without creating boards.
+        :param move: move in x,y (col,row) coordinates
+        """
+        if not self.board.make_move(move, self.player):
+            raise ValueError("Invalid move: %s" % str(move))
+        self._previous_players.append(self.player)
+
+        # same choice of the next player as next_state
+        opponent = Board.opponent(self.player)
+        if self.board.has_legal_move(opponent):
+            self.player = opponent
+        elif not self.board.has_legal_move(self.player):
+            self.player = None
+
+    def unmake_move(self):
+        """
+        Reverts the last move done with make_move
+        """
+        self.board.unmake_move()
+        self.player = self._previous_players.pop()
+
     def next_state(self, move:Tuple[int,int]) -> 'GameState':
         """
         Returns the next state given the move.
@@ -1,6 +1,25 @@
+import os
 import threading
 import time
 
+# environment variable with the time (in seconds) that the agents may use to search a move.
+# server.py and tournament.py set it from their delay (see set_time_budget)
+TIME_BUDGET_VAR = 'OTHELLO_TIME_BUDGET'
+
+# part of the delay kept for what the agents do out of the search (converting the state,
+# merging the results of worker processes) and for returning the move to the server
+TIME_MARGIN = 0.5
+
+
+def set_time_budget(delay: float):
+    """
+    Sets the time budget of the agents (TIME_BUDGET_VAR) to the delay minus TIME_MARGIN,
+    but at least half of the delay. Worker processes started afterwards inherit it
+    :param delay: time limit of the server to make a move
+    """
+    os.environ[TIME_BUDGET_VAR] = str(max(delay - TIME_MARGIN, delay / 2))
+
+
 
 class FunctionTimer(object):
     """
@@ -1,5 +1,44 @@
+import random
 from typing import Tuple, Union
 
+# Zobrist keys: one random 64-bit number per (player, row, col), plus one per player to move
+_zobrist_rng = random.Random(0x7777)
+ZOBRIST_CELLS = {
+    player: [[_zobrist_rng.getrandbits(64) for col in range(3)] for row in range(3)]
+    for player in ('B', 'W')
+}
+ZOBRIST_PLAYER = {'B': 0, 'W': _zobrist_rng.getrandbits(64)}
+
+# the 8 lines of the board as indices of the flat (row-major) list of cells,
+# and LINES_THROUGH[i]: the lines that contain cell i
+LINES = ((0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6))
+LINES_THROUGH = tuple(tuple(line for line in LINES if i in line) for i in range(9))
+
+
+def random_playout(cells: list, player: str, rng, played: list = None) -> Union[str, None]:
+    """
+    Plays random moves until the end of the game on a flat list of the 9 cells
+    (changed in place) and returns the loser: the first player to complete a line
+    (None if the board fills up without a line)
+    :param cells: cells of a non-terminal board in row-major order ('B', 'W' or '.')
+    :param player: player to move
+    :param rng: random number generator (random.Random)
+    :param played: optional list that receives a (player, cell index) pair for each move
+    """
+    empty = [i for i, cell in enumerate(cells) if cell == '.']
+    rng.shuffle(empty)  # the order the empty cells will be played
+    opponent = 'W' if player == 'B' else 'B'
+    for i in empty:
+        cells[i] = player
+        if played is not None:
+            played.append((player, i))
+        for a, b, c in LINES_THROUGH[i]:
+            if cells[a] == cells[b] == cells[c]:
+                return player
+        player, opponent = opponent, player
+    return None
+
+
 class Board:
     """
     A board implementation for the tic-tac-toe misere game
@@ -12,6 +51,7 @@ class Board:
 
     def __init__(self):
         self.board = [['.' for _ in range(3)] for _ in range(3)]
+        self.zobrist = 0  # hash of the position, updated incrementally by place_marker
 
     @staticmethod
     def from_string(board_str: str) -> 'Board':
@@ -23,7 +63,7 @@ class Board:
         for row, line in enumerate(lines):
             for col, cell in enumerate(line):
                 if cell in ['B', 'W', '.']:
-                    board.board[row][col] = cell
+                    board.place_marker(cell, row, col)
                 else:
                     raise ValueError("Invalid cell value in the board string representation")
 
@@ -53,6 +93,11 @@ class Board:
         return '\n'.join([' '.join(row) for row in decorated_board])
 
     def place_marker(self, player, row, col):
+        # removes the previous marker from the hash and adds the new one
+        if self.board[row][col] != '.':
+            self.zobrist ^= ZOBRIST_CELLS[self.board[row][col]][row][col]
+        if player != '.':
+            self.zobrist ^= ZOBRIST_CELLS[player][row][col]
         self.board[row][col] = player
 
     def is_empty(self, row, col):
@@ -84,4 +129,5 @@ class Board:
     def copy(self):
         new_board = Board()
         new_board.board = [row[:] for row in self.board]
+        new_board.zobrist = self.zobrist
         return new_board
\ No newline at end of file
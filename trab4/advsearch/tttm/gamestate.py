@@ -1,5 +1,5 @@
 from typing import Tuple, Union
-from .board import Board
+from .board import Board, ZOBRIST_PLAYER, random_playout
 
 class GameState:
 
@@ -36,6 +36,32 @@ class GameState:
         else:
             return None
 
+    def rollout(self, rng, moves: list = None) -> Union[str, None]:
+        """
+        Plays random moves from this state until the end of the game and returns the winner
+        (None for a draw), on a flat copy of the cells, without creating states
+        :param rng: random number generator (random.Random)
+        :param moves: optional list that receives the (player, move) pairs of the random game
+        """
+        if self.is_terminal():
+            return self.winner()
+        cells = [cell for row in self.board.board for cell in row]
+        if moves is None:
+            loser = random_playout(cells, self.player, rng)
+        else:
+            played = []
+            loser = random_playout(cells, self.player, rng, played)
+            moves.extend((player, (i % 3, i // 3)) for player, i in played)
+        if loser is None:
+            return None
+        return 'W' if loser == 'B' else 'B'
+
+    def key(self) -> int:
+        """
+        Returns a 64-bit hash of this state (board configuration and player to move)
+        """
+        return self.board.zobrist ^ ZOBRIST_PLAYER[self.player]
+
     def get_board(self) -> Board:
         return self.board
 
@@ -0,0 +1,538 @@
+import time
+import random
+import argparse
+
+from advsearch.othello.board import Board
+from advsearch.othello.bitboard import BitBoard
+from advsearch.othello.gamestate import GameState
+from advsearch.Othellas.minimax import search, SearchContext, iterative_deepening_move, AspirationWindow
+from advsearch.Othellas.transposition import TranspositionTable
+from advsearch.Othellas.ordering import MoveOrderer, positional_prior
+from advsearch.Othellas.othello_minimax_mask import EVAL_TEMPLATE, evaluate_mask
+from advsearch.Othellas.othello_minimax_count import evaluate_count
+from advsearch.Othellas.othello_minimax_custom import evaluate_custom
+from advsearch.Othellas.evaluation import evaluate_mask_bits, evaluate_custom_bits, evaluate_custom_batch
+from advsearch.Othellas.parallel import RootSplitSearch
+from advsearch.Othellas.lazysmp import LazySMPSearch
+from advsearch.Othellas.mcts import MCTS, RootParallelMCTS, LeafParallelMCTS, ValueMCTS
+from advsearch.tttm.board import Board as TTTMBoard
+from advsearch.tttm.gamestate import GameState as TTTMGameState
+
+
+def position_set(n_positions: int, plies: int = 20, seed: int = 0) -> list:
+    """
+    Returns a fixed set of othello positions, reached by playing
+    'plies' random moves from the initial board (always the same for a given seed)
+    :param n_positions: number of positions in the set
+    :param plies: number of random moves to reach each position
+    :param seed: random seed
+    :return: list of GameState
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < n_positions:
+        state = GameState(Board(), Board.BLACK)
+        for _ in range(plies):
+            if state.is_terminal():
+                break
+            state = state.next_state(rng.choice(sorted(state.legal_moves())))
+        if not state.is_terminal():
+            positions.append(state)
+    return positions
+
+
+def as_bitboards(positions: list) -> list:
+    """
+    Returns copies of the positions with their boards converted to BitBoard
+    """
+    return [GameState(BitBoard.from_board(state.board), state.player) for state in positions]
+
+
+def playout_corpus(n_games: int, seed: int = 0) -> list:
+    """
+    Returns every position of 'n_games' random games (always the same for a given seed)
+    :return: list of GameState
+    """
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(n_games):
+        state = GameState(Board(), Board.BLACK)
+        while not state.is_terminal():
+            positions.append(state)
+            state = state.next_state(rng.choice(sorted(state.legal_moves())))
+    return positions
+
+
+def count_nodes(positions: list, depth: int, tt: TranspositionTable = None, orderer: MoveOrderer = None) -> int:
+    """
+    Searches every position with the count heuristic (alpha-beta, as minimax_move)
+    and returns the number of visited nodes (SearchContext.nodes)
+    """
+    nodes = 0
+    for state in positions:
+        if tt is not None:
+            tt.new_search(state.player)
+        if orderer is not None:
+            orderer.new_search()
+        ctx = SearchContext(tt, orderer=orderer)
+        search(state, float('-inf'), float('inf'), depth, evaluate_count, ctx)
+        nodes += ctx.nodes
+    return nodes
+
+
+def bench_copy(args):
+    """
+    Copies/sec of Board.copy and children/sec of GameState.next_state (a copy and a move)
+    with the old string round-trip copy versus the structural copy. The searches play their
+    moves with make/unmake and do not copy boards, so the copy is measured by itself
+    """
+    positions = position_set(args.positions, seed=args.seed)
+    strategies = {
+        'string round-trip': lambda board: Board.from_string(str(board)),
+        'structural': Board.copy,
+    }
+
+    original_copy = Board.copy
+    for name, copy in strategies.items():
+        Board.copy = copy
+        try:
+            copies = children = 0
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                for state in positions:
+                    state.board.copy()
+                    copies += 1
+            copy_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                for state in positions:
+                    for move in state.legal_moves():
+                        state.next_state(move)
+                        children += 1
+            next_state_time = time.perf_counter() - start
+        finally:
+            Board.copy = original_copy
+        print(f'{name:>20}: {copies / copy_time:.0f} copies/s, {children / next_state_time:.0f} next_state/s')
+
+
+def bench_tt(args):
+    """
+    Nodes, time and transposition table counters for several table sizes.
+    The same table is kept along the position set, as an agent keeps it along a match.
+    """
+    positions = [
+        state for state in as_bitboards(position_set(args.positions, seed=args.seed))
+        if state.player == Board.BLACK  # a table is used by a single player
+    ]
+    for size in [0] + [2 ** exp for exp in args.sizes]:
+        tt = TranspositionTable(size) if size else None
+        start = time.perf_counter()
+        nodes = count_nodes(positions, args.depth, tt=tt)
+        elapsed = time.perf_counter() - start
+        print(f'{size:>8} entries: {nodes} nodes in {elapsed:.3f}s ({nodes / elapsed:.0f} nodes/s)')
+        if tt is not None:
+            print('                  ' + ', '.join(f'{k}={v:.2f}' if isinstance(v, float) else f'{k}={v}'
+                                                   for k, v in tt.stats().items()))
+
+
+def bench_ordering(args):
+    """
+    Nodes, time and first-child cutoff rate of alpha-beta with each ingredient of the move ordering.
+    The 'none' orderer keeps the order of state.legal_moves() and only counts the cutoffs.
+    """
+    positions = as_bitboards(position_set(args.positions, seed=args.seed))
+    prior = positional_prior(EVAL_TEMPLATE)
+    orderers = {
+        'none': lambda: MoveOrderer(n_killers=0, history=False),
+        'killers': lambda: MoveOrderer(history=False),
+        'history': lambda: MoveOrderer(n_killers=0),
+        'prior': lambda: MoveOrderer(prior=prior, n_killers=0, history=False),
+        'all': lambda: MoveOrderer(prior=prior),
+        'all + tt': lambda: MoveOrderer(prior=prior),
+    }
+    for name, make_orderer in orderers.items():
+        orderer = make_orderer()
+        tt = TranspositionTable() if 'tt' in name else None
+        start = time.perf_counter()
+        nodes = 0
+        for state in positions:
+            if tt is not None:
+                tt.clear()
+            nodes += count_nodes([state], args.depth, tt=tt, orderer=orderer)
+        elapsed = time.perf_counter() - start
+        stats = orderer.stats()
+        print(f'{name:>10}: {nodes:>7} nodes in {elapsed:.3f}s, '
+              f'{stats["cutoffs"]} cutoffs ({100 * stats["first_cutoff_rate"]:.1f}% at the first child)')
+
+
+def bench_pvs(args):
+    """
+    Nodes and time of plain alpha-beta versus principal variation search,
+    both with transposition table and move ordering (as in the tournament agent)
+    """
+    positions = as_bitboards(position_set(args.positions, seed=args.seed))
+    for pvs in (False, True):
+        nodes = 0
+        start = time.perf_counter()
+        for state in positions:
+            tt = TranspositionTable()
+            tt.new_search(state.player)
+            ctx = SearchContext(tt, orderer=MoveOrderer(prior=positional_prior(EVAL_TEMPLATE)))
+            search(state, float('-inf'), float('inf'), args.depth, evaluate_mask, ctx, pvs)
+            nodes += ctx.nodes
+        elapsed = time.perf_counter() - start
+        name = 'pvs' if pvs else 'alpha-beta'
+        print(f'{name:>10}: {nodes} nodes in {elapsed:.3f}s ({nodes / elapsed:.0f} nodes/s)')
+
+
+def bench_aspiration(args):
+    """
+    Depth reached by the tournament search (iterative deepening with table, ordering and pvs)
+    with a time budget per position, with and without aspiration windows
+    """
+    positions = as_bitboards(position_set(args.positions, seed=args.seed))
+    for delta in [None] + args.deltas:
+        depths = nodes = 0
+        aspiration = AspirationWindow(delta) if delta is not None else None
+        for state in positions:
+            info = {}
+            iterative_deepening_move(state, args.budget, evaluate_mask, tt=TranspositionTable(),
+                                     orderer=MoveOrderer(prior=positional_prior(EVAL_TEMPLATE)),
+                                     pvs=True, aspiration=aspiration, info=info)
+            depths += info['depth']
+            nodes += info['nodes']
+            if aspiration is not None:
+                aspiration.last_value = None  # unrelated positions, the previous value is no estimate
+        name = f'delta {delta}' if delta is not None else 'full window'
+        line = f'{name:>12}: mean depth {depths / len(positions):.2f}, {nodes} nodes'
+        if aspiration is not None:
+            stats = aspiration.stats()
+            line += (f", {stats['searches']} searches, {stats['fail_lows']} fail-lows,"
+                     f" {stats['fail_highs']} fail-highs")
+        print(line)
+
+
+def bench_legal(args):
+    """
+    Calls/sec of legal move generation (legal_moves with an empty cache) and
+    has_legal_move on every position of random games, for both board classes
+    """
+    corpus = playout_corpus(args.positions, seed=args.seed)
+    for name, convert in (('Board', Board.copy), ('BitBoard', BitBoard.from_board)):
+        boards = [(convert(state.board), state.player) for state in corpus]
+        for method in ('legal_moves', 'has_legal_move'):
+            calls = 0
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                for board, player in boards:
+                    board._legal_moves = dict.fromkeys(board._legal_moves)  # empties the caches
+                    if hasattr(board, '_legal_bits'):
+                        board._legal_bits = dict.fromkeys(board._legal_bits)
+                    getattr(board, method)(player)
+                    calls += 1
+            elapsed = time.perf_counter() - start
+            print(f'{name:>8}.{method:<14}: {calls} calls in {elapsed:.3f}s ({calls / elapsed:.0f} calls/s)')
+
+
+def early_exit_has_legal_move(board, color):
+    """
+    Board.has_legal_move before it filled the legal moves cache: a separate
+    scan of the board that stops at the first legal move (kept for bench_scans)
+    """
+    if board._legal_moves[color] is not None:
+        return len(board._legal_moves[color]) > 0
+    opp = board.opponent(color)
+    for x, row in enumerate(board.tiles):
+        for y, piece in enumerate(row):
+            if piece == board.EMPTY and board._brackets_from(x, y, color, opp):
+                return True
+    return False
+
+
+def bench_scans(args):
+    """
+    Full-board scans (legal move searches that walk the board) per visited node
+    of a fixed-depth search on the tile-matrix Board, with the early-exit has_legal_move
+    of the original board (before) and with the one that fills the legal moves cache (after)
+    """
+    positions = position_set(args.positions, seed=args.seed)
+    originals = {name: getattr(Board, name)
+                 for name in ('find_legal_moves_dense', 'find_legal_moves_sparse', 'has_legal_move')}
+    variants = (
+        ('early-exit has_legal_move', early_exit_has_legal_move),
+        ('cached has_legal_move', originals['has_legal_move']),
+    )
+    for variant, has_legal_move in variants:
+        methods = dict(originals, has_legal_move=has_legal_move)
+        scans = 0
+
+        def counting(name):
+            def wrapper(board, color):
+                nonlocal scans
+                cached = board._legal_moves[color] is not None
+                result = methods[name](board, color)
+                # has_legal_move only counts when it walked the board without filling the cache
+                # (otherwise the scan is counted by the legal moves finder it used)
+                if name != 'has_legal_move' or (not cached and board._legal_moves[color] is None):
+                    scans += 1
+                return result
+            return wrapper
+
+        for name in methods:
+            setattr(Board, name, counting(name))
+        try:
+            start = time.perf_counter()
+            nodes = count_nodes(positions, args.depth)
+            elapsed = time.perf_counter() - start
+        finally:
+            for name, method in originals.items():
+                setattr(Board, name, method)
+        print(f'{variant:>26}: {nodes} nodes, {scans} board scans ({scans / nodes:.2f} scans/node), '
+              f'{nodes / elapsed:.0f} nodes/s')
+
+
+def bench_eval(args):
+    """
+    Time of a fixed-depth search (table, ordering and pvs, as in the tournament agent)
+    with the tile-loop evaluations and their bitboard versions
+    """
+    positions = as_bitboards(position_set(args.positions, seed=args.seed))
+    variants = (
+        ('evaluate_mask', evaluate_mask),
+        ('evaluate_mask_bits', evaluate_mask_bits),
+        ('evaluate_custom', evaluate_custom),
+        ('evaluate_custom_bits', evaluate_custom_bits),
+    )
+    for name, eval_func in variants:
+        nodes = 0
+        start = time.perf_counter()
+        for state in positions:
+            tt = TranspositionTable()
+            tt.new_search(state.player)
+            ctx = SearchContext(tt, orderer=MoveOrderer(prior=positional_prior(EVAL_TEMPLATE)))
+            search(state, float('-inf'), float('inf'), args.depth, eval_func, ctx, True)
+            nodes += ctx.nodes
+        elapsed = time.perf_counter() - start
+        print(f'{name:>20}: {nodes} nodes in {elapsed:.3f}s ({nodes / elapsed:.0f} nodes/s)')
+
+
+def bench_parallel(args):
+    """
+    Time to finish a fixed-depth iterative deepening (table, ordering and pvs) with the
+    sequential search and with the root moves split among 1, 2, 4... worker processes
+    (the pools are started before the clock, as they are reused between moves)
+    """
+    positions = as_bitboards(position_set(args.positions, seed=args.seed))
+    start = time.perf_counter()
+    nodes = 0
+    for state in positions:
+        info = {}
+        iterative_deepening_move(state, 600, evaluate_custom_bits, max_depth=args.depth, tt=TranspositionTable(),
+                                 orderer=MoveOrderer(prior=positional_prior(EVAL_TEMPLATE)), pvs=True, info=info)
+        nodes += info['nodes']
+    elapsed = time.perf_counter() - start
+    print(f'{"sequential":>12}: {elapsed:.3f}s, {nodes} nodes ({nodes / elapsed:.0f} nodes/s)')
+
+    for workers in args.workers:
+        search = RootSplitSearch(workers)
+        search.start()
+        search.pool.submit(time.sleep, 0).result()
+        start = time.perf_counter()
+        for state in positions:
+            search.iterative_deepening_move(state, 600, evaluate_custom_bits, max_depth=args.depth, pvs=True)
+        elapsed = time.perf_counter() - start
+        nodes = search.stats()['nodes']
+        search.shutdown()
+        print(f'{workers:>4} workers: {elapsed:.3f}s, {nodes} nodes ({nodes / elapsed:.0f} nodes/s)')
+
+
+def bench_lazysmp(args):
+    """
+    Scaling of the lazy SMP search: mean time to complete a fixed depth and
+    nodes/sec of all the workers together, for each number of worker processes
+    (the pools are started before the clock, as they are reused between moves)
+    """
+    positions = as_bitboards(position_set(args.positions, seed=args.seed))
+    for workers in args.workers:
+        search = LazySMPSearch(workers)
+        search.start()
+        elapsed = nodes = 0
+        for state in positions:
+            search.table.clear()    # each position starts from an empty table, as in a single move
+            info = {}
+            start = time.perf_counter()
+            search.iterative_deepening_move(state, 600, evaluate_custom_bits, max_depth=args.depth, pvs=True, info=info)
+            elapsed += time.perf_counter() - start
+            nodes += info['nodes']
+        search.shutdown()
+        print(f'{workers:>4} workers: time to depth {args.depth} {elapsed / len(positions):.3f}s, '
+              f'{nodes} nodes ({nodes / elapsed:.0f} nodes/s)')
+
+
+def bench_mcts(args):
+    """
+    Playouts/sec of the UCT engine from the initial state of each game
+    (and of othello with the RAVE statistics)
+    """
+    games = (
+        ('othello Board', GameState(Board(), Board.BLACK), 0),
+        ('othello BitBoard', GameState(BitBoard(), BitBoard.BLACK), 0),
+        ('othello RAVE', GameState(BitBoard(), BitBoard.BLACK), args.rave),
+        ('tttm', TTTMGameState(TTTMBoard(), 'B'), 0),
+    )
+    for name, state, rave in games:
+        engine = MCTS(time_budget=args.budget, seed=args.seed, rave=rave)
+        move = engine.search(state)
+        stats = engine.stats()
+        print(f'{name:>16}: {stats["playouts"]} playouts in {stats["elapsed"]:.2f}s '
+              f'({stats["playouts_per_sec"]:.0f} playouts/s), {stats["nodes"]} nodes, move {move}')
+
+    engine = ValueMCTS(evaluate_custom_batch, time_budget=args.budget, seed=args.seed)
+    move = engine.search(GameState(BitBoard(), BitBoard.BLACK))
+    stats = engine.stats()
+    print(f'{"othello value":>16}: {stats["playouts"]} leaf evaluations in {stats["elapsed"]:.2f}s '
+          f'({stats["playouts_per_sec"]:.0f} leaves/s), {stats["nodes"]} nodes, move {move}')
+
+
+def bench_playout(args):
+    """
+    Random games/sec from the initial state of each game, with a loop of next_state
+    calls and with the playout kernel (state.rollout)
+    """
+    games = (
+        ('othello Board', GameState(Board(), Board.BLACK)),
+        ('othello BitBoard', GameState(BitBoard(), BitBoard.BLACK)),
+        ('tttm', TTTMGameState(TTTMBoard(), 'B')),
+    )
+    for name, initial in games:
+        for method in ('next_state', 'rollout'):
+            rng = random.Random(args.seed)
+            games_played = 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < args.budget:
+                if method == 'rollout':
+                    initial.rollout(rng)
+                else:
+                    state = initial
+                    while not state.is_terminal():
+                        state = state.next_state(rng.choice(tuple(state.legal_moves())))
+                games_played += 1
+            elapsed = time.perf_counter() - start
+            print(f'{name:>16} {method:>10}: {games_played / elapsed:.0f} games/s')
+
+
+def bench_mcts_parallel(args):
+    """
+    Playouts/sec of root-parallel and leaf-parallel MCTS from the initial othello
+    position, for each number of worker processes (a first search starts the pools),
+    after the sequential MCTS with the same budget
+    """
+    state = GameState(BitBoard(), BitBoard.BLACK)
+    sequential = MCTS(time_budget=args.budget, seed=args.seed)
+    sequential.search(state)
+    stats = sequential.stats()
+    print(f'  sequential: {stats["playouts"]} playouts ({stats["playouts_per_sec"]:.0f} playouts/s)')
+    for workers in args.workers:
+        for name, engine in (('root', RootParallelMCTS(workers, time_budget=args.budget)),
+                             ('leaf', LeafParallelMCTS(workers, batch=args.batch, time_budget=args.budget))):
+            engine.time_budget = 0.1
+            engine.search(state)
+            engine.time_budget = args.budget
+            engine.reset_stats()
+            engine.search(state)
+            stats = engine.stats()
+            engine.shutdown()
+            print(f'{workers:>4} workers, {name}-parallel: {stats["playouts"]} playouts '
+                  f'({stats["playouts_per_sec"]:.0f} playouts/s)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Micro-benchmarks of the othello board and search.')
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help='Random seed used to generate the position set.')
+    parser.add_argument('-n', '--positions', type=int, default=20,
+                        help='Number of positions in the fixed position set.')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    copy_parser = subparsers.add_parser('copy', help='Board.copy: string round-trip vs structural copy.')
+    copy_parser.add_argument('-r', '--repeat', type=int, default=100,
+                             help='Number of passes over the position set.')
+    copy_parser.set_defaults(func=bench_copy)
+
+    tt_parser = subparsers.add_parser('tt', help='Transposition table counters for several sizes.')
+    tt_parser.add_argument('-d', '--depth', type=int, default=5,
+                           help='Search depth for each position.')
+    tt_parser.add_argument('--sizes', type=int, nargs='+', default=[10, 14, 18],
+                           help='Table sizes to try, as powers of two (0 entries = no table is always run).')
+    tt_parser.set_defaults(func=bench_tt)
+
+    ordering_parser = subparsers.add_parser('ordering', help='Alpha-beta with each move ordering heuristic.')
+    ordering_parser.add_argument('-d', '--depth', type=int, default=5,
+                                 help='Search depth for each position.')
+    ordering_parser.set_defaults(func=bench_ordering)
+
+    pvs_parser = subparsers.add_parser('pvs', help='Plain alpha-beta vs principal variation search.')
+    pvs_parser.add_argument('-d', '--depth', type=int, default=5,
+                            help='Search depth for each position.')
+    pvs_parser.set_defaults(func=bench_pvs)
+
+    aspiration_parser = subparsers.add_parser('aspiration', help='Iterative deepening with aspiration windows.')
+    aspiration_parser.add_argument('-b', '--budget', type=float, default=1.0,
+                                   help='Time budget per position, in seconds.')
+    aspiration_parser.add_argument('--deltas', type=float, nargs='+', default=[2, 5, 10],
+                                   help='Initial window half-widths to try (the full window is always run).')
+    aspiration_parser.set_defaults(func=bench_aspiration)
+
+    legal_parser = subparsers.add_parser('legal', help='Legal move generation on a random-playout corpus.')
+    legal_parser.add_argument('-r', '--repeat', type=int, default=5,
+                              help='Number of passes over the corpus.')
+    legal_parser.set_defaults(func=bench_legal)
+
+    scans_parser = subparsers.add_parser('scans', help='Legal move board scans per visited node, before and after caching has_legal_move.')
+    scans_parser.add_argument('-d', '--depth', type=int, default=3,
+                              help='Search depth for each position.')
+    scans_parser.set_defaults(func=bench_scans)
+
+    eval_parser = subparsers.add_parser('eval', help='Tile-loop vs bitboard evaluation.')
+    eval_parser.add_argument('-d', '--depth', type=int, default=4,
+                             help='Search depth for each position.')
+    eval_parser.set_defaults(func=bench_eval)
+
+    parallel_parser = subparsers.add_parser('parallel', help='Sequential vs root-splitting search in processes.')
+    parallel_parser.add_argument('-d', '--depth', type=int, default=5,
+                                 help='Search depth for each position.')
+    parallel_parser.add_argument('-w', '--workers', type=int, nargs='+', default=[1, 2, 4],
+                                 help='Numbers of worker processes to try.')
+    parallel_parser.set_defaults(func=bench_parallel)
+
+    lazysmp_parser = subparsers.add_parser('lazysmp', help='Lazy SMP scaling with the number of processes.')
+    lazysmp_parser.add_argument('-d', '--depth', type=int, default=5,
+                                help='Depth each position is searched to.')
+    lazysmp_parser.add_argument('-w', '--workers', type=int, nargs='+', default=[1, 2, 4, 8],
+                                help='Numbers of worker processes to try.')
+    lazysmp_parser.set_defaults(func=bench_lazysmp)
+
+    mcts_parser = subparsers.add_parser('mcts', help='Playouts/sec of the UCT engine (and leaves/sec with a value function).')
+    mcts_parser.add_argument('-b', '--budget', type=float, default=2.0,
+                             help='Search time for each game, in seconds.')
+    mcts_parser.add_argument('--rave', type=float, default=1000,
+                             help='RAVE equivalence parameter of the othello RAVE line.')
+    mcts_parser.set_defaults(func=bench_mcts)
+
+    playout_parser = subparsers.add_parser('playout', help='Random games/sec: next_state loop vs state.rollout.')
+    playout_parser.add_argument('-b', '--budget', type=float, default=1.0,
+                                help='Time for each game and method, in seconds.')
+    playout_parser.set_defaults(func=bench_playout)
+
+    mcts_parallel_parser = subparsers.add_parser('mcts-parallel', help='Root- and leaf-parallel MCTS scaling.')
+    mcts_parallel_parser.add_argument('-b', '--budget', type=float, default=2.0,
+                                      help='Search time for each configuration, in seconds.')
+    mcts_parallel_parser.add_argument('-w', '--workers', type=int, nargs='+', default=[1, 2, 4],
+                                      help='Numbers of worker processes to try.')
+    mcts_parallel_parser.add_argument('--batch', type=int, default=4,
+                                      help='Playouts of each leaf (leaf parallelism).')
+    mcts_parallel_parser.set_defaults(func=bench_mcts_parallel)
+
+    args = parser.parse_args()
+    args.func(args)
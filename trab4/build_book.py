@@ -0,0 +1,127 @@
+import os
+import time
+import argparse
+import tempfile
+
+from advsearch.othello.bitboard import BitBoard
+from advsearch.othello.gamestate import GameState
+from advsearch.Othellas.book import BOOK_FILE, canonical, canonical_entry, write_book
+from advsearch.Othellas.minimax import iterative_deepening_move
+from advsearch.Othellas.transposition import TranspositionTable
+from advsearch.Othellas.ordering import MoveOrderer, positional_prior
+from advsearch.Othellas.othello_minimax_mask import EVAL_TEMPLATE
+from advsearch.Othellas.tournament_agent import EVALUATE
+
+
+def state_key(state) -> int:
+    """
+    Returns the canonical key of the state (the same for its 8 symmetric copies)
+    """
+    black, white = state.get_board().bits(BitBoard.BLACK)
+    return canonical(black, white, state.player)[0]
+
+
+def expand(plies: int) -> list:
+    """
+    Returns every position reachable from the initial board in at most 'plies' moves,
+    without symmetric duplicates
+    """
+    frontier = [GameState(BitBoard(), 'B')]
+    seen = {state_key(frontier[0])}
+    states = list(frontier)
+    for _ in range(plies):
+        children = []
+        for state in frontier:
+            for move in sorted(state.legal_moves()):
+                child = state.next_state(move)
+                key = state_key(child)
+                if key not in seen and not child.is_terminal():
+                    seen.add(key)
+                    children.append(child)
+        states.extend(children)
+        frontier = children
+    return states
+
+
+def replay_history(path: str, max_ply: int) -> list:
+    """
+    Returns the positions of the first 'max_ply' moves of a history file written by server.py
+    (illegal moves are skipped, like the server does)
+    """
+    state = GameState(BitBoard(), 'B')
+    states = [state]
+    with open(path) as f:
+        for line in f:
+            if len(states) > max_ply or state.is_terminal():
+                break
+            x, y, color = line.strip().split(',')
+            move = (int(x), int(y))
+            if color == state.player and state.is_legal_move(move):
+                state = state.next_state(move)
+                states.append(state)
+    return [state for state in states[:max_ply] if not state.is_terminal()]
+
+
+def selfplay(n_games: int, agents: list, delay: float, max_ply: int) -> list:
+    """
+    Plays n_games matches with server.Server between the two agents (swapping colors
+    at each match) and returns the positions of their first max_ply moves
+    """
+    import server  # only needed (and importable) when running from the trab4 directory
+
+    states = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for game in range(n_games):
+            black, white = agents if game % 2 == 0 else agents[::-1]
+            history = os.path.join(tmp, 'history%d.txt' % game)
+            match = server.Server('othello', black, white, delay, history, os.path.join(tmp, 'result.xml'),
+                                  verbose=False)
+            match.run()
+            match.history_file.close()
+            states.extend(replay_history(history, max_ply))
+            print('game %d: %s (B) x %s (W) finished' % (game + 1, black, white))
+    return states
+
+
+def best_move(state, budget: float):
+    """
+    Returns the move of a deep search of the state (the tournament search, with more time)
+    """
+    return iterative_deepening_move(
+        state, budget, EVALUATE, tt=TranspositionTable(),
+        orderer=MoveOrderer(prior=positional_prior(EVAL_TEMPLATE)), pvs=True
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Builds the opening book of the tournament agent.')
+    parser.add_argument('-p', '--plies', type=int, default=4,
+                        help='Every position up to this many moves from the start enters the book.')
+    parser.add_argument('-g', '--games', type=int, default=0,
+                        help='Number of self-play matches (server.Server) whose openings also enter the book.')
+    parser.add_argument('--agents', nargs=2, default=['advsearch/Othellas/tournament_agent.py',
+                                                      'advsearch/randomplayer/agent.py'],
+                        help='Agents of the self-play matches.')
+    parser.add_argument('--delay', type=float, default=5.0, help='Time limit per move of the self-play matches.')
+    parser.add_argument('--max-ply', type=int, default=12,
+                        help='Positions of the self-play matches after this many moves are ignored.')
+    parser.add_argument('-b', '--budget', type=float, default=10.0, help='Search time of each book position.')
+    parser.add_argument('-o', '--output', default=BOOK_FILE, help='Book file to write.')
+    args = parser.parse_args()
+
+    candidates = expand(args.plies)
+    if args.games:
+        candidates.extend(selfplay(args.games, args.agents, args.delay, args.max_ply))
+
+    entries = {}
+    start = time.time()
+    for state in candidates:
+        key = state_key(state)
+        if key in entries:
+            continue
+        move = best_move(state, args.budget)
+        entries[key] = canonical_entry(state, move)[1]
+        print('%d positions searched (%.0fs)' % (len(entries), time.time() - start))
+
+    write_book(args.output, entries)
+    print('book with %d positions saved to %s (%d bytes)' % (len(entries), args.output, os.path.getsize(args.output)))
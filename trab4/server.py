@@ -22,7 +22,7 @@ class Server(object):
 
     """
 
-    def __init__(self, game_type, p1_agent, p2_agent, delay, history, output, pace=0):
+    def __init__(self, game_type, p1_agent, p2_agent, delay, history, output, pace=0, verbose=True):
         """
         Initializes the Game server
         :param game_type: type of game to play (othello, tttm for tic-tac-toe misere)
@@ -32,6 +32,7 @@ class Server(object):
         :param history: file that will contain the match history (plain text)
         :param output: file to save game details (includes history)
         :param pace: time to wait to display a move, if a player returns before timeout
+        :param verbose: whether to print the boards and messages of the match
         """
 
         if game_type not in {'othello', 'tttm'}:
@@ -68,8 +69,10 @@ class Server(object):
 
         self.delay = delay
         self.pace = pace
+        self.verbose = verbose
 
         self.result = None
+        self.disqualified = None    # color of the player disqualified for illegal moves, if any
 
         # start and finish times of match
         self.start = None
@@ -87,14 +90,22 @@ class Server(object):
     def __del__(self):
         self.history_file.close()
 
+    def log(self, *args):
+        """
+        Prints a message of the match (if the server is verbose)
+        """
+        if self.verbose:
+            print(*args)
+
     def run(self):
         self.start = time.localtime()
 
         illegal_count = {'B': 0, 'W': 0}  # counts the number of illegal move attempts
 
-        print(f'---- Current match: {self.player_dirs["B"]} (B) x (W) {self.player_dirs["W"]} ----')
-        print('Initial board:')
-        print(self.state.board.decorated_str(colors=False))
+        self.log(f'---- Current match: {self.player_dirs["B"]} (B) x (W) {self.player_dirs["W"]} ----')
+        self.log('Initial board:')
+        if self.verbose:
+            print(self.state.board.decorated_str(colors=False))
 
         while True:  # runs until endgame
             # creates auxiliary variables for better readability
@@ -110,21 +121,21 @@ class Server(object):
                 p1_score = 1 if winner == 'B' else -1 if winner == 'W' else 0
                 p2_score = -1 if winner == 'B' else 1 if winner == 'W' else 0
 
-            print(f'---- Current match: {self.player_dirs["B"]} (B) x (W) {self.player_dirs["W"]} ----')
+            self.log(f'---- Current match: {self.player_dirs["B"]} (B) x (W) {self.player_dirs["W"]} ----')
 
             # checks whether both players don't have available moves (end of game)
             if self.state.is_terminal():
 
-                print('End of game reached! Scores:')
-                print(f'Player 1 (B - {self.player_dirs["B"]}): {p1_score}')
-                print(f'Player 2 (W - {self.player_dirs["W"]}): {p2_score}')
+                self.log('End of game reached! Scores:')
+                self.log(f'Player 1 (B - {self.player_dirs["B"]}): {p1_score}')
+                self.log(f'Player 2 (W - {self.player_dirs["W"]}): {p2_score}')
 
                 if p1_score > p2_score:
-                    print(f'Player 1 (B - {self.player_dirs["B"]} wins!')
+                    self.log(f'Player 1 (B - {self.player_dirs["B"]} wins!')
                 elif p2_score > p1_score:
-                    print(f'Player 2 (W - {self.player_dirs["W"]}) wins!')
+                    self.log(f'Player 2 (W - {self.player_dirs["W"]}) wins!')
                 else:
-                    print('Draw!')
+                    self.log('Draw!')
 
                 self.result = 0 if p1_score > p2_score else 1 if p2_score > p1_score else 2
                 self.finish = time.localtime()
@@ -132,18 +143,19 @@ class Server(object):
             
             # disqualify player if it attempts illegal moves 5 times in a row
             if illegal_count[current_player] >= 5:
-                print(f'Player {current_player} ({self.player_dirs[current_player]}) DISQUALIFIED! Too many illegal move attempts.')
-                print('End of game reached!')
-                print('Player 1 (B): %d' % p1_score)
-                print('Player 2 (W): %d' % p2_score)
+                self.log(f'Player {current_player} ({self.player_dirs[current_player]}) DISQUALIFIED! Too many illegal move attempts.')
+                self.log('End of game reached!')
+                self.log('Player 1 (B): %d' % p1_score)
+                self.log('Player 2 (W): %d' % p2_score)
 
                 self.result = 0 if current_player == 'W' else 1
+                self.disqualified = current_player
                 self.finish = time.localtime()
                 return self.result
 
             # if this player is moving twice, shows a message that the opponent has no legal moves
             if self.last_player == current_player:
-                print(f'Player {opponent} ({self.player_dirs[opponent]}) has no legal moves. {self.player_dirs[current_player]} will play again')
+                self.log(f'Player {opponent} ({self.player_dirs[opponent]}) has no legal moves. {self.player_dirs[current_player]} will play again')
                 time.sleep(self.pace)
 
             # creates a copy of the state, so that player can do whathever it wants
@@ -159,7 +171,7 @@ class Server(object):
             elapsed = time.time() - start
 
             if move is None:  # detects timeout
-                print(f'Player {current_player} has not made a move and lost its turn. Illegal moves count incremented')
+                self.log(f'Player {current_player} has not made a move and lost its turn. Illegal moves count incremented')
                 illegal_count[current_player] += 1
                 continue
 
@@ -167,7 +179,7 @@ class Server(object):
 
              # checks for move validity
             if not isinstance(move_x, int) or not isinstance(move_y, int):
-                print(f'ILLEGAL MOVE! x, y are {type(move_x)}, {type(move_y)} but should be integer!')
+                self.log(f'ILLEGAL MOVE! x, y are {type(move_x)}, {type(move_y)} but should be integer!')
                 move_x = move_y = -1  # -1 is my code for type error
                 #illegal_count[current_player] += 1
 
@@ -177,23 +189,24 @@ class Server(object):
             self.history.append(((move_x, move_y), current_player))
 
             if self.state.is_legal_move(move):   
-                print('Player %s move %d,%d accepted.' % (current_player, move_x, move_y))
+                self.log('Player %s move %d,%d accepted.' % (current_player, move_x, move_y))
             
                 self.last_player = current_player           # records the player that just moved
                 self.state = self.state.next_state(move)  
 
             else:
-                print(f'Player {current_player} move {move}_ILLEGAL!')
+                self.log(f'Player {current_player} move {move}_ILLEGAL!')
                 illegal_count[current_player] += 1
 
             # waits the remaining time, if needed
             if self.pace - elapsed > 0:
                 time.sleep(self.pace - elapsed)
 
-            print('Current board:')
-            print(self.state.board.decorated_str(
-                colors=False, move=(move_y, move_x), highlight_flipped=True
-            ))
+            self.log('Current board:')
+            if self.verbose:
+                print(self.state.board.decorated_str(
+                    colors=False, move=(move_y, move_x), highlight_flipped=True
+                ))
 
 
     def write_output(self):
@@ -277,6 +290,7 @@ if __name__ == '__main__':
     args = parser.parse_args()
     p1, p2 = args.players
 
+    timer.set_time_budget(args.delay)   # the agents search a bit less than the delay
     s = Server(args.game_type, p1, p2, args.delay, args.history, args.output, args.pace)
     s.run()
     s.write_output()
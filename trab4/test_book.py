@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from advsearch.othello.bitboard import BitBoard, flip_vertical, mirror_horizontal, transpose
+from advsearch.othello.gamestate import GameState
+from advsearch.Othellas.book import OpeningBook, canonical_entry, write_book, symmetry
+
+import build_book
+
+
+def mirrored(state, sym):
+    """
+    Retorna a copia simetrica do estado (mesma jogada a fazer, tabuleiro rotacionado/refletido)
+    """
+    board = BitBoard()
+    board.black = symmetry(state.board.black, sym)
+    board.white = symmetry(state.board.white, sym)
+    board.piece_count = state.board.piece_count.copy()
+    board.zobrist = board.zobrist_hash()
+    return GameState(board, state.player)
+
+
+class TestOpeningBook(unittest.TestCase):
+    """
+    Testa o livro de aberturas: simetrias, arquivo e consulta
+    """
+
+    def test_symmetries(self):
+        """
+        As 8 simetrias sao distintas e cada transformacao aplicada duas vezes volta ao original
+        """
+        bits = 0x0000000000000107   # 3 casas na primeira linha e 1 na segunda: sem simetria propria
+        self.assertEqual(len({symmetry(bits, sym) for sym in range(8)}), 8)
+        for transform in (flip_vertical, mirror_horizontal, transpose):
+            self.assertEqual(transform(transform(bits)), bits)
+
+    def test_lookup_symmetric_positions(self):
+        """
+        A jogada guardada para uma posicao e' devolvida, convertida, para todas as suas copias simetricas
+        (em posicoes que sao simetricas a si mesmas, pode vir uma jogada equivalente, que leva a mesma posicao)
+        """
+        states = build_book.expand(2)
+        entries = {}
+        moves = {}
+        for state in states:
+            move = min(state.legal_moves())
+            key, square = canonical_entry(state, move)
+            entries[key] = square
+            moves[key] = (state, move)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'book.bin')
+            write_book(path, entries)
+            book = OpeningBook(path)
+            self.assertEqual(len(book), len(states))
+            for state, move in moves.values():
+                for sym in range(8):
+                    copy = mirrored(state, sym)
+                    square = symmetry(1 << (move[1] * 8 + move[0]), sym).bit_length() - 1
+                    expected = copy.next_state((square % 8, square // 8))
+                    found = copy.next_state(book.lookup(copy))
+                    self.assertEqual(build_book.state_key(found), build_book.state_key(expected))
+
+            # posicao fora do livro (depois de 3 jogadas)
+            self.assertIsNone(book.lookup(build_book.expand(3)[-1]))
+            book.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
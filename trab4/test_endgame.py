@@ -0,0 +1,66 @@
+import random
+import time
+import unittest
+
+from advsearch.othello.bitboard import BitBoard
+from advsearch.othello.gamestate import GameState
+
+import advsearch.Othellas.minimax as minimax
+from advsearch.Othellas.endgame import EndgameSolver, endgame_move
+
+
+def endgame_states(n, empties, seed=0):
+    """
+    Gera n estados do othello com 'empties' casas vazias, jogando aleatoriamente a partir do inicio
+    """
+    rng = random.Random(seed)
+    states = []
+    while len(states) < n:
+        state = GameState(BitBoard(), 'B')
+        while not state.is_terminal() and state.get_board().piece_count['.'] > empties:
+            state = state.next_state(rng.choice(sorted(state.legal_moves())))
+        if not state.is_terminal() and state.get_board().piece_count['.'] == empties:
+            states.append(state)
+    return states
+
+
+def disc_difference(state, player):
+    """
+    Diferenca de pecas para o jogador (usada como utilidade na busca minimax completa)
+    """
+    board = state.get_board()
+    return board.num_pieces(player) - board.num_pieces(board.opponent(player))
+
+
+class TestEndgameSolver(unittest.TestCase):
+    """
+    Testa o resolvedor exato de finais de jogo
+    """
+
+    def test_same_value_as_minimax(self):
+        """
+        O valor exato e' o da busca minimax completa, e o modo WLD acerta o sinal
+        """
+        solver = EndgameSolver()
+        for state in endgame_states(10, 6):
+            value, move = solver.solve(state)
+            expected, _ = minimax.maxGain(state, float('-inf'), float('inf'), state.player, -1, disc_difference)
+            self.assertEqual(value, expected)
+            self.assertIn(move, state.legal_moves())
+
+            wld, _ = solver.solve(state, wld=True)
+            self.assertEqual((wld > 0) - (wld < 0), (value > 0) - (value < 0))
+
+    def test_deadline(self):
+        """
+        Com um prazo ja vencido o resolvedor desiste com SearchTimeout
+        """
+        solver = EndgameSolver()
+        state = endgame_states(1, 20)[0]
+        with self.assertRaises(minimax.SearchTimeout):
+            endgame_move(state, solver, time.time())
+        self.assertEqual(solver.stats()['timeouts'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
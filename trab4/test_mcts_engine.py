@@ -0,0 +1,239 @@
+import time
+import multiprocessing
+import random
+import threading
+import unittest
+
+import advsearch.Othellas.mcts as mcts
+import advsearch.Othellas.minimax as minimax
+import advsearch.Othellas.tttm_minimax as tttm_agent
+from advsearch.tttm.board import Board as TTTMBoard
+from advsearch.tttm.gamestate import GameState as TTTMGameState
+from advsearch.othello.board import Board
+from advsearch.othello.bitboard import BitBoard
+from advsearch.othello.gamestate import GameState as OthelloGameState
+from advsearch.Othellas.evaluation import evaluate_custom_batch
+
+
+class TestMCTSEngine(unittest.TestCase):
+    """
+    Testa o motor UCT em um final de tic-tac-toe misere
+    """
+
+    def test_solves_tttm_endgame(self):
+        """
+        A arvore inteira e' explorada antes do fim do orcamento: a busca para com o resultado
+        exato da raiz e escolhe uma jogada que empata (as outras perdem)
+        """
+        state = TTTMGameState(TTTMBoard.from_string("BW.\n.B.\nW.."), 'W')
+        engine = mcts.MCTS(time_budget=30, seed=0)
+        move = engine.search(state)
+        self.assertNotEqual(engine.proven[0], mcts.UNKNOWN)
+        self.assertLess(engine.stats()['elapsed'], 5)
+
+        child = state.next_state(move)
+        inf = float('inf')
+        value, _ = minimax.next_gain(child, 'W')(child, -inf, inf, 'W', inf, tttm_agent.utility)
+        self.assertEqual(value, 0)
+
+    def test_iteration_budget(self):
+        """
+        Com orcamento de iteracoes, a busca faz exatamente esse numero de simulacoes
+        """
+        engine = mcts.MCTS(iterations=50, time_budget=None, seed=0)
+        move = engine.search(TTTMGameState(TTTMBoard(), 'B'))
+        self.assertIn(move, TTTMGameState(TTTMBoard(), 'B').legal_moves())
+        self.assertEqual(engine.stats()['playouts'], 50)
+        self.assertEqual(engine.visits[0], 50)
+
+    def test_tree_reuse(self):
+        """
+        Depois da jogada e da resposta do adversario, a busca parte da subarvore do novo estado:
+        as simulacoes herdadas sao contadas e a arvore compactada continua consistente
+        """
+        state = TTTMGameState(TTTMBoard(), 'B')
+        engine = mcts.MCTS(iterations=2000, time_budget=None, seed=0)
+        move = engine.search(state)
+        after_move = state.next_state(move)
+        node = engine.find_root(after_move)
+        reply = engine.move[max(range(engine.first_child[node], engine.first_child[node] + engine.n_children[node]),
+                                key=lambda child: engine.visits[child])]
+        expected = engine.visits[engine.find_root(after_move.next_state(reply))]
+        self.assertGreater(expected, 0)
+
+        engine.search(after_move.next_state(reply))
+        stats = engine.stats()
+        self.assertEqual(stats['inherited'], expected)
+        self.assertAlmostEqual(stats['last_inherited_fraction'], expected / (expected + 2000))
+        self.assertEqual(engine.parent[0], -1)
+        for node in range(1, len(engine)):
+            parent = engine.parent[node]
+            self.assertLessEqual(engine.first_child[parent], node)
+            self.assertLess(node, engine.first_child[parent] + engine.n_children[parent])
+        children = range(engine.first_child[0], engine.first_child[0] + engine.n_children[0])
+        # a raiz pode ter uma simulacao propria, de antes de ser expandida
+        self.assertIn(engine.visits[0] - sum(engine.visits[child] for child in children), (0, 1))
+
+    def test_rave(self):
+        """
+        Com RAVE, as estatisticas AMAF dos filhos da raiz contam pelo menos as suas visitas,
+        e o final de tic-tac-toe misere continua resolvido
+        """
+        state = TTTMGameState(TTTMBoard.from_string("BW.\n.B.\nW.."), 'W')
+        engine = mcts.MCTS(time_budget=30, seed=0, rave=100)
+        move = engine.search(state)
+        self.assertNotEqual(engine.proven[0], mcts.UNKNOWN)
+        children = range(engine.first_child[0], engine.first_child[0] + engine.n_children[0])
+        chosen = next(child for child in children if engine.move[child] == move)
+        self.assertEqual(engine.proven[chosen], 0.5)
+        for child in children:
+            self.assertGreaterEqual(engine.amaf_visits[child], engine.visits[child])
+            self.assertLessEqual(engine.amaf_visits[child], engine.visits[0])
+
+    def test_rave_weight(self):
+        """
+        O peso das estatisticas AMAF e' 1 sem visitas e diminui com elas, nos dois esquemas
+        """
+        for engine in (mcts.MCTS(rave=300), mcts.MCTS(rave=1, rave_bias=0.1)):
+            self.assertEqual(engine.rave_weight(0, 10), 1)
+            weights = [engine.rave_weight(n, 10 * n) for n in (1, 10, 100, 1000)]
+            self.assertEqual(weights, sorted(weights, reverse=True))
+        self.assertAlmostEqual(mcts.MCTS(rave=300).rave_weight(300, 1000), 0.5)
+
+    def test_tttm_rollout(self):
+        """
+        Com a mesma semente, a simulacao rapida do tic-tac-toe misere joga a mesma partida
+        que next_state jogando as casas vazias em ordem embaralhada
+        """
+        for seed in range(30):
+            state = TTTMGameState(TTTMBoard.from_string("B..\n.W.\n..."), 'B')
+            rng = random.Random(seed)
+            empty = [(col, row) for row in range(3) for col in range(3) if state.board.is_empty(row, col)]
+            rng.shuffle(empty)
+            reference = state
+            for move in empty:
+                if reference.is_terminal():
+                    break
+                reference = reference.next_state(move)
+            self.assertEqual(state.rollout(random.Random(seed)), reference.winner())
+
+    def test_root_parallel(self):
+        """
+        A busca com varias arvores em processos termina dentro do tempo (com a juncao das arvores)
+        e escolhe uma jogada que empata
+        """
+        state = TTTMGameState(TTTMBoard.from_string("BW.\n.B.\nW.."), 'W')
+        engine = mcts.RootParallelMCTS(workers=2, time_budget=0.5)
+        try:
+            for _ in range(2):  # a segunda busca reaproveita os processos (e suas arvores)
+                start = time.time()
+                move = engine.search(state)
+                self.assertLess(time.time() - start, 0.5 + 0.1)
+                self.assertIn(move, [(0, 1), (2, 0)])
+        finally:
+            engine.shutdown()
+        self.assertGreater(engine.stats()['playouts'], 0)
+
+    def test_merge_roots(self):
+        """
+        A arvore de um processo que rodou dois trabalhos na mesma busca so e contada uma vez
+        """
+        results = [(1, [((0, 0), 10, 5.0)], 10),
+                   (1, [((0, 0), 25, 12.0)], 15),   # mesma arvore reaproveitada, com mais visitas
+                   (2, [((0, 0), 5, 1.0), ((1, 1), 7, 3.0)], 12)]
+        visits, wins = mcts.merge_roots(results)
+        self.assertEqual(visits, {(0, 0): 30, (1, 1): 7})
+        self.assertEqual(wins, {(0, 0): 13.0, (1, 1): 3.0})
+
+    def test_stop_flag(self):
+        """
+        A busca para assim que a flag compartilhada e ligada, antes do fim do tempo
+        """
+        engine = mcts.MCTS(time_budget=5.0, seed=0)
+        engine.stop = multiprocessing.RawValue('b', 0)
+        state = OthelloGameState(BitBoard(), 'B')
+        timer = threading.Timer(0.2, lambda: setattr(engine.stop, 'value', 1))
+        start = time.time()
+        timer.start()
+        move = engine.search(state)
+        self.assertLess(time.time() - start, 1.0)
+        self.assertIn(move, state.legal_moves())
+        self.assertGreater(engine.stats()['playouts'], 0)
+
+    def test_leaf_parallel(self):
+        """
+        Cada folha nova recebe um lote de simulacoes, as folhas vao aos processos em rodadas
+        e a busca com tempo termina no prazo
+        """
+        engine = mcts.LeafParallelMCTS(workers=2, batch=3, leaves=4, iterations=60, time_budget=None, seed=0)
+        try:
+            move = engine.search(TTTMGameState(TTTMBoard(), 'B'))
+            self.assertIn(move, TTTMGameState(TTTMBoard(), 'B').legal_moves())
+            self.assertEqual(engine.visits[0] % 12, 0)     # rodadas de 4 folhas com 3 simulacoes
+            self.assertEqual(engine.visits[0], engine.stats()['playouts'])
+
+            state = OthelloGameState(BitBoard(), 'B')
+            engine.iterations, engine.time_budget = None, 0.5
+            start = time.time()
+            self.assertIn(engine.search(state), state.legal_moves())
+            self.assertLess(time.time() - start, 0.5 + 0.1)
+        finally:
+            engine.shutdown()
+
+    def test_tile_board_searched_on_bitboard(self):
+        """
+        Um estado de othello com o tabuleiro de casas (como o do servidor) e' buscado numa copia em bitboard
+        """
+        state = OthelloGameState(Board(), 'B')
+        engine = mcts.MCTS(iterations=50, time_budget=None, seed=0)
+        self.assertIn(engine.search(state), state.legal_moves())
+        self.assertIsInstance(engine.root_state.get_board(), BitBoard)
+        self.assertIsInstance(state.get_board(), Board)
+
+    def test_unrelated_state_starts_new_tree(self):
+        """
+        Um estado que nao esta' na arvore anterior comeca uma arvore nova
+        """
+        engine = mcts.MCTS(iterations=100, time_budget=None, seed=0)
+        engine.search(TTTMGameState(TTTMBoard(), 'B'))
+        engine.search(TTTMGameState(TTTMBoard.from_string("BW.\nWB.\n..."), 'B'))
+        self.assertEqual(engine.stats()['last_inherited_fraction'], 0)
+        self.assertEqual(engine.visits[0], 100)
+
+    def test_value_function(self):
+        """
+        Cada folha nova e' avaliada pela funcao de valor e conta como uma visita ate' a raiz
+        """
+        state = OthelloGameState(BitBoard(), 'B')
+        engine = mcts.ValueMCTS(evaluate_custom_batch, iterations=60, time_budget=None, seed=0)
+        move = engine.search(state)
+        self.assertIn(move, state.legal_moves())
+        self.assertEqual(engine.stats()['playouts'], 60)
+        self.assertEqual(engine.visits[0], 60)
+        first = engine.first_child[0]
+        self.assertEqual(sum(engine.visits[first:first + engine.n_children[0]]), 60)
+
+    def test_value_batches(self):
+        """
+        As folhas vao 'a funcao de valor em lotes, e a perda virtual espalha as folhas de um lote
+        (posicoes diferentes); ao final da busca nao sobra perda virtual nas visitas
+        """
+        batches = []
+
+        def value_func(states, player):
+            batches.append([str(state.get_board()) for state in states])
+            return evaluate_custom_batch(states, player)
+
+        state = OthelloGameState(BitBoard(), 'B')
+        engine = mcts.ValueMCTS(value_func, batch_size=8, iterations=64, time_budget=None, seed=0)
+        engine.search(state)
+        self.assertEqual([len(batch) for batch in batches], [8] * 8)
+        for batch in batches:
+            self.assertEqual(len(set(batch)), len(batch))
+        self.assertEqual(engine.visits[0], 64)
+        first = engine.first_child[0]
+        self.assertEqual(sum(engine.visits[first:first + engine.n_children[0]]), 64)
+
+
+if __name__ == '__main__':
+    unittest.main()
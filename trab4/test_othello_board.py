@@ -0,0 +1,303 @@
+import random
+import unittest
+
+from advsearch.othello.board import Board, RAYS, LONG_RAYS
+from advsearch.othello.bitboard import BitBoard
+from advsearch.othello.gamestate import GameState
+
+
+def random_states(n_games: int, seed: int = 42):
+    """
+    Gera os estados de n_games partidas aleatorias de othello
+    (sempre as mesmas para uma dada semente)
+    """
+    rng = random.Random(seed)
+    for _ in range(n_games):
+        state = GameState(Board(), 'B')
+        yield state
+        while not state.is_terminal():
+            state = state.next_state(rng.choice(sorted(state.legal_moves())))
+            yield state
+
+
+class TestBitBoard(unittest.TestCase):
+    """
+    Testa se o BitBoard se comporta exatamente como o Board em partidas aleatorias
+    """
+
+    def test_initial_board(self):
+        """
+        O tabuleiro inicial deve ser igual nas duas implementacoes
+        """
+        self.assertEqual(str(BitBoard()), str(Board()))
+        self.assertEqual(BitBoard().piece_count, Board().piece_count)
+
+    def test_random_games(self):
+        """
+        Reproduz partidas aleatorias nas duas implementacoes e compara estados, jogadas e pecas
+        """
+        rng = random.Random(7)
+        for _ in range(30):
+            ref = GameState(Board(), 'B')
+            bit = GameState(BitBoard(), 'B')
+            while True:
+                self.assertEqual(str(bit.board), str(ref.board))
+                self.assertEqual(bit.board.tiles, ref.board.tiles)
+                self.assertEqual(bit.board.piece_count, ref.board.piece_count)
+                self.assertEqual(bit.is_terminal(), ref.is_terminal())
+                self.assertEqual(bit.player, ref.player)
+                for color in (Board.BLACK, Board.WHITE):
+                    self.assertEqual(bit.board.legal_moves(color), ref.board.legal_moves(color))
+                if ref.is_terminal():
+                    break
+                move = rng.choice(sorted(ref.legal_moves()))
+                ref, bit = ref.next_state(move), bit.next_state(move)
+            self.assertEqual(bit.winner(), ref.winner())
+
+    def test_from_string(self):
+        """
+        from_string e __str__ devem ser inversos, como no Board
+        """
+        for state in random_states(5):
+            string = str(state.board)
+            self.assertEqual(str(BitBoard.from_string(string)), string)
+            self.assertEqual(BitBoard.from_string(string).piece_count, state.board.piece_count)
+
+    def test_illegal_move(self):
+        """
+        Jogadas ilegais nao alteram o tabuleiro
+        """
+        board = BitBoard()
+        self.assertFalse(board.process_move((0, 0), Board.BLACK))
+        self.assertFalse(board.process_move((-1, -1), Board.BLACK))
+        self.assertEqual(str(board), str(Board()))
+
+
+class TestMakeUnmake(unittest.TestCase):
+    """
+    Testa se make_move/unmake_move percorrem a arvore em um unico tabuleiro sem alterar o estado original
+    """
+
+    def check_make_unmake(self, board_class):
+        for state in random_states(3):
+            board = board_class.from_string(str(state.board))
+            player = state.player
+            if player is None:
+                continue
+            before = (str(board), dict(board.piece_count), board.legal_moves(player))
+            for move in sorted(board.legal_moves(player)):
+                expected = state.next_state(move).board
+
+                self.assertTrue(board.make_move(move, player))
+                self.assertEqual(str(board), str(expected))
+                self.assertEqual(board.piece_count, expected.piece_count)
+                board.unmake_move()
+
+                self.assertEqual((str(board), board.piece_count, board.legal_moves(player)), before)
+            self.assertFalse(board.make_move((-1, -1), player))
+
+    def test_board(self):
+        self.check_make_unmake(Board)
+
+    def test_bitboard(self):
+        self.check_make_unmake(BitBoard)
+
+    def test_process_move_between_make_and_unmake(self):
+        """
+        O unmake desfaz so' a jogada do make, mesmo com um process_move entre os dois:
+        as contagens, o hash e as jogadas legais continuam de acordo com as pecas
+        """
+        for board_class in (Board, BitBoard):
+            board = board_class()
+            board.make_move((4, 5), 'B')
+            self.assertTrue(board.process_move((3, 5), 'W'))  # nao mexe nas casas do make_move
+            board.unmake_move()     # desfaz so' o make_move: as pecas do process_move ficam
+            expected = board_class.from_string(str(board))
+            self.assertEqual(board.piece_count, expected.piece_count)
+            self.assertEqual(board.zobrist, expected.zobrist)
+            self.assertEqual(board.legal_moves('B'), expected.legal_moves('B'))
+
+    def test_unmake_without_move(self):
+        with self.assertRaises(ValueError):
+            Board().unmake_move()
+
+
+class TestLegalMoves(unittest.TestCase):
+    """
+    Testa a geracao de jogadas do Board com as tabelas de raios pre-calculadas
+    """
+
+    def test_dense_and_sparse_agree(self):
+        """
+        As buscas densa e esparsa encontram as mesmas jogadas, e has_legal_move concorda com elas
+        """
+        for state in random_states(10):
+            board = state.board
+            for color in (Board.BLACK, Board.WHITE):
+                moves = {}
+                for finder in (board.find_legal_moves_dense, board.find_legal_moves_sparse):
+                    board._legal_moves = {Board.BLACK: set(), Board.WHITE: set()}
+                    finder(color)
+                    moves[finder.__name__] = board._legal_moves[color]
+                self.assertEqual(moves['find_legal_moves_dense'], moves['find_legal_moves_sparse'])
+
+                board._legal_moves = {Board.BLACK: None, Board.WHITE: None}
+                self.assertEqual(board.has_legal_move(color), len(moves['find_legal_moves_dense']) > 0)
+
+    def test_corner_rays(self):
+        """
+        Um canto tem apenas 3 raios de 7 casas, as outras direcoes saem do tabuleiro
+        """
+        self.assertEqual(sorted(len(ray) for ray in RAYS[0][0].values()), [0, 0, 0, 0, 0, 7, 7, 7])
+        self.assertEqual(len(LONG_RAYS[0][0]), 3)
+        self.assertEqual(RAYS[0][0][Board.DOWN_RIGHT][:2], ((1, 1), (2, 2)))
+
+
+class TestStability(unittest.TestCase):
+    """
+    Testa a analise de discos estaveis do BitBoard
+    """
+
+    def test_never_flipped(self):
+        """
+        Um disco marcado como estavel nunca e' virado ate o fim da partida
+        """
+        rng = random.Random(3)
+        for _ in range(20):
+            states = [GameState(BitBoard(), 'B')]
+            while not states[-1].is_terminal():
+                states.append(states[-1].next_state(rng.choice(sorted(states[-1].legal_moves()))))
+            final = states[-1].board
+            for state in states:
+                self.assertEqual(state.board.stable_bits('B') & final.black, state.board.stable_bits('B'))
+                self.assertEqual(state.board.stable_bits('W') & final.white, state.board.stable_bits('W'))
+
+    def test_corner_and_full_line(self):
+        """
+        Discos ancorados no canto sao estaveis; o disco isolado do meio nao, mas fica estavel com a linha cheia
+        """
+        board = BitBoard.from_string("""\
+BBW.....
+B.......
+........
+...W....
+........
+........
+........
+........""")
+        self.assertEqual(board.stable_discs('B'), {(0, 0), (1, 0), (0, 1)})
+        self.assertEqual(board.stable_discs('W'), set())
+
+        full = BitBoard.from_string("""\
+BBBBBBBB
+BBBBBBBB
+BBBBBBBB
+BBBWBBBB
+BBBBBBBB
+BBBBBBBB
+BBBBBBBB
+BBBBBBBB""")
+        self.assertEqual(full.stable_discs('W'), {(3, 3)})
+
+    def test_cache_reset(self):
+        """
+        O resultado guardado no tabuleiro (nas duas classes) e' descartado quando uma jogada e' feita ou desfeita
+        """
+        position = """\
+.WB.....
+........
+........
+...WB...
+...BW...
+........
+........
+........"""
+        for board_class in (BitBoard, Board):
+            board = board_class.from_string(position)
+            self.assertEqual(board.stable_bits('B'), 0)
+            board.make_move((0, 0), 'B')
+            self.assertEqual(board.stable_bits('B'), 0b111)
+            board.unmake_move()
+            self.assertEqual(board.stable_bits('B'), 0)
+            board.process_move((0, 0), 'B')
+            self.assertEqual(board.stable_bits('B'), 0b111)
+
+
+class TestZobrist(unittest.TestCase):
+    """
+    Testa o hash zobrist incremental dos tabuleiros e a chave dos estados
+    """
+
+    def test_incremental_hash(self):
+        """
+        O hash atualizado a cada jogada deve ser igual ao recalculado do zero, nas duas implementacoes
+        """
+        for state in random_states(5):
+            bit = BitBoard.from_string(str(state.board))
+            self.assertEqual(state.board.zobrist, state.board.zobrist_hash())
+            self.assertEqual(bit.zobrist, state.board.zobrist)
+
+    def test_transposition(self):
+        """
+        Sequencias diferentes de jogadas que levam a mesma posicao geram a mesma chave
+        """
+        first = GameState(Board(), 'B').next_state((2, 3)).next_state((2, 2)).next_state((3, 2))
+        second = GameState(Board(), 'B').next_state((3, 2)).next_state((2, 2)).next_state((2, 3))
+        self.assertEqual(str(first.board), str(second.board))
+        self.assertEqual(first.key(), second.key())
+
+        # mesmo tabuleiro com outro jogador a mover tem outra chave
+        self.assertNotEqual(first.key(), GameState(first.board, 'B').key())
+
+
+def reference_rollout(state, rng):
+    """
+    Partida aleatoria com next_state, escolhendo as jogadas na ordem dos bits (y*8 + x),
+    como o random_playout dos bitboards
+    """
+    while not state.is_terminal():
+        moves = sorted(state.legal_moves(), key=lambda move: (move[1], move[0]))
+        state = state.next_state(moves[rng.randrange(len(moves))])
+    return state.winner()
+
+
+class TestRollout(unittest.TestCase):
+    """
+    Testa a simulacao rapida (state.rollout) usada pelo MCTS
+    """
+
+    def test_same_games_as_next_state(self):
+        """
+        Com a mesma semente, a simulacao em bitboards joga a mesma partida que a feita com next_state
+        (com os dois tabuleiros), inclusive com passes
+        """
+        for i, state in enumerate(random_states(3)):
+            for board in (state.board, BitBoard.from_board(state.board)):
+                start = GameState(board, state.player)
+                self.assertEqual(start.rollout(random.Random(i)), reference_rollout(start, random.Random(i)))
+
+    def test_played_moves(self):
+        """
+        As jogadas devolvidas pela simulacao, refeitas com next_state, levam ao mesmo vencedor
+        """
+        for i, state in enumerate(random_states(3)):
+            start = GameState(BitBoard.from_board(state.board), state.player)
+            moves = []
+            winner = start.rollout(random.Random(i), moves)
+            self.assertEqual(winner, start.rollout(random.Random(i)))
+            for player, move in moves:
+                self.assertEqual(start.player, player)
+                start = start.next_state(move)
+            self.assertTrue(start.is_terminal())
+            self.assertEqual(start.winner(), winner)
+
+    def test_terminal_state(self):
+        """
+        Em um estado terminal a simulacao so' retorna o vencedor
+        """
+        board = BitBoard.from_string("BBBBBBBB\n" * 5 + "WWWWWWWW\n" * 3)
+        self.assertEqual(GameState(board, None).rollout(random.Random(0)), 'B')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,20 @@
+import os
+import tempfile
 import unittest
+from unittest import mock
 
 # mude your_agent pelo nome do seu modulo nos imports abaixo
 from advsearch.Othellas.othello_minimax_count import evaluate_count 
 from advsearch.Othellas.othello_minimax_mask import evaluate_mask  
+from advsearch.Othellas.othello_minimax_custom import evaluate_custom
+from advsearch.Othellas import evaluation
+from advsearch.Othellas import patterns
 from advsearch.othello.board import Board
+from advsearch.othello.bitboard import BitBoard
 from advsearch.othello.gamestate import GameState
 
+from test_othello_board import random_states
+
 class TestEvaluateCount(unittest.TestCase):
     """
     Testa a funcao de avaliacao de contagem
@@ -170,7 +179,93 @@ WWWWWWW."""), 'B')
         self.assertEqual(score_W, expected_score_W, "Caso de teste 3W: Pontuação incorreta para o estado (Jogador W).")
 
 
+class TestBitboardEvaluations(unittest.TestCase):
+    """
+    Testa se as avaliacoes sobre bitboards (modulo evaluation) dao os mesmos valores das originais
+    """
+
+    def test_same_values(self):
+        """
+        Em partidas aleatorias, as versoes em bitboard e em lote coincidem com evaluate_mask e evaluate_custom
+        """
+        states = [GameState(BitBoard.from_board(state.board), state.player) for state in random_states(5)]
+        for player in ('B', 'W'):
+            masks = evaluation.evaluate_mask_batch(states, player)
+            customs = evaluation.evaluate_custom_batch(states, player)
+            for state, mask, custom in zip(states, masks, customs):
+                self.assertEqual(evaluation.evaluate_mask_bits(state, player), evaluate_mask(state, player))
+                self.assertEqual(mask, evaluate_mask(state, player))
+                self.assertAlmostEqual(evaluation.evaluate_custom_bits(state, player), evaluate_custom(state, player))
+                self.assertAlmostEqual(custom, evaluate_custom(state, player))
+
+    def test_tile_board(self):
+        """
+        As avaliacoes tambem aceitam estados com o Board original
+        """
+        state = GameState(Board(), 'B').next_state((2, 3))
+        self.assertEqual(evaluation.evaluate_mask_bits(state, 'B'), evaluate_mask(state, 'B'))
+
+
+class TestPatterns(unittest.TestCase):
+    """
+    Testa o avaliador por padroes (n-tuplas) e seu treinamento a partir de historicos do servidor
+    """
+
+    def test_indices(self):
+        """
+        Os indices em base 3 da borda e do canto 3x3 conferem com a contagem casa a casa
+        """
+        board = BitBoard.from_string("""\
+BWW.....
+.B......
+..W.....
+........
+........
+........
+........
+........""")
+        own, opp = board.bits('B')
+        indices = patterns.feature_indices(own, opp)
+        edge = 1 * 3 ** 0 + 2 * 3 ** 1 + 2 * 3 ** 2            # B W W na primeira linha
+        corner = edge + 1 * 3 ** 4 + 2 * 3 ** 8                 # mais o B em (1,1) e o W em (2,2)
+        self.assertEqual(indices[0], patterns.BIAS)
+        self.assertEqual(indices[1], patterns.OFFSETS['edge'] + edge)
+        self.assertEqual(indices[5], patterns.OFFSETS['corner3x3'] + corner)
+        self.assertEqual(len(indices), 1 + 4 * (5 + len(patterns.DIAGONALS)))
+
+    def test_train_and_load(self):
+        """
+        O treino com um historico ajusta os pesos na direcao do resultado, e o arquivo salvo e' lido de volta
+        """
+        moves = [(2, 3, 'B'), (2, 2, 'W'), (3, 2, 'B'), (9, 9, 'W')]   # a ultima jogada e' ilegal
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, 'history.txt')
+            with open(history, 'w') as f:
+                f.writelines('%d,%d,%s\n' % move for move in moves)
+            positions, result = patterns.read_history(history)
+            self.assertEqual(len(positions), 4)
+            self.assertEqual(result, 3)     # 5 pretas e 2 brancas no fim
+
+            weights = patterns.train([history], n_stages=1, epochs=3, log=lambda msg: None)
+            black, white = positions[-1]
+            value = sum(weights[i] for i in patterns.feature_indices(black, white))
+            self.assertGreater(value, 0)
+
+            path = os.path.join(tmp, 'weights.bin')
+            patterns.save_weights(path, weights, 1)
+            loaded, n_stages = patterns.load_weights(path)
+            self.assertEqual(n_stages, 1)
+            self.assertEqual(list(loaded), list(weights))
+
+    def test_without_weights(self):
+        """
+        Sem arquivo de pesos a avaliacao por padroes falha em vez de avaliar tudo como 0
+        """
+        state = GameState(BitBoard(), 'B')
+        with mock.patch.object(patterns, 'WEIGHTS_LOADED', False):
+            with self.assertRaises(ValueError):
+                patterns.evaluate_patterns(state, 'B')
 
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
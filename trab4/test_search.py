@@ -0,0 +1,298 @@
+import os
+import time
+import unittest
+
+from advsearch.othello.board import Board
+from advsearch.othello.bitboard import BitBoard
+from advsearch.othello.gamestate import GameState
+from advsearch.tttm.board import Board as TTTMBoard
+from advsearch.tttm.gamestate import GameState as TTTMGameState
+
+import advsearch.Othellas.minimax as minimax
+import advsearch.Othellas.tttm_minimax as tttm_agent
+from advsearch.Othellas.othello_minimax_count import evaluate_count
+from advsearch.Othellas.othello_minimax_mask import evaluate_mask, EVAL_TEMPLATE
+from advsearch.Othellas.transposition import TranspositionTable
+from advsearch.Othellas.ordering import MoveOrderer, positional_prior
+from advsearch.Othellas.evaluation import evaluate_mask_bits
+from advsearch.Othellas.parallel import RootSplitSearch
+from advsearch.Othellas.lazysmp import LazySMPSearch
+
+import advsearch.timer as timer
+import test_pruning
+
+# posicao de meio de jogo do othello, com o jogador B a mover
+MIDGAME = """\
+..W.....
+..WWB...
+.BWWWW..
+.BBWBWW.
+..BBBW..
+...BW...
+....W...
+........"""
+
+
+class TestIterativeDeepening(unittest.TestCase):
+    """
+    Testa o aprofundamento iterativo com limite de tempo
+    """
+
+    def test_respects_budget(self):
+        """
+        A busca deve retornar uma jogada legal logo apos o fim do orcamento de tempo
+        """
+        state = GameState(BitBoard.from_string(MIDGAME), 'B')
+        start = time.time()
+        move = minimax.iterative_deepening_move(state, 0.5, evaluate_count)
+        self.assertLess(time.time() - start, 1.0)
+        self.assertIn(move, state.legal_moves())
+
+    def test_time_budget_from_delay(self):
+        """
+        O tempo de busca dos agentes e' o delay do servidor menos a margem (no minimo metade
+        do delay), e sem o delay definido e' o TIME_BUDGET padrao
+        """
+        previous = os.environ.pop(timer.TIME_BUDGET_VAR, None)
+        try:
+            self.assertEqual(minimax.time_budget(), minimax.TIME_BUDGET)
+            timer.set_time_budget(3.0)
+            self.assertAlmostEqual(minimax.time_budget(), 3.0 - timer.TIME_MARGIN)
+            timer.set_time_budget(0.6)
+            self.assertAlmostEqual(minimax.time_budget(), 0.3)
+        finally:
+            os.environ.pop(timer.TIME_BUDGET_VAR, None)
+            if previous is not None:
+                os.environ[timer.TIME_BUDGET_VAR] = previous
+
+    def test_state_restored_after_timeout(self):
+        """
+        A busca anda na arvore com make/unmake no proprio estado: mesmo interrompida pelo prazo,
+        o estado recebido volta exatamente a' posicao original
+        """
+        for board in (BitBoard.from_string(MIDGAME), Board.from_string(MIDGAME)):
+            state = GameState(board, 'B')
+            before = (str(board), dict(board.piece_count), state.key(), state.player)
+            for pvs in (False, True):
+                minimax.iterative_deepening_move(state, 0.2, evaluate_count, pvs=pvs, tt=TranspositionTable())
+                self.assertEqual((str(board), board.piece_count, state.key(), state.player), before)
+                self.assertEqual(board._undo_stack, [])
+
+    def test_same_move_as_fixed_depth(self):
+        """
+        Com tempo de sobra e profundidade maxima, o resultado e' o da busca de profundidade fixa
+        """
+        state = GameState(BitBoard.from_string(MIDGAME), 'B')
+        expected = minimax.minimax_move(state, 3, evaluate_count)
+        self.assertEqual(minimax.iterative_deepening_move(state, 60, evaluate_count, max_depth=3), expected)
+
+    def test_stops_when_game_is_solved(self):
+        """
+        No tic-tac-toe misere a arvore inteira cabe no tempo: a busca para antes do fim do orcamento
+        """
+        state = TTTMGameState(TTTMBoard(), 'B')
+        start = time.time()
+        move = minimax.iterative_deepening_move(state, 30, tttm_agent.utility, tt=TranspositionTable())
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual(move, (1, 1))
+
+
+class TestMoveOrdering(unittest.TestCase):
+    """
+    Testa a ordenacao de jogadas na arvore abstrata de test_pruning e no othello
+    """
+
+    def test_abstract_tree(self):
+        """
+        A ordenacao nao muda a jogada escolhida; um prior que coloca o melhor filho
+        primeiro faz a poda acontecer no primeiro filho
+        """
+        state = test_pruning.GameState(test_pruning.Board(), 'B')
+        orderer = MoveOrderer(prior=lambda state, move: -move[1])  # prefere os filhos da esquerda
+        move = minimax.minimax_move(state, -1, test_pruning.utility, orderer=orderer)
+        self.assertEqual(move, (0, 1))
+        self.assertEqual(orderer.stats()['cutoffs'], 2)
+        self.assertEqual(orderer.stats()['first_cutoffs'], 1)
+
+    def test_fewer_nodes_in_othello(self):
+        """
+        Com killers e historico, a busca visita menos nodos e encontra o mesmo valor
+        """
+        state = GameState(BitBoard.from_string(MIDGAME), 'B')
+        counts = []
+        values = []
+        for orderer in (None, MoveOrderer()):
+            ctx = minimax.SearchContext(orderer=orderer)
+            value, _ = minimax.maxGain(state, float('-inf'), float('inf'), 'B', 4, evaluate_count, ctx)
+            counts.append(ctx.nodes)
+            values.append(value)
+        self.assertEqual(values[0], values[1])
+        self.assertLess(counts[1], counts[0])
+
+
+class TestPrincipalVariationSearch(unittest.TestCase):
+    """
+    Testa a busca por variacao principal (negascout)
+    """
+
+    def test_abstract_tree(self):
+        """
+        Na arvore abstrata de test_pruning a jogada deve ser a mesma da poda alfa-beta
+        """
+        state = test_pruning.GameState(test_pruning.Board(), 'B')
+        self.assertEqual(minimax.minimax_move(state, -1, test_pruning.utility, pvs=True), (0, 1))
+
+    def test_tttm(self):
+        """
+        A primeira jogada perfeita do tic-tac-toe misere e' no centro
+        """
+        state = TTTMGameState(TTTMBoard(), 'B')
+        self.assertEqual(minimax.minimax_move(state, -1, tttm_agent.utility, pvs=True), (1, 1))
+
+    def test_othello_midgame(self):
+        """
+        No meio de jogo do othello o valor e' o mesmo da poda alfa-beta, visitando menos nodos
+        """
+        state = GameState(BitBoard.from_string(MIDGAME), 'B')
+        results = []
+        for pvs in (False, True):
+            ctx = minimax.SearchContext(orderer=MoveOrderer(prior=positional_prior(EVAL_TEMPLATE)))
+            value, _ = minimax.search(state, float('-inf'), float('inf'), 5, evaluate_mask, ctx, pvs)
+            results.append((value, ctx.nodes))
+        (ab_value, ab_nodes), (pvs_value, pvs_nodes) = results
+        self.assertEqual(pvs_value, ab_value)
+        self.assertLess(pvs_nodes, ab_nodes)
+
+
+class TestAspirationWindows(unittest.TestCase):
+    """
+    Testa as janelas de aspiracao do aprofundamento iterativo
+    """
+
+    def test_same_result_as_full_window(self):
+        """
+        Com janelas estreitas (que falham e sao alargadas) o valor e a jogada sao os da janela completa
+        """
+        state = GameState(BitBoard.from_string(MIDGAME), 'B')
+        expected_info = {}
+        expected = minimax.iterative_deepening_move(state, 60, evaluate_mask, max_depth=4, info=expected_info)
+
+        aspiration = minimax.AspirationWindow(delta=1)
+        info = {}
+        move = minimax.iterative_deepening_move(state, 60, evaluate_mask, max_depth=4,
+                                                aspiration=aspiration, info=info)
+        self.assertEqual(move, expected)
+        self.assertEqual(info['value'], expected_info['value'])
+        self.assertEqual(info['depth'], 4)
+        stats = aspiration.stats()
+        self.assertEqual(stats['searches'], 3)  # a primeira profundidade nao tem estimativa
+        self.assertGreater(stats['fail_lows'] + stats['fail_highs'], 0)
+        self.assertEqual(aspiration.last_value, info['value'])
+
+    def test_infinite_values(self):
+        """
+        Um jogo ganho (valor infinito) encerra as re-buscas, e uma estimativa infinita usa a janela completa
+        """
+        state = GameState(BitBoard.from_string(MIDGAME), 'B')
+        won = lambda state, player: float('inf')
+        aspiration = minimax.AspirationWindow(delta=1)
+        aspiration.last_value = 0
+        value, move = aspiration.search(state, 2, won, minimax.SearchContext())
+        self.assertEqual(value, float('inf'))
+        self.assertIn(move, state.legal_moves())
+
+        searches = aspiration.searches
+        aspiration.last_value = float('-inf')
+        value, _ = aspiration.search(state, 2, evaluate_mask, minimax.SearchContext())
+        self.assertEqual(aspiration.searches, searches)
+        self.assertEqual(value, minimax.search(state, float('-inf'), float('inf'), 2, evaluate_mask,
+                                               minimax.SearchContext())[0])
+
+
+class TestRootSplitSearch(unittest.TestCase):
+    """
+    Testa a busca com os filhos da raiz divididos entre processos
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.search = RootSplitSearch(workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.search.shutdown()
+
+    def test_same_value_as_sequential(self):
+        """
+        O valor e' o da busca sequencial e a jogada escolhida tem esse valor (o processo e' reutilizado entre as buscas)
+        """
+        state = GameState(BitBoard.from_string(MIDGAME), 'B')
+        for pvs in (False, True):
+            expected_info, info = {}, {}
+            minimax.iterative_deepening_move(state, 60, evaluate_mask_bits, max_depth=3, info=expected_info)
+            move = self.search.iterative_deepening_move(state, 60, evaluate_mask_bits, max_depth=3, pvs=pvs, info=info)
+            self.assertEqual(info['depth'], 3)
+            self.assertEqual(info['value'], expected_info['value'])
+            child = state.next_state(move)
+            value, _ = minimax.next_gain(child, 'B')(child, float('-inf'), float('inf'), 'B', 2, evaluate_mask_bits)
+            self.assertEqual(value, info['value'])
+
+    def test_respects_budget(self):
+        """
+        A busca deve retornar uma jogada legal logo apos o fim do orcamento de tempo
+        """
+        state = GameState(BitBoard.from_string(MIDGAME), 'B')
+        start = time.time()
+        move = self.search.iterative_deepening_move(state, 0.5, evaluate_count)
+        self.assertLess(time.time() - start, 1.0)
+        self.assertIn(move, state.legal_moves())
+
+
+class TestLazySMP(unittest.TestCase):
+    """
+    Testa a busca lazy SMP (processos com tabela de transposicao compartilhada)
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.search = LazySMPSearch(workers=2, tt_entries=2 ** 14)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.search.shutdown()
+
+    def test_deepest_result(self):
+        """
+        A busca para quando um processo completa a profundidade maxima e retorna uma jogada legal
+        """
+        state = GameState(BitBoard.from_string(MIDGAME), 'B')
+        info = {}
+        move = self.search.iterative_deepening_move(state, 60, evaluate_mask_bits, max_depth=4, pvs=True, info=info)
+        self.assertEqual(info['depth'], 4)
+        self.assertGreater(info['nodes'], 0)
+        self.assertIn(move, state.legal_moves())
+
+    def test_respects_budget(self):
+        """
+        A busca deve retornar uma jogada legal logo apos o fim do orcamento de tempo
+        """
+        state = GameState(BitBoard.from_string(MIDGAME), 'W')
+        start = time.time()
+        info = {}
+        move = self.search.iterative_deepening_move(state, 0.5, evaluate_count, info=info)
+        self.assertLess(time.time() - start, 1.0)
+        self.assertGreaterEqual(info['depth'], 1)
+        self.assertIn(move, state.legal_moves())
+
+    def test_terminal_state(self):
+        """
+        Num fim de jogo a busca dos processos nao tem jogada, e nenhuma jogada e' retornada
+        """
+        state = GameState(BitBoard.from_string('\n'.join(['B' * 8] * 8)), 'B')
+        info = {}
+        self.assertIsNone(self.search.iterative_deepening_move(state, 5, evaluate_count, info=info))
+        self.assertGreaterEqual(info['depth'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
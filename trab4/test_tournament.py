@@ -0,0 +1,98 @@
+import io
+import unittest
+import contextlib
+from collections import Counter
+
+import tournament
+
+RANDOM = 'advsearch/randomplayer/agent.py'
+
+
+def result(black, white, winner, black_score, white_score, disqualified=None):
+    """
+    Retorna um resultado de partida no formato de tournament.play_match
+    """
+    return {'black': black, 'white': white, 'winner': winner, 'scores': {'B': black_score, 'W': white_score},
+            'disqualified': disqualified, 'moves': 60, 'elapsed': 1.0}
+
+
+class TestTournament(unittest.TestCase):
+    """
+    Testa o torneio todos-contra-todos: tabela de jogos, partidas e placar
+    """
+
+    def test_schedule(self):
+        """
+        Cada agente joga contra cada outro com as duas cores, uma vez por rodada
+        """
+        pairs = tournament.schedule(['a', 'b', 'c'], rounds=2)
+        self.assertEqual(len(pairs), 12)
+        self.assertEqual(set(Counter(pairs).values()), {2})
+        self.assertNotIn(('a', 'a'), pairs)
+
+    def test_play_match(self):
+        """
+        Uma partida de tic-tac-toe misere e' jogada sem imprimir nada e o placar bate com o vencedor
+        """
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            match = tournament.play_match('tttm', RANDOM, RANDOM, 1.0)
+        self.assertEqual(output.getvalue(), '')
+        scores = match['scores']
+        self.assertEqual(scores['B'], -scores['W'])
+        expected = 'B' if scores['B'] > 0 else 'W' if scores['W'] > 0 else None
+        self.assertEqual(match['winner'], expected)
+        self.assertGreaterEqual(match['moves'], 5)
+        self.assertIsNone(match['disqualified'])
+
+    def test_run_tournament(self):
+        """
+        Todas as partidas sao jogadas, cada uma no seu processo, e os resultados voltam ao processo principal
+        """
+        results = tournament.run_tournament('tttm', [RANDOM, 'advsearch/Othellas/tttm_minimax.py'], 1.0,
+                                            workers=2, progress=False)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(sorted((r['black'], r['white']) for r in results),
+                         sorted(tournament.schedule([RANDOM, 'advsearch/Othellas/tttm_minimax.py'])))
+
+    def test_standings(self):
+        """
+        Vitorias, empates, derrotas, pontos e diferenca de pecas sao somados com as duas cores
+        """
+        results = [
+            result('a', 'b', 'B', 40, 24),
+            result('b', 'a', 'B', 33, 31),
+            result('a', 'c', None, 32, 32),
+            result('c', 'a', 'W', 10, 54),
+        ]
+        rows = {row['agent']: row for row in tournament.standings(results)}
+        self.assertEqual([row['agent'] for row in tournament.standings(results)], ['a', 'b', 'c'])
+        self.assertEqual((rows['a']['wins'], rows['a']['draws'], rows['a']['losses']), (2, 1, 1))
+        self.assertEqual(rows['a']['points'], 2.5)
+        self.assertEqual(rows['a']['differential'], 16 - 2 + 0 + 44)
+        self.assertEqual(sum(row['differential'] for row in rows.values()), 0)
+        self.assertEqual(sum(row['points'] for row in rows.values()), len(results))
+
+        table = tournament.cross_table(results, ['a', 'b', 'c'])
+        self.assertEqual(table['a'], {'b': 1.0, 'c': 1.5})
+        self.assertEqual(table['c'], {'a': 0.5, 'b': 0.0})
+
+    def test_disqualification(self):
+        """
+        Uma desclassificacao conta como vitoria e derrota, mas as pecas da partida interrompida
+        ficam fora da diferenca de pecas
+        """
+        results = [
+            result('a', 'b', 'B', 40, 24),
+            result('b', 'a', 'W', 50, 4, disqualified='B'),
+        ]
+        rows = {row['agent']: row for row in tournament.standings(results)}
+        self.assertEqual((rows['a']['wins'], rows['b']['losses']), (2, 2))
+        self.assertEqual((rows['a']['disqualified'], rows['b']['disqualified']), (0, 1))
+        self.assertEqual((rows['a']['finished'], rows['b']['finished']), (1, 1))
+        self.assertEqual((rows['a']['differential'], rows['b']['differential']), (16, -16))
+        self.assertIn('disq', tournament.report(results, ['a', 'b']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+
+from advsearch.tttm.board import Board
+from advsearch.tttm.gamestate import GameState
+
+import advsearch.Othellas.minimax as minimax
+import advsearch.Othellas.tttm_minimax as tttm_agent
+from advsearch.Othellas.transposition import TranspositionTable, EXACT, LOWER, UPPER
+from advsearch.Othellas.lazysmp import SharedTranspositionTable, ENTRY
+
+
+class TestTranspositionTable(unittest.TestCase):
+    """
+    Testa a tabela de transposicao isoladamente e dentro da poda alfa-beta
+    """
+
+    def test_bounded_memory(self):
+        """
+        A tabela nunca guarda mais posicoes do que a capacidade
+        """
+        tt = TranspositionTable(16)
+        tt.new_search('B')
+        for key in range(1000):
+            tt.store(key, key % 7, 0, EXACT, None)
+        self.assertLessEqual(tt.size, 16)
+        self.assertEqual(tt.stats()['stores'], 1000)
+
+    def test_depth_preferred(self):
+        """
+        Uma entrada profunda nao e' substituida por uma mais rasa da mesma busca
+        """
+        tt = TranspositionTable(2)  # um unico bucket
+        tt.new_search('B')
+        tt.store(10, 5, 1, EXACT, (0, 0))
+        tt.store(20, 1, 2, EXACT, (1, 1))
+        tt.store(30, 1, 3, EXACT, (2, 2))
+        self.assertIsNotNone(tt.probe(10))
+        self.assertIsNone(tt.probe(20))     # substituida no slot always-replace
+        self.assertIsNotNone(tt.probe(30))
+
+    def test_bounds(self):
+        """
+        Limites inferiores e superiores estreitam a janela ou decidem o nodo
+        """
+        tt = TranspositionTable()
+        tt.new_search('B')
+        tt.store(1, 3, 10, LOWER, (0, 0))
+        tt.store(2, 3, -10, UPPER, (0, 0))
+        self.assertEqual(tt.lookup(1, 3, 0, 5)[0], 10)          # fail-high
+        self.assertEqual(tt.lookup(1, 3, 0, 50)[1], 10)         # alpha sobe para 10
+        self.assertEqual(tt.lookup(2, 3, -50, 0)[2], -10)       # beta desce para -10
+        self.assertIsNone(tt.lookup(1, 4, 0, 5)[0])             # profundidade insuficiente
+
+    def test_tttm_with_table(self):
+        """
+        A busca com tabela deve jogar o tic-tac-toe misere com perfeicao, como a busca sem tabela
+        """
+        tt = TranspositionTable()
+        move = minimax.minimax_move(GameState(Board(), 'B'), -1, tttm_agent.utility, tt=tt)
+        self.assertEqual(move, (1, 1))
+        self.assertGreater(tt.stats()['hits'], 0)
+
+        state = GameState(Board.from_string("..B\n...\n..."), 'W')
+        move = minimax.minimax_move(state, -1, tttm_agent.utility, tt=tt)
+        self.assertIn(move, {(0, 1), (1, 0), (1, 2), (2, 1)})
+
+
+class TestSharedTranspositionTable(unittest.TestCase):
+    """
+    Testa a tabela de transposicao em memoria compartilhada da busca lazy SMP
+    """
+
+    def test_store_and_probe(self):
+        """
+        Uma entrada gravada por uma tabela e' lida por outra sobre o mesmo buffer
+        """
+        buffer = bytearray(64 * ENTRY.size)
+        writer, reader = SharedTranspositionTable(64, buffer), SharedTranspositionTable(64, buffer)
+        writer.new_search('B')
+        reader.follow('B', writer.generation)
+        writer.store(2 ** 63 + 5, 3, -1.5, LOWER, (2, 3))
+        writer.store(7, float('inf'), 4, EXACT, None)
+        self.assertEqual(reader.probe(2 ** 63 + 5)[1:5], (3, -1.5, LOWER, (2, 3)))
+        self.assertEqual(reader.probe(7)[1:5], (float('inf'), 4, EXACT, None))
+        self.assertIsNone(reader.probe(64 + 7))
+
+    def test_torn_entry_is_ignored(self):
+        """
+        Uma entrada com dados de duas escritas (sem trava) nao corresponde a sua chave
+        """
+        buffer = bytearray(64 * ENTRY.size)
+        tt = SharedTranspositionTable(64, buffer)
+        tt.new_search('B')
+        tt.store(5, 3, 1.0, EXACT, (0, 0))
+        offset = 5 * ENTRY.size
+        buffer[offset + 8:offset + 16] = bytes(ENTRY.pack(0, 2.0, 3, EXACT, 0, 0)[8:16])   # so o valor mudou
+        self.assertIsNone(tt.probe(5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,223 @@
+import os
+import time
+import argparse
+import tempfile
+import itertools
+import multiprocessing
+from collections import defaultdict
+
+import server
+import advsearch.timer as timer
+
+
+def agent_name(path: str) -> str:
+    """
+    Returns a short name of the agent: its path without 'advsearch/' and '.py'
+    """
+    name = os.path.splitext(os.path.normpath(path))[0]
+    return server.player_name(name) or name
+
+
+def schedule(agents: list, rounds: int = 1) -> list:
+    """
+    Returns the (black, white) pairs of a round-robin: every agent plays every other
+    one with both colors, 'rounds' times
+    """
+    return [pair for _ in range(rounds) for pair in itertools.permutations(agents, 2)]
+
+
+def play_match(game_type: str, black: str, white: str, delay: float, output_dir: str = None,
+               number: int = 0) -> dict:
+    """
+    Plays a match with server.Server (pace 0, nothing printed) and returns its result
+    :param output_dir: directory where the history and the xml of the match are kept (None = discarded)
+    :param number: number of the match, used in the names of its files
+    :return: dict with the agents, the winner ('B', 'W' or None), the scores of both colors
+             (pieces in othello, 1/-1/0 in tic-tac-toe misere), the color disqualified for illegal
+             moves (or None), the number of moves and the duration
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = output_dir or tmp
+        name = '%03d_%s_x_%s' % (number, agent_name(black).replace(os.sep, '-'),
+                                 agent_name(white).replace(os.sep, '-'))
+        match = server.Server(game_type, black, white, delay, os.path.join(directory, name + '.txt'),
+                              os.path.join(directory, name + '.xml'), pace=0, verbose=False)
+        start = time.time()
+        result = match.run()
+        elapsed = time.time() - start
+        match.history_file.close()
+        if output_dir is not None:
+            match.write_output()
+
+    if match.state.game_name == 'Othello':
+        scores = {color: match.state.board.num_pieces(color) for color in 'BW'}
+    else:
+        scores = {'B': 1 if result == 0 else -1 if result == 1 else 0}
+        scores['W'] = -scores['B']
+    return {
+        'black': black,
+        'white': white,
+        'winner': 'B' if result == 0 else 'W' if result == 1 else None,
+        'scores': scores,
+        'disqualified': match.disqualified,
+        'moves': len(match.history),
+        'elapsed': elapsed,
+    }
+
+
+def _match_process(queue, number: int, *args):
+    """
+    Target of the process of a match: plays it (see play_match) and puts (number, result) in the
+    queue, or (number, exception) if the match failed
+    """
+    try:
+        queue.put((number, play_match(*args, number=number)))
+    except Exception as error:
+        queue.put((number, error))
+
+
+def run_tournament(game_type: str, agents: list, delay: float, rounds: int = 1, workers: int = None,
+                   output_dir: str = None, progress: bool = True) -> list:
+    """
+    Plays all the matches of the round-robin in parallel and returns their results (see play_match),
+    in the order they finished. Each match runs in a new process, so the agents do not carry their
+    state (search trees, tables, their own pools) from one match to the next, as when each match
+    is a separate run of server.py
+    :param workers: number of matches played at the same time (default: the number of CPUs).
+                    The agents' time limits are wall-clock times, so the agents get less search
+                    if there are more workers than CPUs
+    The agents' time budget is set from the delay (see advsearch.timer.set_time_budget)
+    """
+    timer.set_time_budget(delay)   # inherited by the processes of the matches
+    workers = workers or os.cpu_count() or 1
+    matches = list(enumerate(schedule(agents, rounds)))
+    total = len(matches)
+    queue = multiprocessing.Queue()
+    running = {}
+    results = []
+    try:
+        while matches or running:
+            while matches and len(running) < workers:
+                number, (black, white) = matches.pop(0)
+                running[number] = multiprocessing.Process(
+                    target=_match_process, args=(queue, number, game_type, black, white, delay, output_dir))
+                running[number].start()
+            number, result = queue.get()
+            running.pop(number).join()
+            if isinstance(result, Exception):
+                raise result
+            results.append(result)
+            if progress:
+                print('%d/%d %s (B) %d x %d (W) %s%s' % (
+                    len(results), total, agent_name(result['black']),
+                    result['scores']['B'], result['scores']['W'], agent_name(result['white']),
+                    ' (%s disqualified)' % result['disqualified'] if result['disqualified'] else ''), flush=True)
+    finally:
+        for process in running.values():
+            process.terminate()
+    return results
+
+
+def standings(results: list) -> list:
+    """
+    Aggregates the results by agent: matches, wins, draws, losses, points (1 per win, 0.5 per draw),
+    disqualifications and score differential (sum of the agent's score minus the opponent's, i.e.
+    the disc differential in othello). A match ended by a disqualification counts as a win and a loss,
+    but its scores (the board when the game stopped) are left out of the differential, and 'finished'
+    counts the matches that entered it. Returns one dict per agent, best first (points, then differential)
+    """
+    table = defaultdict(lambda: dict(matches=0, wins=0, draws=0, losses=0, points=0.0, disqualified=0,
+                                     finished=0, differential=0))
+    for result in results:
+        for color, opponent in (('B', 'W'), ('W', 'B')):
+            row = table[result['black'] if color == 'B' else result['white']]
+            row['matches'] += 1
+            if result['disqualified'] == color:
+                row['disqualified'] += 1
+            if not result['disqualified']:
+                row['finished'] += 1
+                row['differential'] += result['scores'][color] - result['scores'][opponent]
+            if result['winner'] is None:
+                row['draws'] += 1
+                row['points'] += 0.5
+            elif result['winner'] == color:
+                row['wins'] += 1
+                row['points'] += 1
+            else:
+                row['losses'] += 1
+    rows = [dict(agent=agent, **row) for agent, row in table.items()]
+    return sorted(rows, key=lambda row: (row['points'], row['differential']), reverse=True)
+
+
+def cross_table(results: list, agents: list) -> dict:
+    """
+    Returns the points of each agent against each other agent: table[agent][opponent]
+    """
+    table = {agent: {opponent: 0.0 for opponent in agents if opponent != agent} for agent in agents}
+    for result in results:
+        black, white = result['black'], result['white']
+        if result['winner'] is None:
+            table[black][white] += 0.5
+            table[white][black] += 0.5
+        else:
+            winner, loser = (black, white) if result['winner'] == 'B' else (white, black)
+            table[winner][loser] += 1
+    return table
+
+
+def report(results: list, agents: list) -> str:
+    """
+    Returns the text of the standings and of the cross table of the tournament
+    """
+    names = {agent: '%d %s' % (i + 1, agent_name(agent)) for i, agent in enumerate(agents)}
+    width = max(len(name) for name in names.values())
+    lines = ['%-*s %7s %5s %5s %5s %7s %5s %8s %9s' % (
+        width, 'agent', 'matches', 'wins', 'draws', 'loss', 'points', 'disq', 'diff', 'diff/match')]
+    for row in standings(results):
+        lines.append('%-*s %7d %5d %5d %5d %7.1f %5d %+8d %+9.1f' % (
+            width, names[row['agent']], row['matches'], row['wins'], row['draws'], row['losses'],
+            row['points'], row['disqualified'], row['differential'],
+            row['differential'] / row['finished'] if row['finished'] else 0.0))
+
+    lines.append('')
+    lines.append('points of the row agent against the column agent:')
+    lines.append('%-*s ' % (width, '') + ' '.join('%6d' % (i + 1) for i in range(len(agents))))
+    table = cross_table(results, agents)
+    for agent in agents:
+        cells = ['%6s' % '-' if opponent == agent else '%6.1f' % table[agent][opponent] for opponent in agents]
+        lines.append('%-*s ' % (width, names[agent]) + ' '.join(cells))
+
+    elapsed = sum(result['elapsed'] for result in results)
+    moves = sum(result['moves'] for result in results)
+    lines.append('')
+    lines.append('%d matches, %d moves, %.0fs of play' % (len(results), moves, elapsed))
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Round-robin tournament between agents, '
+                                                 'with the matches played in parallel.')
+    parser.add_argument('game_type', type=str, choices=['tttm', 'othello'],
+                        help='Choose the game type: "tttm" (tic-tac-toe misere) or "othello"')
+    parser.add_argument('agents', metavar='agent', type=str, nargs='+',
+                        help='Paths of the agents (at least two).')
+    parser.add_argument('-d', '--delay', type=float, default=5.0,
+                        help='Time allocated for players to make a move.')
+    parser.add_argument('-r', '--rounds', type=int, default=1,
+                        help='Number of times each agent plays each other one with each color.')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='Number of matches played at the same time (default: the number of CPUs).')
+    parser.add_argument('-o', '--output-dir', type=str, default=None,
+                        help='Directory to save the history and xml of each match (default: not saved).')
+    args = parser.parse_args()
+
+    agents = list(dict.fromkeys(args.agents))   # without repetitions, in the given order
+    if len(agents) < 2:
+        parser.error('at least two different agents are needed')
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+        args.output_dir = os.path.abspath(args.output_dir)
+
+    results = run_tournament(args.game_type, agents, args.delay, args.rounds, args.workers, args.output_dir)
+    print()
+    print(report(results, agents))